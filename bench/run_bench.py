@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""오프라인 성능 측정 (inspirets 서버 대신 bench/standin_server.py 사용)
+
+차량 수별로 다음 구간을 측정해 JSON 보고서로 저장합니다.
+  device_list  차량 목록 + 차량별 Line Status (fetch_device_list)
+  fleet_data   전체 조회용 Normal 페이지 수집 (iter_completed + cached_normal_status)
+  fleet_view   "🔍 전체 조회" 화면 전체 (AppTest로 스크립트 실행, 수집+판정+렌더링)
+  cold_sweep   전체 차량 냉간 공기압 조회 (FleetJob)
+  rate_sweep   전체 차량 수신율 조회 (FleetJob)
+  parse_*      네트워크 없이 파서만 반복 실행 (HTML 백엔드별)
+  cold_check   구간별 냉간 조회(조기 종료 포함) 결과가 00:00~12:00 한 번 조회와 같은지 확인 (다르면 종료 코드 1)
+
+    python bench/run_bench.py --vehicles 10 100 1000 --out bench/results/latest.json
+    python bench/run_bench.py --vehicles 100 --baseline bench/results/main.json   # 회귀 시 종료 코드 1
+    python bench/run_bench.py --vehicles 50 --benches cold_check --late-sensors 0.3
+
+매 반복마다 결과 캐시를 비우므로 수치는 캐시가 없는 첫 조회 기준입니다.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APP_PATH = os.path.join(REPO_DIR, "smart_monitor.py")
+
+from standin_server import StandinConfig, start_server, serial_of  # noqa: E402
+
+FLEET_BENCHES = ("device_list", "fleet_data", "fleet_view", "cold_sweep", "rate_sweep")
+
+
+def load_app(base_url, cache_dir):
+    """대체 서버를 바라보도록 환경 변수를 설정한 뒤 smart_monitor(대시보드, bare mode)와 smart_monitor_core를 불러옴"""
+    os.environ["SMART_MONITOR_BASE_URL"] = base_url
+    os.environ["SMART_MONITOR_CACHE_DIR"] = cache_dir
+    os.environ["SMART_MONITOR_POLL"] = "0"  # 우선순위 폴링 요청이 측정에 섞이지 않도록
+    import streamlit.logger
+    from streamlit import config
+    config.set_option("logger.level", "error")  # bare mode 경고 생략 (AppTest가 설정을 다시 읽을 때도 유지)
+    streamlit.logger.set_log_level("error")
+    sys.path.insert(0, REPO_DIR)
+    import smart_monitor
+    import smart_monitor_core
+    return smart_monitor, smart_monitor_core
+
+
+def reset_app(app, core):
+    """측정 사이에 프로세스/디스크 캐시와 계측값을 초기화"""
+    core.get_result_cache().clear()
+    app.st.cache_data.clear()
+    core.stop_poll_schedulers()
+    core.get_delta_poller.cache_clear()
+    core.get_line_status_poller.cache_clear()
+    core.get_host_breaker.cache_clear()
+    core.get_shared_store().clear()
+    core.get_metrics().reset()
+
+
+def endpoint_stats(app):
+    summary = app.get_metrics().summary()
+    if summary.empty: return []
+    cols = ["endpoint", "요청 수", "p50(초)", "p95(초)", "응답 KB", "타임아웃", "오류"]
+    keys = ["endpoint", "requests", "p50_s", "p95_s", "kb", "timeouts", "errors"]
+    return [{k: (None if v != v else v) for k, v in zip(keys, row)}  # NaN -> null
+            for row in summary[cols].astype(object).itertuples(index=False)]
+
+
+def run_job(app, func, serials, workers, is_ok):
+    job = app.FleetJob(func, serials, {}, workers, is_ok)
+    while job.running:
+        time.sleep(0.02)
+    return {"done": job.done, "failed": job.failed, "stale": job.stale, "unavailable": job.unavailable}
+
+
+def run_fleet_view(day):
+    """AppTest로 전체 조회 화면을 한 번 렌더링하고 소요 시간 반환"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=600).run()
+    next(d for d in at.date_input if d.label == "조회 날짜").set_value(date.fromisoformat(day))
+    next(s for s in at.selectbox if s.label == "조회 대상 선택").set_value("🔍 전체 조회")
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t0
+    return elapsed, {"exceptions": [str(e.value)[:200] for e in at.exception], "tables": len(at.dataframe)}
+
+
+def bench_fleet(app, name, base_url, serials, day, workers):
+    """한 구간을 한 번 실행하고 (소요 시간, 부가 정보) 반환"""
+    t0 = time.perf_counter()
+    extra = {}
+    if name == "device_list":
+        df = app.fetch_device_list(base_url, workers)
+        extra["rows"] = len(df)
+    elif name == "fleet_data":
+        # 전체 조회 화면과 같은 방식(끝나는 순서대로 묶음 소비)으로 수집하고 첫 묶음까지의 시간도 기록
+        with_data = 0
+        for batch in app.iter_completed(lambda s: app.cached_normal_status(base_url, s, day), serials, workers):
+            extra.setdefault("first_batch_s", round(time.perf_counter() - t0, 3))
+            with_data += sum(1 for _, (_, df) in batch if not df.empty)
+        extra["vehicles_with_data"] = with_data
+    elif name == "fleet_view":
+        return run_fleet_view(day)
+    elif name == "cold_sweep":
+        extra = run_job(app, lambda s: app.get_cold_pressure_with_retry(base_url, s, day), serials, workers,
+                        is_ok=lambda df: not df.empty)
+    elif name == "rate_sweep":
+        extra = run_job(app, lambda s: app.get_rate_data(base_url, s, day), serials, workers,
+                        is_ok=lambda res: not res[3].empty)
+    return time.perf_counter() - t0, extra
+
+
+def bench_parsers(core, base_url, day, min_seconds):
+    """실제 응답 바이트를 한 번 받아 두고 파서만 반복 실행 (백엔드별)"""
+    session = core.get_http_session()
+    serial = serial_of(0)
+    pages = {
+        "device": (f"{base_url}device/list/0", core._parse_device_rows),
+        "line-status": (f"{base_url}line-status/list/{serial}", core._parse_line_status),
+        "normal": (f"{base_url}normal/list/{serial}?date={day}&time_gte=00%3A00&time_lte=23%3A59",
+                   core.parse_normal_series),
+        "cold": (f"{base_url}normal/list/{serial}?date={day}&time_gte=00%3A00&time_lte=06:00", core.parse_cold_rows),
+        "rate": (f"{base_url}rate/list/{serial}?date={day}", core._parse_rate_page),
+    }
+    backends = ["lxml", "bs4"] if core.HTML_BACKEND == "lxml" else ["bs4"]
+    original = core.HTML_BACKEND
+    results = []
+    try:
+        for page, (url, parser) in pages.items():
+            resp = session.get(url, timeout=30)
+            content, encoding = resp.content, resp.encoding
+            for backend in backends:
+                core.HTML_BACKEND = backend
+                n, t0 = 0, time.perf_counter()
+                while True:
+                    parser(content, encoding)
+                    n += 1
+                    elapsed = time.perf_counter() - t0
+                    if elapsed >= min_seconds: break
+                results.append({
+                    "name": f"parse_{page}", "backend": backend, "page_kb": round(len(content) / 1024, 1),
+                    "iterations": n, "per_page_ms": round(1000 * elapsed / n, 3),
+                    "mb_per_s": round(len(content) * n / elapsed / 1e6, 2),
+                })
+    finally:
+        core.HTML_BACKEND = original
+    return results
+
+
+def check_cold(core, base_url, serials, day):
+    """차량별 구간 조회 결과와 한 번에 받은 00:00~12:00 페이지의 센서별 첫 냉간 공기압이 다른 차량 목록"""
+    mismatches = []
+    for s_no in serials:
+        got = core.get_cold_pressure_with_retry(base_url, s_no, day)
+        expected = core.pick_first_cold(core.fetch_cold_rows(base_url, s_no, day, "12:00"))
+        # 결과 표는 float32이므로 소수 셋째 자리까지 비교
+        got_map = {sid: round(float(v), 3) for sid, v in zip(got["SensorID"], got["냉간공기압"])} if not got.empty else {}
+        exp_map = {sid: round(float(entry["냉간공기압"]), 3) for sid, entry in expected.items()}
+        if got_map != exp_map:
+            mismatches.append({"serial": s_no, "missing": sorted(set(exp_map) - set(got_map)),
+                               "differs": sorted(k for k in set(got_map) & set(exp_map) if got_map[k] != exp_map[k])})
+    return mismatches
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(report, baseline, tolerance):
+    """기준 보고서 대비 tolerance 이상 느려진 항목 목록"""
+    def index(rep):
+        out = {}
+        for r in rep["results"]:
+            key = (r["name"], r.get("vehicles"), r.get("backend"))
+            out[key] = r.get("median_s", r.get("per_page_ms"))
+        return out
+    old, new = index(baseline), index(report)
+    regressions = []
+    for key, value in new.items():
+        if key in old and old[key] and value is not None and value > old[key] * (1 + tolerance):
+            regressions.append({"name": key[0], "vehicles": key[1], "backend": key[2],
+                                "baseline": old[key], "current": value, "ratio": round(value / old[key], 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="smart_monitor 오프라인 벤치마크")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--rows-per-day", type=int, default=StandinConfig.rows_per_day)
+    parser.add_argument("--sensors", type=int, default=StandinConfig.sensors)
+    parser.add_argument("--latency-ms", type=float, default=StandinConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StandinConfig.jitter_ms)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bad-devices", type=float, default=0.0, help="항상 응답하지 않는 차량 비율 (예: 0.05)")
+    parser.add_argument("--stall-seconds", type=float, default=StandinConfig.stall_seconds)
+    parser.add_argument("--late-sensors", type=float, default=0.0, help="늦게 나타나는 센서 비율 (cold_check용)")
+    parser.add_argument("--workers", type=int, default=8, help="동시 요청 수 (앱 사이드바 값과 동일)")
+    parser.add_argument("--date", default=(date.today() - timedelta(days=1)).isoformat(),
+                        help="조회 날짜 (기본: 어제, 오늘 날짜는 증분 수집 경로를 측정)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--benches", nargs="+", default=list(FLEET_BENCHES) + ["parse"],
+                        choices=list(FLEET_BENCHES) + ["parse", "cold_check"])
+    parser.add_argument("--parse-seconds", type=float, default=1.0, help="파서별 최소 반복 시간")
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    parser.add_argument("--baseline", help="비교할 이전 보고서 (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀로 볼 느려짐 비율 (기본 20%%)")
+    args = parser.parse_args()
+
+    cfg = StandinConfig(vehicles=max(args.vehicles), sensors=args.sensors, rows_per_day=args.rows_per_day,
+                        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, timeout_rate=args.timeout_rate,
+                        error_rate=args.error_rate, bad_devices=args.bad_devices, stall_seconds=args.stall_seconds,
+                        late_sensors=args.late_sensors)
+    server, base_url = start_server(cfg)
+    cache_dir = tempfile.mkdtemp(prefix="smart_monitor_bench_")
+    app, core = load_app(base_url, cache_dir)
+
+    results = []
+    for n in args.vehicles:
+        cfg.vehicles = n
+        serials = [serial_of(i) for i in range(n)]
+        for name in (b for b in args.benches if b in FLEET_BENCHES):
+            runs, extra = [], {}
+            for _ in range(args.repeat):
+                reset_app(app, core)
+                elapsed, extra = bench_fleet(app, name, base_url, serials, args.date, args.workers)
+                runs.append(round(elapsed, 4))
+            results.append({"name": name, "vehicles": n, "median_s": round(statistics.median(runs), 4),
+                            "runs_s": runs, "per_vehicle_ms": round(1000 * statistics.median(runs) / n, 2),
+                            "endpoints": endpoint_stats(app), **extra})
+            print(f"{name:<12} {n:>5}대  {results[-1]['median_s']:>8.3f}s  (runs {runs})", flush=True)
+
+    mismatches = []
+    if "cold_check" in args.benches:
+        reset_app(app, core)
+        serials = [serial_of(i) for i in range(max(args.vehicles))]
+        mismatches = check_cold(core, base_url, serials, args.date)
+        results.append({"name": "cold_check", "vehicles": len(serials), "mismatches": mismatches})
+        print(f"{'cold_check':<12} {len(serials):>5}대  불일치 {len(mismatches)}대", flush=True)
+
+    if "parse" in args.benches:
+        for r in bench_parsers(core, base_url, args.date, args.parse_seconds):
+            results.append(r)
+            print(f"{r['name']:<18} {r['backend']:<5} {r['per_page_ms']:>9.3f}ms/page  {r['mb_per_s']:>7.2f}MB/s  "
+                  f"({r['page_kb']}KB)", flush=True)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": core.pd.__version__,
+            "html_backend": core.HTML_BACKEND,
+        },
+        "config": {**vars(args), "standin": {k: getattr(cfg, k) for k in cfg.__dataclass_fields__}},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"보고서 저장: {args.out}")
+    server.shutdown()
+
+    for r in report.get("regressions", []):
+        print(f"⚠️ 회귀: {r['name']} ({r['vehicles']}대, {r['backend']}) {r['baseline']} → {r['current']} (x{r['ratio']})")
+    for m in mismatches:
+        print(f"⚠️ 냉간 불일치: {m['serial']} 누락 {m['missing']} 값 차이 {m['differs']}")
+    return 1 if report.get("regressions") or mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""inspirets 대체 서버 (벤치마크/로컬 테스트용)
+
+smart_monitor_core.py의 파서가 기대하는 것과 같은 표 구조로
+/device/list, /line-status/list, /normal/list, /rate/list 페이지를 합성해 응답합니다.
+차량 수, 하루 측정 횟수, 응답 지연, 타임아웃/오류 비율, 응답하지 않는 차량 비율을 설정할 수 있습니다.
+
+    python bench/standin_server.py --vehicles 100 --rows-per-day 144 --latency-ms 50 --port 8765
+    SMART_MONITOR_BASE_URL=http://127.0.0.1:8765/ streamlit run smart_monitor.py
+"""
+import argparse
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class StandinConfig:
+    vehicles: int = 100
+    sensors: int = 6            # 차량당 타이어 센서 수
+    rows_per_day: int = 144     # 하루 측정(헤더) 횟수, 144 = 10분 간격
+    latency_ms: float = 50.0    # 평균 응답 지연
+    jitter_ms: float = 20.0     # 지연 편차 (균등 분포)
+    timeout_rate: float = 0.0   # 응답을 stall_seconds 동안 지연시킬 확률
+    error_rate: float = 0.0     # HTTP 500을 돌려줄 확률
+    bad_devices: float = 0.0    # 차량별 페이지가 항상 stall_seconds 동안 응답하지 않는 차량 비율
+    late_sensors: float = 0.0   # 깨어나기(5~9시) 전에는 행이 아예 없는 센서 비율 (냉간 조기 종료 확인용)
+    stall_seconds: float = 30.0 # 앱의 요청 타임아웃(5~20초)보다 길게
+    seed: int = 0
+
+
+def serial_of(i): return f"SN{i:05d}"
+
+
+def is_bad_device(cfg, serial):
+    return bool(serial) and random.Random(f"{cfg.seed}-bad-{serial}").random() < cfg.bad_devices
+
+
+def _day_times(rows_per_day):
+    step = 1440 / max(1, rows_per_day)
+    return [f"{int(k * step) // 60:02d}:{int(k * step) % 60:02d}:00" for k in range(rows_per_day)]
+
+
+@lru_cache(maxsize=4096)
+def _vehicle_day(serial, day, sensors, rows_per_day, seed, late_sensors=0.0):
+    """(시간, 위도, 경도, 주행거리, [(Seq, SensorID, 공기압, 전압, 온도) ...]) 목록, 시간 오름차순"""
+    rnd = random.Random(f"{seed}-{serial}-{day}")
+    base_psi = [rnd.uniform(110, 125) for _ in range(sensors)]
+    leak = [rnd.random() < 0.05 for _ in range(sensors)]     # 하루 동안 서서히 새는 타이어
+    battery = [rnd.uniform(2.75, 3.1) for _ in range(sensors)]
+    wake = [rnd.uniform(5.0, 9.0) for _ in range(sensors)]  # 이 시각 전에는 공기압 0 (냉간 재조회 경로)
+    late_rnd = random.Random(f"{seed}-late-{serial}-{day}")  # 기존 합성 값이 바뀌지 않도록 별도 난수열
+    late = [late_rnd.random() < late_sensors for _ in range(sensors)]
+    lat, lon, odo = 34.95 + rnd.uniform(-0.02, 0.02), 127.48 + rnd.uniform(-0.02, 0.02), rnd.randint(10000, 400000)
+    out = []
+    for t in _day_times(rows_per_day):
+        hour = int(t[:2]) + int(t[3:5]) / 60
+        lat += rnd.uniform(-0.002, 0.002)
+        lon += rnd.uniform(-0.002, 0.002)
+        odo += rnd.randint(0, 3)
+        rows = []
+        for k in range(sensors):
+            if rnd.random() < 0.03:
+                continue  # 수신 누락
+            if late[k] and hour < wake[k]:
+                continue  # 늦게 나타나는 센서
+            valid = rnd.random() > 0.05
+            warm = max(0.0, hour - 6) * 0.8
+            psi = 0.0 if hour < wake[k] else base_psi[k] + warm - (hour * 0.6 if leak[k] else 0) + rnd.uniform(-1, 1)
+            rows.append((k + 1, f"{serial[-4:]}{k:02d}A", round(psi, 1),
+                         round(battery[k] + rnd.uniform(-0.02, 0.02), 3) if valid else 0,
+                         rnd.randint(20, 95)))
+        out.append((t, round(lat, 6), round(lon, 6), odo, rows))
+    return out
+
+
+def device_list_page(cfg):
+    rows = "".join(
+        f'<tr><td class="textCenter">{i + 1}</td><td class="textCenter">{serial_of(i)}</td>'
+        f'<td class="textCenter">전남{70 + i % 30}자{1000 + i}</td><td class="textCenter">v1.{i % 4}.{i % 7}</td>'
+        f'<td class="textCenter">-</td></tr>'
+        for i in range(cfg.vehicles))
+    return (f'<html><body><table class="table sc_table"><tr><th>No</th><th>SerialNo</th><th>차량번호</th>'
+            f'<th>펌웨어</th><th>비고</th></tr>{rows}</table></body></html>')
+
+
+def line_status_page(cfg, serial):
+    rnd = random.Random(f"{cfg.seed}-line-{serial}")
+    day = date.today().isoformat()
+    rows = "".join(
+        f'<tr><td class="textCenter">{k + 1}</td><td class="textCenter">{serial}</td>'
+        f'<td class="textCenter">{day} {h:02d}:00</td>'
+        + "".join(f'<td class="textCenter">{0 if rnd.random() < 0.05 else rnd.randint(1, 9)}</td>' for _ in range(3))
+        + '</tr>'
+        for k, h in enumerate(range(0, 24, 2)))
+    return (f'<html><body><table class="table sc_table"><tr><th>No</th><th>Serial</th><th>Date</th>'
+            f'<th>R0</th><th>R1</th><th>R2</th></tr>{rows}</table></body></html>')
+
+
+def normal_page(cfg, serial, day, time_gte="00:00", time_lte="23:59"):
+    """최신 측정이 위에 오는 순서로 헤더(table-dark)와 센서 표(table-sm)를 반복"""
+    out = ["<html><body>"]
+    for t, lat, lon, odo, rows in reversed(_vehicle_day(serial, day, cfg.sensors, cfg.rows_per_day, cfg.seed, cfg.late_sensors)):
+        if not (time_gte <= t[:5] <= time_lte): continue
+        out.append('<table class="table table-dark table-sm"><tr><th>No</th><th>Time</th><th>-</th><th>-</th>'
+                   '<th>Lat</th><th>Lon</th><th>-</th><th>-</th><th>-</th><th>-</th><th>Odo</th></tr>'
+                   f'<tr><td>{serial}</td><td>{day} {t}</td><td>1</td><td>0</td><td>{lat}</td><td>{lon}</td>'
+                   f'<td>0</td><td>0</td><td>0</td><td>0</td><td>{odo}</td></tr></table>')
+        out.append('<table class="table table-sm"><thead><tr><th>Seq</th><th>Sensor</th><th>-</th><th>PSI</th>'
+                   '<th>-</th><th>-</th><th>Volt</th><th>Temp</th></tr></thead><tbody>')
+        for seq, sid, psi, volt, temp in rows:
+            out.append(f'<tr><td>{seq}</td><td>{sid}</td><td>0</td><td>{psi:g}</td><td>0</td><td>0</td>'
+                       f'<td>{volt:g}</td><td>{temp}</td></tr>')
+        out.append("</tbody></table>")
+    out.append("</body></html>")
+    return "".join(out)
+
+
+def rate_page(cfg, serial, day):
+    measurements = _vehicle_day(serial, day, cfg.sensors, cfg.rows_per_day, cfg.seed, cfg.late_sensors)
+    total = len(measurements) * cfg.sensors
+    received = {}
+    for *_, rows in measurements:
+        for seq, sid, *_ in rows:
+            received[sid] = received.get(sid, 0) + 1
+    success = sum(received.values())
+    rows = "".join(
+        f'<tr><td>{k + 1}</td><td>{sid}</td><td>{100 * n / max(1, len(measurements)):.1f}</td>'
+        f'<td>{n}</td><td>{len(measurements)}</td><td>0</td><td>0</td><td>{100 * n / max(1, len(measurements)):.1f}</td></tr>'
+        for k, (sid, n) in enumerate(sorted(received.items())))
+    return (f'<html><body><table class="table sc_table"><tr><td>{total}</td><td>{total - success}</td>'
+            f'<td>{success}</td><td>{100 * success / max(1, total):.1f}</td></tr></table>'
+            f'<table class="table sc_table"><thead><tr><th>No</th><th>Sensor_Id</th><th>Success</th><th>-</th>'
+            f'<th>-</th><th>-</th><th>-</th><th>Normal</th></tr></thead><tbody>{rows}</tbody></table></body></html>')
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    cfg = StandinConfig()
+    protocol_version = "HTTP/1.1"  # keep-alive (앱의 커넥션 풀 동작을 그대로 재현)
+
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        cfg = self.cfg
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        serial = parts[2] if len(parts) > 2 and parts[0] != "device" else ""
+        roll = random.random()
+        if roll < cfg.timeout_rate or is_bad_device(cfg, serial):
+            time.sleep(cfg.stall_seconds)
+        else:
+            time.sleep(max(0.0, cfg.latency_ms + random.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000)
+        if roll >= 1 - cfg.error_rate:
+            return self._send(500, "<html><body>Internal Server Error</body></html>")
+
+        day = q.get("date", (date.today() - timedelta(days=1)).isoformat())
+        if parts[0] == "device":
+            body = device_list_page(cfg)
+        elif parts[0] == "line-status":
+            body = line_status_page(cfg, serial)
+        elif parts[0] == "normal":
+            body = normal_page(cfg, serial, day, q.get("time_gte", "00:00")[:5], q.get("time_lte", "23:59")[:5])
+        elif parts[0] == "rate":
+            body = rate_page(cfg, serial, day)
+        else:
+            return self._send(404, "<html><body>Not Found</body></html>")
+        self._send(200, body)
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        etag = f'"{zlib.crc32(data):08x}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, data = 304, b""  # 조건부 요청: 내용이 같으면 본문 없이 응답
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if status in (200, 304): self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 클라이언트가 타임아웃으로 먼저 끊은 경우
+
+
+def start_server(cfg=None, host="127.0.0.1", port=0):
+    """백그라운드 스레드에서 서버를 띄우고 (server, base_url) 반환. cfg는 실행 중에 바꿔도 반영됩니다."""
+    handler = type("Handler", (StandinHandler,), {"cfg": cfg or StandinConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="standin-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--vehicles", type=int, default=StandinConfig.vehicles)
+    parser.add_argument("--sensors", type=int, default=StandinConfig.sensors)
+    parser.add_argument("--rows-per-day", type=int, default=StandinConfig.rows_per_day)
+    parser.add_argument("--latency-ms", type=float, default=StandinConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StandinConfig.jitter_ms)
+    parser.add_argument("--timeout-rate", type=float, default=StandinConfig.timeout_rate)
+    parser.add_argument("--error-rate", type=float, default=StandinConfig.error_rate)
+    parser.add_argument("--bad-devices", type=float, default=StandinConfig.bad_devices)
+    parser.add_argument("--late-sensors", type=float, default=StandinConfig.late_sensors)
+    parser.add_argument("--stall-seconds", type=float, default=StandinConfig.stall_seconds)
+    parser.add_argument("--seed", type=int, default=StandinConfig.seed)
+    args = parser.parse_args()
+
+    cfg = StandinConfig(**{k: v for k, v in vars(args).items() if k not in ("host", "port")})
+    server, base_url = start_server(cfg, args.host, args.port)
+    print(f"대체 서버 실행 중: {base_url} ({cfg})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
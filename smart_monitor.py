@@ -5,272 +5,81 @@
 
 
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import urllib3
 from datetime import datetime
-import pytz
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+
+# 수집/파싱/분석 로직은 streamlit 없이도 쓸 수 있도록 smart_monitor_core에 있습니다 (CLI: smart_monitor_cli.py).
+from smart_monitor_core import (
+    seoul_timezone, configured_servers, DEFAULT_MAX_WORKERS, POOL_MAXSIZE, TODAY_TTL, PENDING_STATUS, SUMMARY_KEYS, HTML_BACKEND,
+    PROMETHEUS_INTERVAL, PROMETHEUS_TEXTFILE, LEAK_SLOPE_PSI, BATTERY_SLOPE_V, SHARED_SWEEPS,
+    get_metrics, start_prometheus_export, get_host_breaker, get_shared_store, worker_ctx_initializer, fetch_all, iter_completed,
+    get_device_list, device_status_frame, get_latest_r_values, get_normal_series, get_normal_status_data, format_reading,
+    sensor_trend_stats, get_rate_data, get_cold_pressure_with_retry, cached_sweep_results, get_threshold_rules, evaluate_thresholds,
+    fleet_snapshot, join_fleet, RATE_TOTAL_COLS, ROUTE_TOLERANCE_M, ROUTE_LEVELS, route_points, simplify_route,
+    ALERT_LOG_PATH, get_alert_engine, POLL_ENABLED, POLL_BUDGET_RPM, get_poll_scheduler, start_poll_scheduler,
+    collect_vehicle_day, missing_history, past_days, load_history, find_declines, FleetJob,
+    RATE_DEGRADE_PP, load_rate_history, comm_quality,
+)
 
 # --- 설정 및 초기화 ---
-seoul_timezone = pytz.timezone('Asia/Seoul')
 now = datetime.now(seoul_timezone)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+start_prometheus_export()
 
 st.set_page_config(page_title="버스 타이어 모니터링", layout="wide")
 st.title("🚌 실시간 버스 타이어 통합 관리 시스템")
 
-if 'cold_analysis_done' not in st.session_state:
-    st.session_state.cold_analysis_done = False
-if 'cold_cache' not in st.session_state:
-    st.session_state.cold_cache = {}
-if 'rate_analysis_done' not in st.session_state:
-    st.session_state.rate_analysis_done = False
-if 'rate_cache' not in st.session_state:
-    st.session_state.rate_cache = {}
-
-# 세션 상태 초기화
-if 'rate_cache' not in st.session_state:
-    st.session_state.rate_cache = {}
-if 'cold_cache' not in st.session_state:
-    st.session_state.cold_cache = {}
+# 세션 상태 초기화 (냉간/수신율 결과와 작업은 모든 세션이 공유하는 SharedStore에 있음)
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}  # 이 세션의 백그라운드 작업 (history)
+if 'reported_jobs' not in st.session_state:
+    st.session_state.reported_jobs = {}  # 완료를 화면에 반영한 작업 {key: FleetJob}
+if 'depot_scans' not in st.session_state:
+    st.session_state.depot_scans = {}  # 차고지별 진행 중인 차량 목록 조회 {base_url: (Future, 시작 시각)}
 
 # --- 사이드바 제어판 ---
 st.sidebar.header("⚙️ 제어판")
-url_options = {"순천 교통": "https://suncheon-dev.inspirets.co.kr/"}
+url_options = configured_servers()
 selected_label = st.sidebar.selectbox("접속 서버를 선택하세요", list(url_options.keys()))
 search_date = st.sidebar.date_input("조회 날짜", now.date())
 target_url = url_options[selected_label]
-HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
-
-def get_latest_r_values(base_url, serial_no):
-    """Line Status 페이지 파싱"""
-    url = f"{base_url.rstrip('/')}/line-status/list/{serial_no}"
-
-    try:
-        resp = requests.get(url, headers=HEADERS, verify=False, timeout=5)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        rows = soup.select("table.sc_table tr")[1:]
-        if rows:
-            latest_row = rows[-1]
-            cols = latest_row.find_all("td", class_="textCenter")
-            if len(cols) >= 6:
-                return {
-                    "Date": cols[2].get_text(strip=True),
-                    "R0": cols[3].get_text(strip=True),
-                    "R1": cols[4].get_text(strip=True),
-                    "R2": cols[5].get_text(strip=True)
-                }
-    except: pass
-    return {"Date": "N/A", "R0": "-", "R1": "-", "R2": "-"}
-
-def get_normal_status_data(base_url, serial_no):
-    url = f"{base_url.rstrip('/')}/normal/list/{serial_no}?date={search_date.strftime('%Y-%m-%d')}&time_gte=00%3A00&time_lte=23%3A59"
-    try:
-        resp = requests.get(url, headers=HEADERS, verify=False, timeout=7)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        master_info = {}
-        m_table = soup.find("table", class_="table-dark")
-        if m_table:
-            m_tds = m_table.find_all("tr")[1].find_all("td")
-            master_info = {
-                "수집시간": m_tds[1].get_text(strip=True),
-                "위치": f"{m_tds[4].get_text(strip=True)}, {m_tds[5].get_text(strip=True)}",
-                "주행거리": m_tds[10].get_text(strip=True) + " km"
-            }
-
-        all_tables = soup.find_all("table", class_="table-sm")
-        sensor_history = []
-
-        for table in all_tables:
-            if "table-dark" in table.get("class", []): continue
-            rows = table.find("tbody").find_all("tr") if table.find("tbody") else table.find_all("tr")[1:]
-            for row in rows:
-                tds = row.find_all("td")
-                if len(tds) >= 8:
-                    v_raw = tds[6].get_text(strip=True)
-                    v_num = float(v_raw) if v_raw and v_raw != '0' else 0
-                    sensor_history.append({
-                        "Seq": int(tds[0].get_text(strip=True)),
-                        "SensorID": tds[1].get_text(strip=True),
-                        "공기압": tds[3].get_text(strip=True),
-                        "전압": tds[6].get_text(strip=True),
-                        "온도": tds[7].get_text(strip=True),
-                        "v_num": v_num
-                    })
-
-        if not sensor_history: return master_info, pd.DataFrame()
-
-        df_all = pd.DataFrame(sensor_history)
-        df_valid = df_all[df_all['v_num'] > 0].copy()
-        all_ids = df_all.drop_duplicates(subset=["SensorID"]).sort_values("Seq")["SensorID"].tolist()
-
-        final_rows = []
-        for sid in all_ids:
-            valid_entry = df_valid[df_valid['SensorID'] == sid]
-            if not valid_entry.empty:
-                final_rows.append(valid_entry.iloc[0])
-            else:
-                final_rows.append(df_all[df_all['SensorID'] == sid].iloc[0])
-
-        df_final = pd.DataFrame(final_rows).sort_values("Seq")
-        return master_info, df_final[["SensorID", "공기압", "전압", "온도"]]
-    except: return {}, pd.DataFrame()
-
-def get_rate_data(base_url, serial_no):
-    url = f"{base_url.rstrip('/')}/rate/list/{serial_no}?date={search_date.strftime('%Y-%m-%d')}&time_gte=00%3A00&time_lte=23%3A59"
-    try:
-        resp = requests.get(url, headers=HEADERS, verify=False, timeout=20)
-        resp.raise_for_status() # HTTP 에러 발생 시 예외 발생
-
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        total_count = success_count = 0
-        total_rate = "-"
-        sum_table = soup.find("table", class_="sc_table")
-        if sum_table:
-            tds = sum_table.find_all("td")
-            if len(tds) >= 4:
-                total_count = tds[0].get_text(strip=True)
-                success_count = tds[2].get_text(strip=True)
-                total_rate = tds[3].get_text(strip=True)
-
-        sensor_rates = []
-        tables = soup.find_all("table", class_="sc_table")
-
-        if len(tables) > 1:
-            target_table = tables[1]
-            rows = target_table.find("tbody").find_all("tr") if target_table.find("tbody") else target_table.find_all("tr")
-
-            for row in rows:
-                tds = row.find_all("td")
-                if len(tds) >= 8:
-                    s_id = tds[1].get_text(strip=True)
-                    if not s_id or s_id == "Sensor_Id":
-                        continue
-
-                    sensor_rates.append({
-                        "SensorID": s_id,
-                        "Success_Rate": tds[2].get_text(strip=True),
-                        "Normal_Rate": tds[7].get_text(strip=True)
-                    })
-
-        return total_count, success_count, total_rate, pd.DataFrame(sensor_rates)
-    except requests.exceptions.Timeout:
-        print(f"⚠️ {serial_no}: 서버 응답 시간이 초과되었습니다. (20초)")
-        return "Timeout", pd.DataFrame()
-    except Exception as e:
-        print(f"❌ 에러 발생: {e}")
-        return "-", pd.DataFrame()
-
-def get_sensor_style(val, col_name):
-    num = clean_float(val, default=None) # 숫자가 아니면 None 반환
-
-    if num is None: return '' # 데이터가 '-'인 경우 스타일 적용 안 함 (정상 간주)
-
-    if col_name in ["공기압", "냉간공기압"]:
-        if num < 100: return 'background-color: #ffcccc; color: #990000; font-weight: bold'
-        if num > 145: return 'background-color: #fff3cd; color: #856404; font-weight: bold'
-    elif col_name == "전압":
-        if num < 2.8: return 'background-color: #ffcccc; color: #990000; font-weight: bold'
-    elif col_name == "온도":
-        if num >= 90: return 'background-color: #ffcccc; color: #990000; font-weight: bold'
-    elif col_name == "Success_Rate":
-        if num <= 50: return 'background-color: #ffcccc; color: #990000; font-weight: bold'
-        if num <= 85: return 'background-color: #fff3cd; color: #856404; font-weight: bold'
-    return ''
-
-def get_cold_pressure_data(base_url, serial_no, target_date, limit_time):
-    url = f"{base_url.rstrip('/')}/normal/list/{serial_no}?date={target_date}&time_gte=00%3A00&time_lte={limit_time}"
-
-    try:
-        resp = requests.get(url, headers=HEADERS, verify=False, timeout=10)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        # 1. 모든 헤더(검정 배경)와 데이터 테이블을 순서대로 가져옵니다.
-        # 보통 헤더-테이블, 헤더-테이블 쌍으로 이루어져 있습니다.
-        containers = soup.find_all("div", class_="table-responsive") # 또는 테이블을 포함하는 상위 div
-        # 만약 div 구조가 아니면 테이블들을 직접 찾습니다.
-        all_tables = soup.find_all("table")
-
-        all_data = []
-        current_time = None
-
-        for table in all_tables:
-            # 2. 검정색 배경의 헤더 테이블인 경우 -> 시간 추출
-            if "table-dark" in table.get("class", []):
-                time_td = table.find_all("td")[1] # 이미지상 2번째 칸이 Time
-                current_time = time_td.get_text(strip=True)
-                continue
-
-            # 3. 데이터 테이블(table-sm)인 경우 -> 현재 저장된 헤더 시간 부여
-            if "table-sm" in table.get("class", []):
-                rows = table.find("tbody").find_all("tr") if table.find("tbody") else table.find_all("tr")[1:]
-                for row in rows:
-                    tds = row.find_all("td")
-                    if len(tds) >= 8:
-                        all_data.append({
-                            "Time": current_time, # 위에서 추출한 헤더 시간 사용
-                            "Seq": int(tds[0].get_text(strip=True)),
-                            "SensorID": tds[1].get_text(strip=True),
-                            "Cold_PSI": tds[3].get_text(strip=True)
-                        })
-
-        if not all_data: return pd.DataFrame()
-
-        # 4. 다중 정렬: 시간(과거순) -> Seq(홀수우선)
-        df = pd.DataFrame(all_data)
-        df_sorted = df.sort_values(by=['Time', 'Seq'], ascending=[True, True])
-
-        # 5. 센서별 최초 유효값 추출
-        cold_storage = {}
-        for _, row in df_sorted.iterrows():
-            sid = row['SensorID']
-            psi_raw = str(row['Cold_PSI']).strip()
-
-            if sid in cold_storage: continue
-
-            try:
-                if float(psi_raw) > 0:
-                    cold_storage[sid] = {
-                        "SensorID": sid,
-                        "냉간공기압": psi_raw,
-                        "냉간계측시간": row['Time'],
-                        "Seq": row['Seq']
-                    }
-            except: continue
-        return pd.DataFrame(list(cold_storage.values()))
-    except Exception as e:
-        st.error(f"데이터 파싱 오류: {e}")
-        return pd.DataFrame()
-
-def get_cold_pressure_with_retry(base_url, serial_no, target_date):
-    start_hour = 6
-    max_hour = 12
-    final_cold_storage = {} # 최종 확정된 센서별 냉간 공기압
-
-    for current_hour in range(start_hour, max_hour + 1):
-        limit_time = f"{current_hour:02d}:00"
-        df_step = get_cold_pressure_data(base_url, serial_no, target_date, limit_time)
-
-        if not df_step.empty:
-            for _, row in df_step.iterrows():
-                sid = row['SensorID']
-                if sid not in final_cold_storage:
-                    final_cold_storage[sid] = {
-                        "SensorID": sid,
-                        "냉간공기압": row['냉간공기압'],
-                        "냉간계측시간": row['냉간계측시간'],
-                        "Seq": row['Seq'],
-                        "조회한계": limit_time # 디버깅용: 몇 시 조회에서 찾았는지 기록
-                    }
-        if len(final_cold_storage) >= 6:
-            break
-    if not final_cold_storage:
-        return pd.DataFrame()
-    return pd.DataFrame(list(final_cold_storage.values()))
-
+if POLL_ENABLED:
+    for _url in url_options.values():
+        start_poll_scheduler(_url)  # 화면을 보고 있지 않아도 서버마다 우선순위대로 갱신/알림 판정 (서버마다 리더 프로세스 하나만 요청)
+if len(url_options) > 1:
+    all_depots = st.sidebar.toggle("🏢 전체 차고지 통신 상태",
+                                   help="통신 상태 요약 탭에서 등록된 모든 차고지를 동시에 조회해 합쳐서 보여줍니다.")
+else:
+    # 차고지가 하나면 토글 대신 등록 방법만 안내 (SMART_MONITOR_SERVERS="이름=url;이름=url", configured_servers 참고)
+    all_depots = False
+    st.sidebar.caption("🏢 차고지를 여러 개 등록하면(SMART_MONITOR_SERVERS) 전체 차고지 통신 상태를 함께 볼 수 있습니다.")
+
+max_workers = st.sidebar.number_input("동시 요청 수", min_value=1, max_value=POOL_MAXSIZE, value=DEFAULT_MAX_WORKERS,
+                                      help="차량별 페이지를 동시에 요청하는 개수입니다. 서버가 느리면 낮춰주세요.")
+
+# --- 화면 스타일 ---
+STYLE_CRIT = 'background-color: #ffcccc; color: #990000; font-weight: bold'
+STYLE_WARN = 'background-color: #fff3cd; color: #856404; font-weight: bold'
+
+def format_cell(val):
+    """표시용 문자열 (수치는 format_reading, 시각은 초 단위, 결측은 '-')"""
+    if isinstance(val, pd.Timestamp): return val.strftime('%Y-%m-%d %H:%M:%S')
+    return format_reading(val)
+
+def style_sensor_table(display_df, crit, warn):
+    """판정 플래그로 셀 스타일 적용 (위험이 주의보다 우선), 수치/결측 표시는 여기서만 문자열로"""
+    css = pd.DataFrame('', index=display_df.index, columns=display_df.columns)
+    for col in crit.columns.intersection(css.columns):
+        css[col] = css[col].mask(warn[col], STYLE_WARN).mask(crit[col], STYLE_CRIT)
+    return (display_df.style.apply(lambda _: css, axis=None)
+            .format(format_cell, subset=[c for c in display_df.columns if c != "SensorID"]))
+
+def rate_caption(rate_totals, s_no):
+    """'전체수신율% (성공건수/전체건수)' 표시 문자열 (조회 결과가 없으면 '-')"""
+    vals = rate_totals.loc[s_no] if s_no in rate_totals.index else pd.Series(float("nan"), index=RATE_TOTAL_COLS)
+    total_count, success_count, total_rate = (format_reading(vals[c]) for c in RATE_TOTAL_COLS)
+    return f"{total_rate}% ({success_count}/{total_count})"
 
 def style_communication(row):
     """통신 이상(is_err)인 경우 행 전체에 배경색 적용"""
@@ -282,301 +91,772 @@ def color_status_text(val):
     """'상태' 컬럼의 텍스트 색상 및 굵기 지정"""
     if val == '🔴확인필요':
         return 'color: #ff4b4b; font-weight: bold'
+    if val == PENDING_STATUS:
+        return 'color: #888888'
     return 'color: #28a745; font-weight: bold'
 
-# --- 핵심 헬퍼 함수 ---
-def clean_float(val, default=0.0):
-    """안전한 숫자 변환 함수"""
-    try:
-        if val is None or str(val).strip() in ["-", "", "None", "nan", "N/A"]:
-            return default
-        return float(str(val).replace('%', '').replace(',', '').strip())
-    except:
-        return default
-
-# --- 데이터 수집 함수 (기존 로직 유지하되 예외처리 보강) ---
+# --- 화면용 메모이즈 (st.cache_data) ---
 @st.cache_data(ttl=300)
-def fetch_device_list(base_url):
-    url = f"{base_url.rstrip('/')}/device/list/0"
-    try:
-        resp = requests.get(url, headers=HEADERS, verify=False, timeout=10)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        rows = soup.select("table.sc_table tr")[1:]
-        data = []
-        for row in rows:
-            cols = row.find_all("td", class_="textCenter")
-            if len(cols) >= 3:
-                s_no = cols[1].get_text(strip=True)
-                r_vals = get_latest_r_values(base_url, s_no)
-                is_err = any(v in ["0", "-"] for v in [r_vals["R0"], r_vals["R1"], r_vals["R2"]])
-                data.append({
-                    "No": cols[0].get_text(strip=True),
-                    "차량번호": cols[2].get_text(strip=True),
-                    "펌웨어버전": cols[3].get_text(strip=True),
-                    "SerialNo": s_no,
-                    "R0": r_vals["R0"], "R1": r_vals["R1"], "R2": r_vals["R2"],
-                    "최근수집": r_vals["Date"],
-                    "상태": "🔴확인필요" if is_err else "🟢정상",
-                    "is_err": is_err
-                })
-        return pd.DataFrame(data)
-    except: return pd.DataFrame()
-
-# --- 수신율 및 냉간공기압 분석 버튼 로직 (최적화) ---
+def fetch_devices(base_url):
+    """차량 목록 (No / 차량번호 / 펌웨어버전 / SerialNo)"""
+    return get_device_list(base_url)
+
+LINE_STATUS_TTL = 60  # 통신 상태 표 자동 갱신이 새 값을 받도록 차량 목록(300초)보다 짧게
+
+def cached_line_status(base_url, serial_no):
+    """우선순위 폴링과 같은 저장소(LineStatusPoller)에서 LINE_STATUS_TTL 이내에 받은 값은 요청 없이 사용"""
+    return get_latest_r_values(base_url, serial_no, max_age=LINE_STATUS_TTL)
+
+@st.cache_data(ttl=TODAY_TTL, show_spinner=False)
+def cached_normal_status(base_url, serial_no, target_date):
+    """차량별 (master_info, 센서 대표값), 위젯 조작으로 인한 재실행 시 다시 수집하지 않도록 메모이즈"""
+    return get_normal_status_data(base_url, serial_no, target_date)
+
+STREAM_REDRAW_SECONDS = 0.3  # 점진 렌더링 시 표/요약을 다시 그리는 최소 간격
+
+def fetch_device_list(base_url, _max_workers=DEFAULT_MAX_WORKERS):
+    """차량 목록 + 차량별 Line Status (차량별 Line Status는 동시에 요청하고 No 순서 그대로 붙입니다)"""
+    with get_metrics().timed("fetch", "fetch_device_list"):
+        devices = fetch_devices(base_url)
+        if devices.empty: return devices
+        r_list = fetch_all(lambda s_no: cached_line_status(base_url, s_no), devices["SerialNo"], _max_workers)
+        return device_status_frame(devices, dict(zip(devices["SerialNo"], r_list)))
+
+def show_fleet_summary(err_map, final=True):
+    """🚨 점검 필요 차량 요약 (수집 중에는 지금까지 판정된 차량만 표시)"""
+    st.markdown("### 🚨 점검 필요 차량 요약" + ("" if final else " (수집 중)"))
+    sum_cols = st.columns(5)
+    labels = ["❄️ 냉간", "🎈 공기압", "🔥 온도", "🔋 전압", "📡 수신율"]
+
+    for col, label, key in zip(sum_cols, labels, SUMMARY_KEYS):
+        unique_cars = sorted(err_map[key])
+        col.markdown(f"**{label} ({len(unique_cars)})**")
+        if unique_cars and final:
+            col.text_area(label, "\n".join(unique_cars), height=100, label_visibility="collapsed", key=f"err_{key}")
+        elif unique_cars:
+            # 같은 key의 위젯을 한 실행에서 여러 번 만들 수 없으므로 수집 중에는 텍스트로 표시합니다.
+            col.container(height=100).text("\n".join(unique_cars))
+        else:
+            col.write("✅ 정상" if final else "-")
+
+# --- 여러 차고지 통합 조회 ---
+DEPOT_WAIT_SECONDS = 20  # 이보다 늦는 차고지는 기다리지 않고 나머지로 먼저 화면을 그림 (결과는 다음 갱신에 반영)
+
+def start_depot_scans(depots, max_workers=DEFAULT_MAX_WORKERS):
+    """차고지마다 별도 스레드에서 fetch_device_list를 시작하고 {label: (Future, 시작 시각)} 반환
+
+    이전 실행에서 시작해 아직 끝나지 않은 조회는 새로 시작하지 않고 이어받습니다.
+    스레드 풀은 기다리지 않고 닫으므로 느린 차고지는 화면을 그린 뒤에도 계속 수집되어 캐시에 남습니다.
+    """
+    scans = st.session_state.depot_scans
+    new = [url for url in depots.values() if url not in scans or scans[url][0].done()]
+    if new:
+        pool = ThreadPoolExecutor(max_workers=len(new), thread_name_prefix="depot-scan",
+                                  initializer=worker_ctx_initializer())
+        for url in new:
+            scans[url] = (pool.submit(fetch_device_list, url, max_workers), time.time())
+        pool.shutdown(wait=False)
+    return {label: scans[url] for label, url in depots.items()}
+
+def combine_depots(frames):
+    """차고지별 차량 목록을 차고지 컬럼을 붙여 하나로 합침"""
+    parts = [df.assign(No=pd.to_numeric(df["No"], errors="coerce")).assign(차고지=label)
+             for label, df in frames.items() if not df.empty]
+    if not parts: return pd.DataFrame()
+    combined = pd.concat(parts, ignore_index=True)
+    return combined[["차고지"] + [c for c in combined.columns if c != "차고지"]]
+
+def depot_summary(frames, depot_status):
+    """차고지별 차량 수 / RFM 이상 / 조회 상태"""
+    return [{"차고지": label,
+             "차량 수": len(frames[label]) if label in frames else None,
+             "RFM 이상": int(frames[label]["is_err"].sum()) if not frames.get(label, pd.DataFrame()).empty else None,
+             "상태": state} for label, state in depot_status.items()]
+
+def show_rfm_status(df, depot_rows=None):
+    """RFM 통신 상태 지표와 테이블 (여러 차고지면 차고지별 현황과 차고지 컬럼 포함)"""
+    err_count = len(df[df['is_err']]) if not df.empty else 0
+    c1, c2, c3 = st.columns(3)
+    c1.metric("전체 차량", f"{len(df)}대")
+    c2.metric("RFM 이상", f"{err_count}건", delta=err_count, delta_color="inverse")
+    c3.metric("갱신 시간 (KST)", now.strftime("%Y-%m-%d %H:%M:%S"))
+    if depot_rows:
+        st.dataframe(pd.DataFrame(depot_rows), width="stretch", hide_index=True)
+    if df.empty: return
+
+    # 2. 메인 통신 상태 테이블
+    sort_by = ["is_err", "차고지", "No"] if "차고지" in df else ["is_err", "No"]
+    df_display = df.sort_values(by=sort_by, ascending=[False] + [True] * (len(sort_by) - 1))
+    st.dataframe(
+        df_display.style.apply(style_communication, axis=1).map(color_status_text, subset=['상태']),
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "차고지": st.column_config.TextColumn("차고지", width="small"),
+            "차량번호": st.column_config.TextColumn("차량번호", width="medium"),
+            "SerialNo": st.column_config.TextColumn("통신기 SerialNo", width="medium"),
+            "R0": st.column_config.TextColumn("R0", width="small"),
+            "R1": st.column_config.TextColumn("R1", width="small"),
+            "R2": st.column_config.TextColumn("R2", width="small"),
+            "최근수집": st.column_config.TextColumn("최근 수집 시간", width="medium"),
+            "상태": st.column_config.TextColumn("통신 상태", width="small"),
+            "is_err": None,  # None으로 설정하면 화면에 렌더링되지 않습니다.
+            # "No": None       # 순서 정렬용 No 컬럼도 숨기고 싶다면 추가하세요.
+        }
+    )
+
+# --- 분석 작업 (냉간/수신율은 공유, 이력 수집은 세션별) ---
+def sweep_table(kind):
+    """현재 서버/조회 날짜의 전체 조회 결과 표 (모든 세션 공유, 처음 열 때 결과 캐시에 있는 값으로 채움)
+
+    rate는 (센서별 긴 표, 차량별 합계 표), cold는 센서별 긴 표
+    """
+    target_date = search_date.strftime('%Y-%m-%d')
+    devices = fetch_devices(target_url)
+    serials = devices["SerialNo"].tolist() if not devices.empty else []
+    return get_shared_store().table(kind, target_url, target_date,
+                                    warm=lambda: cached_sweep_results(kind, target_url, serials, target_date))
+
+def fleet_job(key):
+    """cold/rate는 현재 서버/조회 날짜의 공유 작업, 그 외는 이 세션의 작업"""
+    if key in SHARED_SWEEPS:
+        return get_shared_store().job(key, target_url, search_date.strftime('%Y-%m-%d'))
+    return st.session_state.jobs.get(key)
+
+def start_fleet_job(key, func, is_ok=None):
+    """전체 차량 조회 시작 (다른 세션이 같은 서버/날짜로 이미 진행 중이면 그 작업에 합류)"""
+    df_raw = fetch_devices(target_url)
+    serials = df_raw["SerialNo"].tolist() if not df_raw.empty else []
+    return get_shared_store().start_job(key, target_url, search_date.strftime('%Y-%m-%d'),
+                                        lambda results: FleetJob(func, serials, results, max_workers, is_ok))
+
+def job_completed(key):
+    job = fleet_job(key)
+    return job is not None and not job.running and not job.cancelled
+
+def sweep_notes(s_no):
+    """최근 냉간/수신율 조회에서 이 차량이 이전 값으로 남았거나 수집 불가였으면 표시할 문구"""
+    notes = []
+    for key, icon in (("rate", "📡"), ("cold", "❄️")):
+        job = fleet_job(key)
+        state = job.status.get(s_no) if job is not None else None
+        if state == "stale": notes.append(f"{icon} ⚠️ 이전 조회 값")
+        elif state == "unavailable": notes.append(f"{icon} ⛔ 수집 불가")
+    return "".join(f" | {n}" for n in notes)
+
+JOB_KEYS = {"cold": "❄️ 냉간 공기압", "rate": "📡 수신율", "history": "📚 이력 수집", "rate_history": "📶 수신율 이력"}
+
+JOB_POLL_SECONDS = 1.0  # 진행률 영역 갱신 주기
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress():
+    """분석 작업 진행률 (이 영역만 1초마다 다시 실행, 다른 세션이 시작한 작업도 바로 표시)
+
+    run_every는 데코레이터가 한 번만 평가하므로 고정값으로 두고, 진행 중인 작업이 없으면 여기서 바로 끝냅니다.
+    """
+    jobs = {key: job for key in JOB_KEYS if (job := fleet_job(key)) is not None}
+    finished_now = False
+    for key, job in jobs.items():
+        if not job.running and st.session_state.reported_jobs.get(key) is not job:
+            st.session_state.reported_jobs[key] = job
+            finished_now = True
+    if finished_now:
+        st.rerun()  # 완료 결과를 메인 화면에 반영
+    if not any(job.running for job in jobs.values()):
+        for key, job in jobs.items():
+            state = "중지됨" if job.cancelled else "완료"
+            st.caption(f"{JOB_KEYS[key]} {state}: {job.done}/{job.total} · 실패 {job.failed}")
+        return
+    for key, job in jobs.items():
+        running = job.running
+        eta = job.eta()
+        eta_txt = f"{eta:.0f}초" if running and eta is not None else "-"
+        state = "진행 중" if running else ("중지됨" if job.cancelled else "완료")
+        st.progress(job.done / job.total if job.total else 1.0,
+                    text=f"{JOB_KEYS[key]} {state}: {job.done}/{job.total}")
+        st.caption(f"실패 {job.failed} (이전 값 {job.stale} · 수집 불가 {job.unavailable}) · "
+                   f"요청 중 {job.in_flight} · 남은 시간 {eta_txt}")
+        if running:
+            st.button("⏹ 중지", key=f"cancel_{key}", on_click=job.cancel, use_container_width=True)
+
+# --- 수신율 및 냉간공기압 분석 버튼 로직 (백그라운드 작업) ---
 with st.sidebar:
     st.markdown("---")
     st.subheader("⚙️ 분석 도구")
 
     cold_btn_label = "❄️ 전체 차량 냉간 공기압 조회"
-    if st.session_state.cold_analysis_done:
+    if job_completed("cold"):
         cold_btn_label = "✅ 냉간 분석 완료 (재조회)"
 
-    if st.button(cold_btn_label, use_container_width=True):
-        df_raw = fetch_device_list(target_url)
-        cold_prog = st.progress(0, text="분석 중...")
-        for idx, row in df_raw.iterrows():
-            st.session_state.cold_cache[row.SerialNo] = get_cold_pressure_with_retry(target_url, row.SerialNo, search_date.strftime("%Y-%m-%d"))
-            cold_prog.progress((idx + 1) / len(df_raw))
-        cold_prog.empty()
-        # st.success("냉간 분석 완료!")
-        st.session_state.cold_analysis_done = True
-        st.rerun() # 분석 완료 후 페이지 새로고침하여 결과 반영
+    cold_job = fleet_job("cold")
+    if st.button(cold_btn_label, use_container_width=True, disabled=cold_job is not None and cold_job.running):
+        target_date = search_date.strftime("%Y-%m-%d")
+        start_fleet_job("cold", lambda s_no: get_cold_pressure_with_retry(target_url, s_no, target_date),
+                        is_ok=lambda df: not df.empty)
+        st.rerun()
 
     rate_btn_label = "🚀 전체 차량 수신율 조회"
-    if st.session_state.rate_analysis_done:
+    if job_completed("rate"):
         rate_btn_label = "✅ 수신율 분석 완료 (재조회)"
 
-    if st.button(rate_btn_label, use_container_width=True):
-        df_raw = fetch_device_list(target_url)
-        rate_progress = st.progress(0, text="수신율 분석 중...")
-        for idx, row in df_raw.iterrows():
-            st.session_state.rate_cache[row.SerialNo] = get_rate_data(target_url, row.SerialNo)
-            rate_progress.progress((idx + 1) / len(df_raw))
-        rate_progress.empty()
-        st.session_state.rate_analysis_done = True
-        st.rerun() # 분석 완료 후 페이지 새로고침하여 결과 반영
+    rate_job = fleet_job("rate")
+    if st.button(rate_btn_label, use_container_width=True, disabled=rate_job is not None and rate_job.running):
+        target_date = search_date.strftime("%Y-%m-%d")
+        start_fleet_job("rate", lambda s_no: get_rate_data(target_url, s_no, target_date),
+                        is_ok=lambda res: not res[3].empty)
+        st.rerun()
 
-# --- 메인 화면 렌더링 ---
-df_raw = fetch_device_list(target_url)
+    show_job_progress()
 
-if not df_raw.empty:
-    tab1, tab2 = st.tabs(["📊 상세 모니터링", "📡 통신 상태 요약"])
+# --- 화면 구역별 자동 갱신 ---
+REFRESH_PANELS = {"rfm": "📡 통신 상태 표", "detail": "🚍 차량 상세", "grid": "📊 전체 조회 그리드", "summary": "🚨 점검 필요 요약"}
 
-    with tab1:
-        st.subheader("🚍 상세 데이터 모니터링")
-        car_list = ["선택하세요", "🔍 전체 조회"] + df_raw.sort_values("No")['차량번호'].tolist()
-        selected_car = st.selectbox("조회 대상 선택", car_list)
-
-        if selected_car == "🔍 전체 조회":
-            summary_placeholder = st.empty()
-            my_bar = st.progress(0, text="데이터 취합 중...")
-
-            df_raw['No'] = pd.to_numeric(df_raw['No'], errors='coerce').fillna(999)
-            sorted_df = df_raw.sort_values(by="No", ascending=True)
-
-            total_cars = len(sorted_df)
-            err_map = {"cp": [], "p": [], "t": [], "v": [], "r": []}
-
-            col_setup = {
-                "SensorID": st.column_config.TextColumn("센서ID", width='small'),
-                "냉간공기압": st.column_config.TextColumn("냉간(공기압)", width='small'),
-                "공기압": st.column_config.TextColumn("공기압", width='small'),
-                "전압": st.column_config.TextColumn("전압", width='small'),
-                "온도": st.column_config.TextColumn("온도", width='small'),
-                "Success_Rate": st.column_config.TextColumn("수신율", width='small'),
-            }
-
-            for i in range(0, total_cars, 2):
-                cols = st.columns(2)
-                for j in range(2):
-                    if i + j < total_cars:
-                        row = sorted_df.iloc[i + j]
-                        s_no, c_no, f_ver = row.SerialNo, row.차량번호, row.펌웨어버전
-
-                        with cols[j]:
-                            m_data, s_df = get_normal_status_data(target_url, s_no)
-                            if not s_df.empty:
-                                # 데이터 병합 (냉간/수신율)
-                                r_info = st.session_state.rate_cache.get(s_no, ("-", "-", "-", pd.DataFrame()))
-                                total_count = r_info[0]
-                                success_count = r_info[1]
-                                total_rate = r_info[2]
-                                r_df = r_info[3]
-
-                                cold_df = st.session_state.cold_cache.get(s_no, pd.DataFrame())
-
-                                final_df = pd.merge(s_df, r_df[['SensorID', 'Success_Rate', 'Normal_Rate']] if not r_df.empty else pd.DataFrame(columns=['SensorID', 'Success_Rate', 'Normal_Rate']), on="SensorID", how="left")
-                                if not cold_df.empty:
-                                    final_df = pd.merge(final_df, cold_df[["SensorID", "냉간공기압"]], on="SensorID", how="left")
-                                else:
-                                    final_df["냉간공기압"] = "-"
-
-                                final_df = final_df.fillna("-")
-
-                                for _, s_row in final_df.iterrows():
-                                    cp_val = clean_float(s_row.get('냉간공기압'), None)
-                                    if cp_val is not None and cp_val < 100: err_map["cp"].append(c_no)
-                                    p_val = clean_float(s_row.get('공기압'), None)
-                                    if p_val is not None and (p_val < 100 or p_val > 145): err_map["p"].append(c_no)
-                                    t_val = clean_float(s_row.get('온도'), None)
-                                    if t_val is not None and t_val >= 90: err_map["t"].append(c_no)
-                                    v_val = clean_float(s_row.get('전압'), None)
-                                    if v_val is not None and v_val < 2.8: err_map["v"].append(c_no)
-                                    r_val = clean_float(s_row.get('Success_Rate'), None)
-                                    if r_val is not None and r_val <= 50: err_map["r"].append(c_no)
-
-                                # 개별 차량 UI 렌더링
-                                # st.markdown(f"**🚍 {c_no}** ({s_no})")
-                                c1, c2, c3, c4 = st.columns(4)
-                                with c1:
-                                    st.markdown(f"**🚍 {c_no} ({s_no})**")
-                                with c2:
-                                    st.markdown(f"({f_ver})")
-                                with c3:
-                                    dev_url = f"{target_url.rstrip('/')}/normal/list/{s_no}"
-                                    st.link_button("🔗 Dev 페이지", dev_url, use_container_width=True)
-                                with c4:
-                                    map_url = f"{target_url.rstrip('/')}/map/list/{s_no}"
-                                    st.link_button("🗺️ 주행 경로 지도", map_url, use_container_width=True)
-
-                                st.info(f"🕒 수집: {m_data.get('수집시간', '-')} | 📊 **전체 수신율: {total_rate}% ({success_count}/{total_count})")
-                                display_df = final_df[["SensorID", "냉간공기압", "공기압", "전압", "온도", "Success_Rate"]]
-                                styled_res = display_df.style.map(lambda x: get_sensor_style(x, "공기압"), subset=['공기압']) \
-                                                    .map(lambda x: get_sensor_style(x, "냉간공기압"), subset=['냉간공기압']) \
-                                                    .map(lambda x: get_sensor_style(x, "전압"), subset=['전압']) \
-                                                    .map(lambda x: get_sensor_style(x, "온도"), subset=['온도']) \
-                                                    .map(lambda x: get_sensor_style(x, "Success_Rate"), subset=['Success_Rate'])
-                                st.dataframe(styled_res, width="stretch", hide_index=True, column_config=col_setup)
-                my_bar.progress((i + 1) / total_cars)
-            my_bar.empty()
+with st.sidebar.expander("🔄 자동 갱신 주기"):
+    for _panel, _label in REFRESH_PANELS.items():
+        st.number_input(f"{_label} (초)", min_value=0, max_value=3600, value=0, step=30, key=f"refresh_{_panel}",
+                        help="0이면 자동 갱신하지 않습니다. 해당 구역만 다시 조회/렌더링합니다.")
 
-            with summary_placeholder.container():
-                st.markdown("### 🚨 점검 필요 차량 요약")
-                sum_cols = st.columns(5)
-                labels = ["❄️ 냉간", "🎈 공기압", "🔥 온도", "🔋 전압", "📡 수신율"]
-                keys = ["cp", "p", "t", "v", "r"]
-
-                for col, label, key in zip(sum_cols, labels, keys):
-                    unique_cars = sorted(list(set(err_map[key])))
-                    col.markdown(f"**{label} ({len(unique_cars)})**")
-                    if unique_cars:
-                        col.text_area(label, "\n".join(unique_cars), height=100, label_visibility="collapsed", key=f"err_{key}")
-                    else:
-                        col.write("✅ 정상")
-
-        elif selected_car != "선택하세요":
-            s_no = df_raw[df_raw['차량번호'] == selected_car]['SerialNo'].values[0]
-            with st.spinner(f"{selected_car} 데이터 분석 중..."):
-                m_data, s_df = get_normal_status_data(target_url, s_no)
-                if s_no in st.session_state.rate_cache:
-                    total_count, success_count, total_rate, r_df = st.session_state.rate_cache[s_no]
-                else:
-                    total_count, success_count, total_rate, r_df = "-", "-", "-", pd.DataFrame()
-
-                if m_data:
-                    # 상단 정보 카드
-                    st.info(f"🛰️ 통신기({s_no}) 정보 | 🕒 수집: {m_data.get('수집시간', '-')} | 📍 위치: {m_data.get('위치', '-')} | 📊 전체 수신율: {total_rate}% ({success_count}/{total_count})")
-                    map_url = f"{target_url.rstrip('/')}/map/list/{s_no}"
+def refresh_interval(panel):
+    """구역별 자동 갱신 주기 (초), 0이면 None"""
+    return st.session_state.get(f"refresh_{panel}") or None
+
+# --- 메인 화면 렌더링 ---
+# 화면 구역마다 fragment로 나누어 위젯 조작은 그 구역만 다시 실행하고, 자동 갱신도 구역별 주기로 따로 돕니다.
+# 전체 재실행은 사이드바 설정(서버/날짜/동시 요청 수/갱신 주기)을 바꾸거나 분석 작업이 끝났을 때만 일어납니다.
+df_raw = fetch_devices(target_url)
+
+def join_sweeps(vehicle_frames, rate_sensors, cold_table):
+    """{SerialNo: 센서 대표값}을 긴 표 하나로 만들고 수신율/냉간 결과를 한 번에 붙임 (결과가 없으면 NaN)"""
+    return join_fleet(fleet_snapshot(vehicle_frames), rate_sensors, cold_table)
+
+def flag_vehicles(fleet_df, car_by_serial, rules):
+    """전체 차량 긴 표를 한 번에 판정해 (crit, warn, {요약 key: 차량번호 집합}) 반환"""
+    crit, warn, summary = evaluate_thresholds(fleet_df, rules)
+    flags = {key: {car_by_serial[s_no] for s_no in fleet_df.loc[summary[key], "SerialNo"].unique()}
+             for key in SUMMARY_KEYS}
+    return crit, warn, flags
+
+ROUTE_COLORS = {0: [40, 167, 69, 200], 1: [255, 193, 7, 220], 2: [220, 53, 69, 230]}  # 정상 / 주의 / 위험
+
+def show_route(day_series, rules):
+    """하루 주행 경로 (헤더 GPS를 단순화한 선 + 측정 시점의 가장 나쁜 타이어 판정 색)"""
+    st.write("🗺️ **주행 경로**")
+    points = route_points(day_series, rules)
+    if points.empty:
+        st.caption("GPS 기록이 없습니다.")
+        return
+    tolerance = st.select_slider("경로 단순화 허용 오차 (m)", [0, 5, 15, 30, 60, 120], value=ROUTE_TOLERANCE_M,
+                                 help="원래 경로에서 이 거리 안쪽으로만 벗어나는 점은 생략합니다. 판정 등급이 바뀌는 지점은 항상 남깁니다.")
+    render_t0 = time.perf_counter()
+    route = simplify_route(points, tolerance)
+    import pydeck as pdk  # 경로를 그릴 때만 불러옵니다.
+
+    dots = pd.DataFrame({"lat": route["위도"].astype(float), "lon": route["경도"].astype(float),
+                         "time": route["Time"].dt.strftime('%H:%M:%S'), "level": route["등급"].map(ROUTE_LEVELS),
+                         "color": route["등급"].map(ROUTE_COLORS)})
+    layers = [
+        pdk.Layer("PathLayer", [{"path": dots[["lon", "lat"]].values.tolist()}], get_path="path",
+                  get_color=[110, 110, 110, 160], width_min_pixels=2),
+        pdk.Layer("ScatterplotLayer", dots, get_position=["lon", "lat"], get_fill_color="color",
+                  radius_min_pixels=3, radius_max_pixels=8, pickable=True),
+    ]
+    view = pdk.ViewState(latitude=dots["lat"].mean(), longitude=dots["lon"].mean(), zoom=12)
+    st.pydeck_chart(pdk.Deck(layers=layers, initial_view_state=view, tooltip={"text": "{time} {level}"}))
+    counts = route["등급"].value_counts()
+    st.caption(f"측정 {len(points)}지점 → 표시 {len(route)}지점 · "
+               + " · ".join(f"{name} {counts.get(lv, 0)}" for lv, name in ROUTE_LEVELS.items()))
+    get_metrics().observe("render", "route", time.perf_counter() - render_t0)
+
+@st.fragment(run_every=refresh_interval("summary"))
+def fleet_summary_panel():
+    """🚨 점검 필요 차량 요약 (그리드와 따로 갱신, 차량별 수집 결과는 캐시를 함께 씀)"""
+    target_date = search_date.strftime('%Y-%m-%d')
+    (rate_sensors, _), cold_table = sweep_table("rate"), sweep_table("cold")
+    serials = df_raw["SerialNo"].tolist()
+    normal = fetch_all(lambda s_no: cached_normal_status(target_url, s_no, target_date), serials, max_workers)
+    fleet_df = join_sweeps({s_no: s_df for s_no, (_, s_df) in zip(serials, normal)}, rate_sensors, cold_table)
+    err_map = {key: set() for key in SUMMARY_KEYS}
+    if not fleet_df.empty:
+        _, _, err_map = flag_vehicles(fleet_df, dict(zip(df_raw["SerialNo"], df_raw["차량번호"])),
+                                      get_threshold_rules(target_url))
+    show_fleet_summary(err_map)
+
+@st.fragment(run_every=refresh_interval("grid"))
+def fleet_grid():
+    """전체 차량 카드 그리드 (수집이 끝나는 순서대로 채움)"""
+    summary_placeholder = st.empty()  # 수집 중에만 쓰는 임시 요약 (완료 후에는 fleet_summary_panel이 표시)
+    my_bar = st.progress(0, text="화면 구성 중...")
+
+    sorted_df = df_raw.assign(No=pd.to_numeric(df_raw['No'], errors='coerce').fillna(999)).sort_values(by="No", ascending=True)
+    (rate_sensors, rate_totals), cold_table = sweep_table("rate"), sweep_table("cold")
+
+    total_cars = len(sorted_df)
+    err_map = {key: set() for key in SUMMARY_KEYS}
+    car_by_serial = dict(zip(sorted_df["SerialNo"], sorted_df["차량번호"]))
+    rules = get_threshold_rules(target_url)
+
+    col_setup = {
+        "SensorID": st.column_config.TextColumn("센서ID", width='small'),
+        "냉간공기압": st.column_config.Column("냉간(공기압)", width='small'),
+        "공기압": st.column_config.Column("공기압", width='small'),
+        "전압": st.column_config.Column("전압", width='small'),
+        "온도": st.column_config.Column("온도", width='small'),
+        "Success_Rate": st.column_config.Column("수신율", width='small'),
+    }
+
+    render_t0 = time.perf_counter()
+    # 1) 차량 카드 자리를 No 순서로 먼저 배치하고
+    cards = {}
+    for i in range(0, total_cars, 2):
+        cols = st.columns(2)
+        for j in range(2):
+            if i + j < total_cars:
+                row = sorted_df.iloc[i + j]
+                cards[row.SerialNo] = (cols[j].empty(), row.차량번호, row.펌웨어버전)
+                cards[row.SerialNo][0].caption(f"⏳ {row.차량번호} ({row.SerialNo}) 수집 중...")
+    with summary_placeholder.container():
+        show_fleet_summary(err_map, final=False)
+
+    # 2) 수집이 끝나는 순서대로, 그 시점까지 끝난 차량을 묶어 판정하고 카드를 채웁니다.
+    done_cars, last_draw = 0, 0.0
+    target_date = search_date.strftime('%Y-%m-%d')
+    for batch in iter_completed(lambda s_no: cached_normal_status(target_url, s_no, target_date),
+                                sorted_df["SerialNo"], max_workers):
+        master, vehicle_frames = {}, {}
+        for s_no, (m_data, s_df) in batch:
+            if s_df.empty:
+                cards[s_no][0].empty()
+                continue
+            master[s_no], vehicle_frames[s_no] = m_data, s_df
+        done_cars += len(batch)
+        my_bar.progress(done_cars / total_cars, text=f"수집 {done_cars}/{total_cars}")
+        if not vehicle_frames: continue
+
+        # 묶음 안의 차량은 긴 표 하나로 합쳐 한 번에 결합/판정합니다.
+        fleet_df = join_sweeps(vehicle_frames, rate_sensors, cold_table)
+        crit, warn, flags = flag_vehicles(fleet_df, car_by_serial, rules)
+        for key in SUMMARY_KEYS:
+            err_map[key].update(flags[key])
+
+        for s_no, rows in fleet_df.groupby("SerialNo", observed=True, sort=False).groups.items():
+            placeholder, c_no, f_ver = cards[s_no]
+            with placeholder.container():
+                # 개별 차량 UI 렌더링
+                c1, c2, c3, c4 = st.columns(4)
+                with c1:
+                    st.markdown(f"**🚍 {c_no} ({s_no})**")
+                with c2:
+                    st.markdown(f"({f_ver})")
+                with c3:
                     dev_url = f"{target_url.rstrip('/')}/normal/list/{s_no}"
-                    # st.link_button("Dev 페이지", dev_url, use_container_width=True, type="primary")
-                    # st.link_button("🗺️ 주행 경로 지도", map_url, use_container_width=True, type="primary")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.link_button("🔗 Dev 페이지", dev_url, use_container_width=True, type="primary")
-                    with col2:
-                        st.link_button("🗺️ 주행 경로 지도", map_url, use_container_width=True, type="primary")
-
-                    if not s_df.empty:
-                        # 센서 ID 타입 정제
-                        s_df['SensorID'] = s_df['SensorID'].astype(str).str.strip()
-
-                        # 데이터 병합: 실시간 + 수신율
-                        if not r_df.empty:
-                            r_df['SensorID'] = r_df['SensorID'].astype(str).str.strip()
-                            final_df = pd.merge(s_df, r_df[['SensorID', 'Success_Rate', 'Normal_Rate']], on="SensorID", how="left")
-                        else:
-                            final_df = s_df.copy()
-                            final_df["Success_Rate"] = "-"
-                            final_df["Normal_Rate"] = "-"
-
-                        # 데이터 병합: 냉간 공기압 (캐시 확인)
-                        cold_df = st.session_state.cold_cache.get(s_no, pd.DataFrame())
-                        if not cold_df.empty:
-                            cold_df['SensorID'] = cold_df['SensorID'].astype(str).str.strip()
-                            final_df = pd.merge(final_df, cold_df[["SensorID", "냉간공기압", "냉간계측시간"]], on="SensorID", how="left")
-                        else:
-                            final_df["냉간공기압"] = "-"
-                            final_df["냉간계측시간"] = "-"
-
-                        # 결측치 처리 및 정렬
-                        final_df = final_df.fillna("-")
-
-                        # 화면 표시용 컬럼 정리
-                        display_df = final_df[["SensorID", "냉간공기압", "공기압", "전압", "온도", "Success_Rate", "냉간계측시간"]]
-
-                        # 스타일 적용
-                        styled_df = (display_df.style
-                            .map(lambda x: get_sensor_style(x, "공기압"), subset=['공기압'])
-                            .map(lambda x: get_sensor_style(x, "냉간공기압"), subset=['냉간공기압'])
-                            .map(lambda x: get_sensor_style(x, "전압"), subset=['전압'])
-                            .map(lambda x: get_sensor_style(x, "온도"), subset=['온도'])
-                            .map(lambda x: get_sensor_style(x, "Success_Rate"), subset=['Success_Rate']))
-
-                        st.write(f"📊 **{selected_car} 타이어별 상세 데이터**")
+                    st.link_button("🔗 Dev 페이지", dev_url, use_container_width=True)
+                with c4:
+                    map_url = f"{target_url.rstrip('/')}/map/list/{s_no}"
+                    st.link_button("🗺️ 주행 경로 지도", map_url, use_container_width=True)
+
+                st.info(f"🕒 수집: {master[s_no].get('수집시간', '-')} | 📊 **전체 수신율: {rate_caption(rate_totals, s_no)}{sweep_notes(s_no)}")
+                display_df = fleet_df.loc[rows, ["SensorID", "냉간공기압", "공기압", "전압", "온도", "Success_Rate"]]
+                styled_res = style_sensor_table(display_df, crit.loc[rows], warn.loc[rows])
+                st.dataframe(styled_res, width="stretch", hide_index=True, column_config=col_setup)
+        if time.perf_counter() - last_draw >= STREAM_REDRAW_SECONDS:
+            with summary_placeholder.container():
+                show_fleet_summary(err_map, final=False)
+            last_draw = time.perf_counter()
+    my_bar.empty()
+    summary_placeholder.empty()
+    get_metrics().observe("render", "fleet_grid", time.perf_counter() - render_t0)
+
+@st.fragment(run_every=refresh_interval("detail"))
+def vehicle_detail(selected_car):
+    """선택한 차량의 상세 데이터와 하루 추이"""
+    render_t0 = time.perf_counter()
+    (rate_sensors, rate_totals), cold_table = sweep_table("rate"), sweep_table("cold")
+    s_no = df_raw[df_raw['차량번호'] == selected_car]['SerialNo'].values[0]
+    if POLL_ENABLED: get_poll_scheduler(target_url).mark_viewed(s_no)  # 보고 있는 차량은 백그라운드에서도 더 자주 갱신
+    with st.spinner(f"{selected_car} 데이터 분석 중..."):
+        m_data, s_df = get_normal_status_data(target_url, s_no, search_date.strftime('%Y-%m-%d'))
+
+        if m_data:
+            # 상단 정보 카드
+            st.info(f"🛰️ 통신기({s_no}) 정보 | 🕒 수집: {m_data.get('수집시간', '-')} | 📍 위치: {m_data.get('위치', '-')} | 📊 전체 수신율: {rate_caption(rate_totals, s_no)}{sweep_notes(s_no)}")
+            map_url = f"{target_url.rstrip('/')}/map/list/{s_no}"
+            dev_url = f"{target_url.rstrip('/')}/normal/list/{s_no}"
+            # st.link_button("Dev 페이지", dev_url, use_container_width=True, type="primary")
+            # st.link_button("🗺️ 주행 경로 지도", map_url, use_container_width=True, type="primary")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.link_button("🔗 Dev 페이지", dev_url, use_container_width=True, type="primary")
+            with col2:
+                st.link_button("🗺️ 주행 경로 지도", map_url, use_container_width=True, type="primary")
+
+            if not s_df.empty:
+                # 데이터 병합: 실시간 + 수신율 + 냉간 공기압 (공유 전체 조회 표에서, 없는 값은 NaN)
+                final_df = join_sweeps({s_no: s_df}, rate_sensors, cold_table)
+
+                # 화면 표시용 컬럼 정리
+                display_df = final_df[["SensorID", "냉간공기압", "공기압", "전압", "온도", "Success_Rate", "냉간계측시간"]]
+
+                # 스타일 적용
+                crit, warn, _ = evaluate_thresholds(display_df, get_threshold_rules(target_url))
+                styled_df = style_sensor_table(display_df, crit, warn)
+
+                st.write(f"📊 **{selected_car} 타이어별 상세 데이터**")
+                st.dataframe(
+                    styled_df,
+                    width="stretch",
+                    hide_index=True,
+                    column_config={
+                        "SensorID": st.column_config.TextColumn("센서 ID"),
+                        "냉간공기압": st.column_config.Column("❄️ 냉간(공기압)"),
+                        "공기압": st.column_config.Column("🎈 공기압(PSI)"),
+                        "전압": st.column_config.Column("🔋 전압(V)"),
+                        "온도": st.column_config.Column("🔥 온도(℃)"),
+                        "Success_Rate": st.column_config.Column("📡 수신율"),
+                        "냉간계측시간": st.column_config.Column("🕒 냉간 측정시점")
+                    }
+                )
+
+                # 하루치 시계열 요약 (추가 요청 없이 캐시된 시계열에서 계산)
+                _, day_series = get_normal_series(target_url, s_no, search_date.strftime('%Y-%m-%d'))
+                if not day_series.empty:
+                    st.write(f"📈 **{search_date.strftime('%Y-%m-%d')} 센서별 추이**")
+                    trend_col = st.radio("추이 항목", ["공기압", "온도", "전압"], horizontal=True, label_visibility="collapsed")
+                    trend_df = sensor_trend_stats(day_series, trend_col)
+                    if not trend_df.empty:
                         st.dataframe(
-                            styled_df,
+                            trend_df,
                             width="stretch",
                             hide_index=True,
                             column_config={
                                 "SensorID": st.column_config.TextColumn("센서 ID"),
-                                "냉간공기압": st.column_config.TextColumn("❄️ 냉간(공기압)"),
-                                "공기압": st.column_config.TextColumn("🎈 공기압(PSI)"),
-                                "전압": st.column_config.TextColumn("🔋 전압(V)"),
-                                "온도": st.column_config.TextColumn("🔥 온도(℃)"),
-                                "Success_Rate": st.column_config.TextColumn("📡 수신율"),
-                                "냉간계측시간": st.column_config.TextColumn("🕒 냉간 측정시점")
+                                "최소": st.column_config.NumberColumn("최소", format="%.1f"),
+                                "최대": st.column_config.NumberColumn("최대", format="%.1f"),
+                                "최근": st.column_config.NumberColumn("최근", format="%.1f"),
+                                "추이": st.column_config.LineChartColumn(f"{trend_col} 추이"),
                             }
                         )
+                    show_route(day_series, get_threshold_rules(target_url))
+
+                # 하단 가이드라인
+                with st.expander("💡 데이터 판정 기준"):
+                    st.write("""
+                    - **공기압**: 100 PSI 미만(저압 경고), 145 PSI 초과(고압 주의)
+                    - **전압**: 2.8V 미만(배터리 교체 필요)
+                    - **온도**: 90℃ 이상(과열 위험)
+                    - **수신율**: 50% 이하(통신 환경 점검 필요)
+                    """)
+            else:
+                st.warning(f"⚠️ 현재 수집된 실시간 센서 데이터가 없습니다.")
+        else:
+            st.error(f"❌ 서버에서 차량 데이터를 불러올 수 없습니다. 통신 상태를 확인하세요.")
+    get_metrics().observe("render", "detail", time.perf_counter() - render_t0)
+
+@st.fragment
+def monitor_tab():
+    """상세 모니터링 탭 (조회 대상을 바꾸면 이 탭만 다시 그림)"""
+    st.subheader("🚍 상세 데이터 모니터링")
+    car_list = ["선택하세요", "🔍 전체 조회"] + df_raw.sort_values("No")['차량번호'].tolist()
+    selected_car = st.selectbox("조회 대상 선택", car_list)
+
+    if selected_car == "🔍 전체 조회":
+        summary_slot = st.container()  # 요약은 그리드 위에 표시하되 그리드 수집이 끝난 뒤 계산
+        fleet_grid()
+        with summary_slot:
+            fleet_summary_panel()
+    elif selected_car != "선택하세요":
+        vehicle_detail(selected_car)
+
+@st.fragment(run_every=refresh_interval("rfm"))
+def rfm_panel():
+    """RFM 통신 상태 (자동 갱신 시 이 표만 다시 조회)"""
+    render_t0 = time.perf_counter()
+    st.write("### 🚍 실시간 RFM 통신 상태")
+    if all_depots:
+        # 차고지별 조회를 동시에 시작하고, 끝나는 순서대로 합쳐서 다시 그립니다.
+        scans = start_depot_scans(url_options, max_workers)
+        label_of = {fut: label for label, (fut, _) in scans.items()}
+        frames, depot_status = {}, {label: "⏳ 수집 중" for label in scans}
+        view = st.empty()
+        with view.container():
+            show_rfm_status(pd.DataFrame(), depot_summary(frames, depot_status))
+        try:
+            for fut in as_completed(label_of, timeout=DEPOT_WAIT_SECONDS):
+                label = label_of[fut]
+                frames[label] = fut.result()
+                elapsed = time.time() - scans[label][1]
+                depot_status[label] = f"✅ {elapsed:.1f}초" if not frames[label].empty else "❌ 응답 없음"
+                with view.container():
+                    show_rfm_status(combine_depots(frames), depot_summary(frames, depot_status))
+        except TimeoutError:
+            for label in scans:
+                if label not in frames:
+                    depot_status[label] = f"🐢 {DEPOT_WAIT_SECONDS}초 초과 (다음 갱신에 반영)"
+            with view.container():
+                show_rfm_status(combine_depots(frames), depot_summary(frames, depot_status))
+    else:
+        # 차량 목록을 먼저 그리고, Line Status가 끝나는 순서대로 채워 넣습니다.
+        view = st.empty()
+        r_map, last_draw = {}, 0.0
+        for batch in iter_completed(lambda s_no: cached_line_status(target_url, s_no), df_raw["SerialNo"], max_workers):
+            r_map.update(batch)
+            if time.perf_counter() - last_draw >= STREAM_REDRAW_SECONDS:
+                with view.container():
+                    show_rfm_status(device_status_frame(df_raw, r_map))
+                last_draw = time.perf_counter()
+        with view.container():
+            show_rfm_status(device_status_frame(df_raw, r_map))
+    get_metrics().observe("render", "rfm_table", time.perf_counter() - render_t0)
+
+@st.fragment
+def trend_tab():
+    """기간 추세 분석 탭"""
+    render_t0 = time.perf_counter()
+    st.write("### 📈 기간 추세 분석")
+    period = st.radio("조회 기간", [7, 30, 90], format_func=lambda d: f"최근 {d}일", horizontal=True)
+    days = past_days(search_date, period)
+    st.caption(f"{days[0]} ~ {days[-1]} (조회 날짜 전날까지, 로컬 이력 기준)")
+
+    missing = missing_history(target_url, df_raw["SerialNo"].tolist(), days)
+    hist_job = st.session_state.jobs.get("history")
+    if missing:
+        m1, m2 = st.columns([3, 1])
+        m1.warning(f"⚠️ 아직 저장되지 않은 차량-일 {len(missing)}건이 있습니다. 한 번 수집하면 다시 요청하지 않습니다.")
+        if m2.button("📚 누락 이력 수집", use_container_width=True, disabled=hist_job is not None and hist_job.running):
+            st.session_state.jobs["history"] = FleetJob(lambda item: collect_vehicle_day(target_url, *item),
+                                                        missing, {}, max_workers)
+            st.rerun()
+
+    hist = load_history(target_url, days)
+    if hist.empty:
+        st.info("저장된 이력이 없습니다. 누락 이력을 먼저 수집하세요.")
+    else:
+        car_by_serial = dict(zip(df_raw["SerialNo"], df_raw["차량번호"]))
+        h1, h2, h3 = st.columns(3)
+        h1.metric("이력 일수", f"{hist['Date'].nunique()}일")
+        h2.metric("차량 수", f"{hist['SerialNo'].nunique()}대")
+        h3.metric("센서-일 레코드", f"{len(hist):,}건")
+
+        daily = hist.groupby("Date")[["냉간공기압", "수신율", "전압"]].mean()
+        g1, g2, g3 = st.columns(3)
+        with g1:
+            st.write("❄️ 평균 냉간 공기압")
+            st.line_chart(daily["냉간공기압"], height=200)
+        with g2:
+            st.write("📡 평균 수신율")
+            st.line_chart(daily["수신율"], height=200)
+        with g3:
+            st.write("🔋 평균 전압")
+            st.line_chart(daily["전압"], height=200)
+
+        trend_config = {
+            "차량번호": st.column_config.TextColumn("차량번호"),
+            "SerialNo": st.column_config.TextColumn("SerialNo"),
+            "SensorID": st.column_config.TextColumn("센서 ID"),
+            "일수": st.column_config.NumberColumn("일수"),
+            "첫값": st.column_config.NumberColumn("첫 값", format="%.2f"),
+            "최근값": st.column_config.NumberColumn("최근 값", format="%.2f"),
+            "기울기": st.column_config.NumberColumn("일 변화량", format="%.3f"),
+        }
+        for title, column, limit in (("🎈 서서히 새는 타이어 (냉간 공기압 감소)", "냉간공기압", LEAK_SLOPE_PSI),
+                                     ("🔋 배터리 저하 (전압 감소)", "전압", BATTERY_SLOPE_V)):
+            declines = find_declines(hist, column, limit)
+            st.write(f"**{title} ({len(declines)})**")
+            if declines.empty:
+                st.write("✅ 해당 없음")
+            else:
+                declines.insert(0, "차량번호", declines["SerialNo"].astype(str).map(car_by_serial))
+                st.dataframe(declines, width="stretch", hide_index=True, column_config=trend_config)
+    get_metrics().observe("render", "trend", time.perf_counter() - render_t0)
+
+@st.fragment
+def comm_tab():
+    """통신 품질 분석 탭 (기간 수신율 통계, 저하 순위, 펌웨어버전별 비교)"""
+    render_t0 = time.perf_counter()
+    st.write("### 📶 통신 품질 분석")
+    c1, c2 = st.columns(2)
+    period = c1.radio("분석 기간", [7, 30, 90], index=1, format_func=lambda d: f"최근 {d}일", horizontal=True, key="comm_period")
+    window = c2.select_slider("최근 구간 (일)", [3, 7, 14], value=7, key="comm_window",
+                              help="기간 마지막 날부터 이 일수의 평균을 그 이전 평균과 비교해 저하 순위를 매깁니다.")
+    days = past_days(search_date, period)
+    st.caption(f"{days[0]} ~ {days[-1]} (조회 날짜 전날까지, 수신율 페이지만 수집)")
+
+    hist, missing = load_rate_history(target_url, df_raw["SerialNo"].tolist(), days)
+    rate_job = st.session_state.jobs.get("rate_history")
+    if missing:
+        m1, m2 = st.columns([3, 1])
+        m1.warning(f"⚠️ 아직 조회하지 않은 차량-일 {len(missing)}건이 있습니다. 한 번 조회하면 다시 요청하지 않습니다.")
+        if m2.button("📶 수신율 이력 수집", use_container_width=True, disabled=rate_job is not None and rate_job.running):
+            st.session_state.jobs["rate_history"] = FleetJob(lambda item: get_rate_data(target_url, *item), missing, {},
+                                                             max_workers, is_ok=lambda res: not res[3].empty)
+            st.rerun()
+
+    if hist.empty:
+        st.info("저장된 수신율 이력이 없습니다. 수신율 이력을 먼저 수집하세요.")
+        get_metrics().observe("render", "comm", time.perf_counter() - render_t0)
+        return
+
+    sensors, vehicles, by_fw, daily_fw = comm_quality(hist, df_raw, window)
+    if vehicles.empty:
+        st.info("저장된 이력에 수신율 값이 없습니다. (조회한 날의 수신율 페이지가 모두 비어 있음)")
+        get_metrics().observe("render", "comm", time.perf_counter() - render_t0)
+        return
+    car_by_serial = dict(zip(df_raw["SerialNo"], df_raw["차량번호"]))
+    degraded = vehicles[vehicles["변화"] <= -RATE_DEGRADE_PP]
+    h1, h2, h3, h4 = st.columns(4)
+    h1.metric("이력 일수", f"{hist['Date'].nunique()}일")
+    h2.metric("센서-일 레코드", f"{len(hist):,}건")
+    h3.metric("평균 수신율", f"{vehicles['평균'].mean():.1f}%")
+    h4.metric(f"저하 차량 (-{RATE_DEGRADE_PP}%p 이하)", f"{len(degraded)}대")
+
+    daily = hist.drop_duplicates(["Date", "SerialNo"]).groupby("Date")["전체수신율"].mean()
+    g1, g2 = st.columns(2)
+    with g1:
+        st.write(f"📡 전체 평균 수신율 ({window}일 이동 평균)")
+        st.line_chart(pd.DataFrame({"일 평균": daily, f"{window}일 이동 평균": daily.rolling(window, min_periods=1).mean()}),
+                      height=220)
+    with g2:
+        st.write("🧩 펌웨어버전별 평균 수신율")
+        st.line_chart(daily_fw, height=220)
+
+    pct = {c: st.column_config.NumberColumn(c, format="%.1f") for c in ("평균", "최저", "최근평균", "이전평균", "변화")}
+    st.write("**🧩 펌웨어버전별 비교**")
+    st.dataframe(by_fw, width="stretch", hide_index=True, column_config={
+        **pct, "저하비율": st.column_config.ProgressColumn("저하 비율", min_value=0, max_value=1, format="percent")})
+
+    rank_config = {**pct, "기울기": st.column_config.NumberColumn("일 변화량", format="%.2f"),
+                   "SerialNo": st.column_config.TextColumn("SerialNo"), "SensorID": st.column_config.TextColumn("센서 ID")}
+    top_n = 20
+    st.write(f"**🚌 수신율 저하 차량 (최근 {window}일 - 이전, 상위 {top_n})**")
+    ranked = vehicles.head(top_n)
+    ranked.insert(0, "차량번호", ranked["SerialNo"].astype(str).map(car_by_serial))
+    st.dataframe(ranked, width="stretch", hide_index=True, column_config=rank_config)
+    st.write(f"**📟 수신율 저하 센서 (상위 {top_n})**")
+    ranked = sensors.head(top_n)
+    ranked.insert(0, "차량번호", ranked["SerialNo"].astype(str).map(car_by_serial))
+    st.dataframe(ranked, width="stretch", hide_index=True, column_config=rank_config)
+    get_metrics().observe("render", "comm", time.perf_counter() - render_t0)
+
+@st.fragment
+def diagnostics_tab():
+    """수집/렌더링 진단 탭"""
+    metrics = get_metrics()
+    st.write("### 🔧 수집/렌더링 진단")
+    d1, d2, d3 = st.columns(3)
+    d1.metric("집계 시작", datetime.fromtimestamp(metrics.started_at, seoul_timezone).strftime("%m-%d %H:%M:%S"))
+    d2.metric("HTML 파서", HTML_BACKEND)
+    d3.metric("동시 요청 수", f"{max_workers}")
+
+    st.write("**📡 엔드포인트별 요청**")
+    ep_summary = metrics.summary()
+    if ep_summary.empty:
+        st.info("아직 기록된 요청이 없습니다.")
+    else:
+        st.dataframe(ep_summary, width="stretch", hide_index=True, column_config={
+            "평균(초)": st.column_config.NumberColumn(format="%.3f"),
+            "p50(초)": st.column_config.NumberColumn(format="%.3f"),
+            "p95(초)": st.column_config.NumberColumn(format="%.3f"),
+            "서버 응답(초)": st.column_config.NumberColumn(format="%.3f"),
+            "파싱 평균(초)": st.column_config.NumberColumn(format="%.4f"),
+            "응답 KB": st.column_config.NumberColumn(format="%.1f"),
+            "캐시 적중률": st.column_config.ProgressColumn(min_value=0, max_value=1, format="percent"),
+        })
+
+    kind = st.radio("구간", ["request", "fetch", "parse", "render", "alert"], horizontal=True,
+                    format_func={"request": "네트워크", "fetch": "수집 함수", "parse": "파싱", "render": "화면 구성",
+                                 "alert": "알림 판정"}.get)
+    stage_table, stage_buckets = metrics.kind_summary(kind)
+    if stage_table.empty:
+        st.write("기록 없음")
+    else:
+        k1, k2 = st.columns([2, 3])
+        k1.dataframe(stage_table, width="stretch", hide_index=True, column_config={
+            c: st.column_config.NumberColumn(format="%.4f") for c in ("평균(초)", "p50(초)", "p95(초)")})
+        with k2:
+            st.bar_chart(stage_buckets, height=250)
+
+    st.write("**⛔ 호스트 차단기**")
+    breakers = get_host_breaker().status()
+    if breakers.empty:
+        st.write("기록 없음")
+    else:
+        st.dataframe(breakers, width="stretch", hide_index=True, column_config={
+            "실패 비율": st.column_config.ProgressColumn(min_value=0, max_value=1, format="percent"),
+            "재개까지(초)": st.column_config.NumberColumn(format="%.0f"),
+        })
+
+    st.write("**🤝 공유 결과 저장소** (모든 세션이 함께 쓰는 냉간/수신율 조회)")
+    shared = get_shared_store().status()
+    if shared.empty:
+        st.write("기록 없음")
+    else:
+        st.dataframe(shared, width="stretch", hide_index=True)
+
+    scheduler = get_poll_scheduler(target_url)
+    if not POLL_ENABLED:
+        st.write("**⏱️ 우선순위 폴링** (꺼짐, `SMART_MONITOR_POLL=0`으로 실행됨)")
+    elif not scheduler.leader:
+        st.write("**⏱️ 우선순위 폴링** (다른 프로세스가 이 서버를 폴링 중, 이 프로세스는 대기)")
+    else:
+        st.write(f"**⏱️ 우선순위 폴링** (분당 {POLL_BUDGET_RPM}건 예산, 최근 1분 {len(scheduler.requests)}건 사용)")
+        poll_status = scheduler.status()
+        if poll_status.empty:
+            st.write("기록 없음")
+        else:
+            st.dataframe(poll_status, width="stretch", hide_index=True, column_config={
+                "평균경과": st.column_config.NumberColumn(format="%.0f초"),
+                "최대경과": st.column_config.NumberColumn(format="%.0f초"),
+                "목표주기": st.column_config.NumberColumn(format="%d초"),
+            })
+
+    alert_runner = ("CLI --sweeps alerts 실행 시 판정" if not POLL_ENABLED else
+                    "갱신한 차량마다 판정" if scheduler.leader else "폴링 중인 다른 프로세스가 판정")
+    st.write(f"**🔔 알림** ({alert_runner}, 기록: `{ALERT_LOG_PATH}`)")
+    engine = get_alert_engine(target_url)
+    if engine.last_run:
+        st.caption(" · ".join(f"{k} {v:.3f}" if isinstance(v, float) else f"{k} {v}" for k, v in engine.last_run.items()))
+    active = engine.status()
+    if active.empty:
+        st.write("✅ 활성 알림 없음")
+    else:
+        st.dataframe(active, width="stretch", hide_index=True)
+    if engine.recent:
+        st.dataframe(pd.DataFrame(list(engine.recent)[::-1])[["time", "state", "차량번호", "SensorID", "name", "value"]],
+                     width="stretch", hide_index=True, height=200)
+
+    st.write("**⚠️ 최근 오류**")
+    recent = list(metrics.recent_errors)
+    if recent:
+        st.dataframe(pd.DataFrame(recent[::-1], columns=["시각", "endpoint", "종류", "내용"]),
+                     width="stretch", hide_index=True)
+    else:
+        st.write("✅ 없음")
+
+    st.caption(f"Prometheus textfile: `{PROMETHEUS_TEXTFILE}` ({PROMETHEUS_INTERVAL}초마다 갱신)")
+    b1, b2 = st.columns(2)
+    if b1.button("💾 지금 기록", use_container_width=True):
+        metrics.write_prometheus()
+        st.toast("Prometheus 파일을 기록했습니다.")
+    if b2.button("🧹 계측값 초기화", use_container_width=True):
+        metrics.reset()
+        st.rerun(scope="fragment")
 
-                        # 하단 가이드라인
-                        with st.expander("💡 데이터 판정 기준"):
-                            st.write("""
-                            - **공기압**: 100 PSI 미만(저압 경고), 145 PSI 초과(고압 주의)
-                            - **전압**: 2.8V 미만(배터리 교체 필요)
-                            - **온도**: 90℃ 이상(과열 위험)
-                            - **수신율**: 50% 이하(통신 환경 점검 필요)
-                            """)
-                    else:
-                        st.warning(f"⚠️ 현재 수집된 실시간 센서 데이터가 없습니다.")
-                else:
-                    st.error(f"❌ 서버에서 차량 데이터를 불러올 수 없습니다. 통신 상태를 확인하세요.")
+if not df_raw.empty:
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 상세 모니터링", "📡 통신 상태 요약", "📈 추세 분석", "📶 통신 품질", "🔧 진단"])
 
+    with tab1:
+        monitor_tab()
     with tab2:
-        st.write("### 🚍 실시간 RFM 통신 상태")
-        err_count = len(df_raw[df_raw['is_err']])
-        c1, c2, c3 = st.columns(3)
-        c1.metric("전체 차량", f"{len(df_raw)}대")
-        c2.metric("RFM 이상", f"{err_count}건", delta=err_count, delta_color="inverse")
-        c3.metric("갱신 시간 (KST)", now.strftime("%Y-%m-%d %H:%M:%S"))
-
-        # 2. 메인 통신 상태 테이블
-        df_display = df_raw.sort_values(by=["is_err", "No"], ascending=[False, True])
-        st.dataframe(
-            df_display.style.apply(style_communication, axis=1).map(color_status_text, subset=['상태']),
-            width="stretch",
-            hide_index=True,
-            column_config={
-                "차량번호": st.column_config.TextColumn("차량번호", width="medium"),
-                "SerialNo": st.column_config.TextColumn("통신기 SerialNo", width="medium"),
-                "R0": st.column_config.TextColumn("R0", width="small"),
-                "R1": st.column_config.TextColumn("R1", width="small"),
-                "R2": st.column_config.TextColumn("R2", width="small"),
-                "최근수집": st.column_config.TextColumn("최근 수집 시간", width="medium"),
-                "상태": st.column_config.TextColumn("통신 상태", width="small"),
-                "is_err": None,  # None으로 설정하면 화면에 렌더링되지 않습니다.
-                # "No": None       # 순서 정렬용 No 컬럼도 숨기고 싶다면 추가하세요.
-            }
-        )
+        rfm_panel()
+    with tab3:
+        trend_tab()
+    with tab4:
+        comm_tab()
+    with tab5:
+        diagnostics_tab()
+else:
+    st.error(f"❌ {selected_label}: 차량 목록을 불러올 수 없습니다. 통신 상태를 확인하세요.")
+    if all_depots:
+        rfm_panel()  # 선택한 차고지가 응답하지 않아도 다른 차고지의 통신 상태는 보여 줍니다.
 
 
 # In[ ]:
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""버스 타이어 모니터링 배치 조회 (cron용, streamlit 없이 실행)
+
+서버와 날짜를 정해 차량 목록/냉간 공기압/수신율 전체 조회를 실행하고 CSV/Parquet/JSON으로 저장합니다.
+조회 결과는 대시보드와 같은 결과 캐시(SMART_MONITOR_CACHE_DIR)에 남으므로,
+지난 날짜를 미리 조회해 두면 대시보드에서 해당 날짜를 열 때 다시 요청하지 않습니다.
+(오늘 날짜는 결과 캐시에 TODAY_TTL 동안만 남으므로 미리 채우는 효과가 거의 없습니다.)
+
+알림 판정(alerts)은 --watch로 상주시키는 것을 권장합니다. 한 번씩 실행하면 매번 모든 차량의 오늘 페이지를
+처음부터 받고, 전압 하락처럼 하루 동안의 흐름을 보는 규칙은 상태 파일에 남은 최고 전압에만 의존합니다.
+알림 상태 파일은 잠금 안에서 읽고 쓰므로 대시보드의 우선순위 폴링과 함께 판정해도 같은 알림은
+발생/해제 때 한 번씩만 기록/전송됩니다.
+
+    python smart_monitor_cli.py --date 2026-10-16 --sweeps devices cold rate --format csv parquet --out reports/
+    python smart_monitor_cli.py --sweeps history --days 30 --format json    # 추세 분석 탭의 누락 이력만 채움
+    python smart_monitor_cli.py --sweeps alerts --no-output --quiet --watch 60  # 상주하며 1분마다 알림 판정
+    0 6 * * * cd /srv/smart_monitor && python smart_monitor_cli.py --sweeps cold rate history --quiet
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+# smart_monitor_core는 인자 해석이 끝난 뒤 불러오고, pandas/requests 등은 core가 처음 사용할 때 불러옵니다 (--help는 즉시 응답).
+# 이 순서로 실행합니다. rate가 cold보다 먼저여야 냉간 조회가 수신율 결과의 센서 수로 일찍 끝납니다.
+SWEEPS = ("devices", "rate", "cold", "history", "comm", "alerts")
+FORMATS = ("csv", "parquet", "json")
+
+
+def run_fleet_job(core, func, serials, workers, is_ok, deadline):
+    """FleetJob을 끝까지 기다린 뒤 (결과 dict, 작업) 반환"""
+    results = {}
+    job = core.FleetJob(func, serials, results, workers, is_ok, deadline=deadline)
+    while job.running:
+        time.sleep(0.1)
+    return results, job
+
+
+def sweep_devices(core, base_url, devices, args):
+    r_list = core.fetch_all(lambda s_no: core.get_latest_r_values(base_url, s_no), devices["SerialNo"], args.workers)
+    table = core.device_status_frame(devices, dict(zip(devices["SerialNo"], r_list)))
+    return table, f"RFM 이상 {int(table['is_err'].sum())}대"
+
+
+def sweep_cold(core, base_url, devices, args):
+    results, job = run_fleet_job(core, lambda s_no: core.get_cold_pressure_with_retry(base_url, s_no, args.date),
+                                 devices["SerialNo"].tolist(), args.workers, lambda df: not df.empty, args.deadline)
+    return vehicle_columns(core.cold_fleet_table(results), devices, job), job_note(job)
+
+
+def sweep_rate(core, base_url, devices, args):
+    results, job = run_fleet_job(core, lambda s_no: core.get_rate_data(base_url, s_no, args.date),
+                                 devices["SerialNo"].tolist(), args.workers, lambda res: not res[3].empty, args.deadline)
+    sensors, totals = core.rate_fleet_tables(results)
+    table = sensors.merge(totals, left_on="SerialNo", right_index=True, how="left")
+    return vehicle_columns(table, devices, job), job_note(job)
+
+
+def sweep_history(core, base_url, devices, args):
+    # 조회 날짜까지 포함하되, 아직 끝나지 않은 오늘은 저장하지 않습니다.
+    end = min(date.fromisoformat(args.date) + timedelta(days=1), date.fromisoformat(core.today_str()))
+    days = core.past_days(end, args.days)
+    missing = core.missing_history(base_url, devices["SerialNo"].tolist(), days)
+    _, job = run_fleet_job(core, lambda item: core.collect_vehicle_day(base_url, *item), missing,
+                           args.workers, None, args.deadline)
+    return core.load_history(base_url, days), f"누락 {len(missing)}건 수집" + (f", {job_note(job)}" if missing else "")
+
+
+def sweep_comm(core, base_url, devices, args):
+    # history와 같은 기간의 수신율 페이지만 채우고 센서별 통신 품질 통계(저하 순)를 씁니다.
+    end = min(date.fromisoformat(args.date) + timedelta(days=1), date.fromisoformat(core.today_str()))
+    days = core.past_days(end, args.days)
+    serials = devices["SerialNo"].tolist()
+    _, missing = core.load_rate_history(base_url, serials, days)
+    _, job = run_fleet_job(core, lambda item: core.get_rate_data(base_url, *item), missing,
+                           args.workers, lambda res: not res[3].empty, args.deadline)
+    hist, _ = core.load_rate_history(base_url, serials, days)
+    sensors, vehicles, _, _ = core.comm_quality(hist, devices)
+    note = f"누락 {len(missing)}건 수집" + (f", {job_note(job)}" if missing else "")
+    if not vehicles.empty:
+        note += f", 저하 차량 {int((vehicles['변화'] <= -core.RATE_DEGRADE_PP).sum())}대"
+    return sensors, note
+
+
+def sweep_alerts(core, base_url, devices, args):
+    # --date와 무관하게 오늘 데이터로 한 번 판정합니다. --watch로 반복하면 같은 프로세스의 증분 수집(DeltaPoller)을 씁니다.
+    engine = core.get_alert_engine(base_url)
+    events = engine.evaluate(*core.alert_fleet_frame(base_url, devices, args.workers))
+    return core.pd.DataFrame(events), f"활성 알림 {len(engine.active)}건, 발생/해제 {len(events)}건"
+
+
+def vehicle_columns(table, devices, job):
+    """차량번호와 조회 상태(ok/stale/unavailable)를 앞쪽 컬럼으로 붙임"""
+    if table.empty: return table
+    serials = table["SerialNo"].astype(str)
+    table.insert(1, "차량번호", serials.map(dict(zip(devices["SerialNo"], devices["차량번호"]))))
+    table.insert(2, "조회상태", serials.map(job.status).fillna("ok"))
+    return table
+
+
+def job_note(job):
+    return f"{job.done - job.failed}/{job.total}대 성공" + (f" (실패 {job.failed})" if job.failed else "")
+
+
+def write_table(table, path_base, formats):
+    paths = []
+    for fmt in formats:
+        path = f"{path_base}.{fmt}"
+        if fmt == "csv":
+            table.to_csv(path, index=False, encoding="utf-8-sig")  # 엑셀에서 한글이 깨지지 않도록 BOM 포함
+        elif fmt == "parquet":
+            table.to_parquet(path, index=False)
+        else:
+            table.to_json(path, orient="records", force_ascii=False, date_format="iso", indent=1)
+        paths.append(path)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.splitlines()[1:]))
+    parser.add_argument("--server", help="base_url 또는 서버 이름 (기본: 첫 번째 등록 서버, SMART_MONITOR_BASE_URL 반영)")
+    parser.add_argument("--date", help="조회 날짜 YYYY-MM-DD (기본: 서울 기준 어제)")
+    parser.add_argument("--sweeps", nargs="+", choices=SWEEPS, default=["devices", "cold", "rate"])
+    parser.add_argument("--days", type=int, default=7, help="history/comm: 조회 날짜까지 며칠치 이력을 채울지")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["csv"], dest="formats")
+    parser.add_argument("--out", default="reports", help="출력 디렉터리")
+    parser.add_argument("--no-output", action="store_true", help="파일을 쓰지 않고 결과 캐시만 채움")
+    parser.add_argument("--workers", type=int, default=None, help="동시 요청 수 (기본: DEFAULT_MAX_WORKERS)")
+    parser.add_argument("--deadline", type=float, default=None, help="조회 하나의 시간 예산 (초, 기본: SWEEP_DEADLINE)")
+    parser.add_argument("--quiet", action="store_true", help="요약 외 출력 생략")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="종료하지 않고 이 간격으로 조회를 반복")
+    args = parser.parse_args(argv)
+    try:
+        if args.date: date.fromisoformat(args.date)
+    except ValueError:
+        parser.error(f"--date 형식이 올바르지 않습니다: {args.date}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    import smart_monitor_core as core
+
+    # 서버 날짜는 서울 기준이므로 호스트 시간대(UTC 등)의 date.today()가 아닌 core.today_str()로 계산합니다.
+    args.date = args.date or (date.fromisoformat(core.today_str()) - timedelta(days=1)).isoformat()
+    servers = core.configured_servers()
+    base_url = servers.get(args.server, args.server) if args.server else next(iter(servers.values()))
+    args.workers = args.workers or core.DEFAULT_MAX_WORKERS
+    args.deadline = args.deadline or core.SWEEP_DEADLINE
+    log = (lambda *a: None) if args.quiet else print
+
+    host = (urlparse(base_url).netloc or "server").replace(":", "_")
+    if not args.no_output: os.makedirs(args.out, exist_ok=True)
+    runners = {"devices": sweep_devices, "cold": sweep_cold, "rate": sweep_rate, "history": sweep_history,
+               "comm": sweep_comm, "alerts": sweep_alerts}
+    while True:
+        r0 = time.perf_counter()
+        devices = core.get_device_list(base_url)
+        if devices.empty:
+            print(f"❌ {base_url}: 차량 목록을 불러올 수 없습니다.", file=sys.stderr)
+            if not args.watch: return 2
+        else:
+            log(f"🚌 {base_url} {args.date} 차량 {len(devices)}대 (시작 {time.perf_counter() - t0:.2f}초)")
+            for name in sorted(set(args.sweeps), key=SWEEPS.index):
+                s0 = time.perf_counter()
+                table, note = runners[name](core, base_url, devices, args)
+                paths = [] if args.no_output or table.empty else write_table(table, os.path.join(args.out, f"{name}_{host}_{args.date}"), args.formats)
+                print(f"✅ {name}: {len(table)}행, {note}, {time.perf_counter() - s0:.1f}초" + (f" → {', '.join(paths)}" if paths else ""))
+        if not args.watch: break
+        time.sleep(max(0.0, args.watch - (time.perf_counter() - r0)))
+
+    summary = core.get_metrics().summary()
+    if not summary.empty:
+        log(summary[["endpoint", "요청 수", "p95(초)", "타임아웃", "오류", "캐시 적중률"]].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
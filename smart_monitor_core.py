@@ -0,0 +1,2253 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""버스 타이어 모니터링 수집/파싱/분석 로직 (streamlit 없이 import 가능)
+
+smart_monitor.py(대시보드)와 smart_monitor_cli.py(배치/cron)가 함께 사용합니다.
+결과 캐시, 계측, 커넥션 풀, 차단기 같은 공용 자원은 프로세스마다 하나씩 만들어 모든 세션/스레드가 공유합니다.
+streamlit은 이미 불러온 경우(대시보드 안에서 실행 중일 때)에만 사용하고,
+bs4는 lxml이 없을 때만 불러옵니다.
+pandas/numpy/requests/lxml은 처음 사용할 때 불러오므로 CLI 인자 오류나 캐시만 읽는 실행은 그 비용을 내지 않습니다.
+"""
+import importlib
+import importlib.util
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import cache
+import threading
+import time
+import sys
+import os
+import pickle
+import io
+import json
+import sqlite3
+import operator
+import random
+import pytz
+
+class _LazyModule:
+    """처음 속성에 접근할 때 실제 모듈을 불러와 이 모듈의 전역 이름을 바꿔 끼우는 대리 객체"""
+    def __init__(self, name, alias, on_load=None):
+        self._name, self._alias, self._on_load = name, alias, on_load
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        if globals().get(self._alias) is self:
+            if self._on_load: self._on_load(module)
+            globals()[self._alias] = module
+        return getattr(module, attr)
+
+def _requests_loaded(module):
+    import urllib3  # requests가 함께 불러오므로 추가 비용 없음
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+pd = _LazyModule("pandas", "pd")
+np = _LazyModule("numpy", "np")
+requests = _LazyModule("requests", "requests", on_load=_requests_loaded)
+
+# --- 설정 ---
+seoul_timezone = pytz.timezone('Asia/Seoul')
+SERVERS = {"순천 교통": "https://suncheon-dev.inspirets.co.kr/"}
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+
+def _env_pairs(name, sep):
+    """'키=값<sep>키=값' 형식의 환경변수를 [(키, 값)]으로 (빈 항목/형식 오류 항목은 건너뜀)"""
+    pairs = []
+    for item in os.environ.get(name, "").split(sep):
+        key, eq, value = item.partition("=")
+        if eq and key.strip() and value.strip(): pairs.append((key.strip(), value.strip()))
+    return pairs
+
+def configured_servers():
+    """{표시 이름: base_url}
+
+    차고지 목록은 환경변수로 바꿀 수 있습니다 (코드 수정 없이 차고지 추가).
+      SMART_MONITOR_SERVERS="순천 교통=https://suncheon-dev.inspirets.co.kr/;여수 교통=https://.../"
+        -> 기본 SERVERS 대신 이 목록 (세미콜론으로 구분, 등록 순서대로 표시)
+      SMART_MONITOR_BASE_URL="http://127.0.0.1:8765/,..." -> 로컬 서버만 (bench/standin_server.py 등, 가장 우선)
+    """
+    local_urls = [u.strip() for u in os.environ.get("SMART_MONITOR_BASE_URL", "").split(",") if u.strip()]
+    if local_urls:
+        return {"로컬 서버" if len(local_urls) == 1 else f"로컬 서버 {i + 1}": u for i, u in enumerate(local_urls)}
+    return dict(_env_pairs("SMART_MONITOR_SERVERS", ";")) or dict(SERVERS)
+
+# --- 공용 수집 엔진 (커넥션 풀 + 동시 요청) ---
+DEFAULT_MAX_WORKERS = 8  # inspirets 서버 부하를 고려한 기본 동시 요청 수
+POOL_MAXSIZE = 16        # 호스트당 유지하는 keep-alive 커넥션 상한
+# 호스트(netloc)별 동시 연결 상한, 서버가 약한 차고지만 낮게 등록 (기본 POOL_MAXSIZE)
+# 예: SMART_MONITOR_HOST_CONNECTIONS="suncheon-dev.inspirets.co.kr=4,yeosu.inspirets.co.kr=2"
+HOST_MAX_CONNECTIONS = {host: int(n) for host, n in _env_pairs("SMART_MONITOR_HOST_CONNECTIONS", ",") if n.isdigit() and int(n) > 0}
+
+@cache
+def get_http_session(host=""):
+    """호스트별 keep-alive 세션 (차고지마다 커넥션 풀과 동시 연결 상한이 따로 있음)"""
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.verify = False
+    # pool_block=True: 이 호스트로의 동시 연결이 상한을 넘지 않도록 대기 (다른 차고지 요청은 영향 없음)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HOST_MAX_CONNECTIONS.get(host, POOL_MAXSIZE), pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# 결과 캐시/이력/계측 파일을 두는 로컬 디렉터리
+CACHE_DIR = os.environ.get("SMART_MONITOR_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# --- 계측 (요청 지연/응답 크기/파싱/렌더링/오류/캐시) ---
+PROMETHEUS_TEXTFILE = os.environ.get("SMART_MONITOR_PROM_FILE", os.path.join(CACHE_DIR, "smart_monitor.prom"))
+PROMETHEUS_INTERVAL = 15  # node exporter textfile 갱신 주기 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)
+# 히스토그램 종류: request(네트워크 전체), server(응답 헤더까지), parse(HTML 파싱+추출),
+#                 fetch(수집 함수 전체), render(pandas/Styler 화면 구성), alert(알림 판정 한 번)
+HISTOGRAM_KINDS = ("request", "server", "parse", "fetch", "render", "alert")
+
+class Metrics:
+    """프로세스 전체에서 공유하는 계측값 (모든 세션/워커 스레드가 기록)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.hist = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))  # (kind, label) -> 버킷별 개수
+            self.hist_sum = defaultdict(float)
+            self.bytes = defaultdict(int)       # endpoint -> 응답 바이트 합계
+            self.errors = defaultdict(int)      # (endpoint, 종류) -> 횟수
+            self.cache = defaultdict(int)       # (endpoint, hit|miss) -> 횟수
+            self.retries = defaultdict(int)     # endpoint -> 재시도 횟수
+            self.coalesced = defaultdict(int)   # endpoint -> 진행 중인 같은 요청에 합류한 횟수
+            self.recent_errors = deque(maxlen=50)
+
+    def observe(self, kind, label, seconds):
+        idx = next((i for i, b in enumerate(LATENCY_BUCKETS) if seconds <= b), len(LATENCY_BUCKETS))
+        with self._lock:
+            self.hist[(kind, label)][idx] += 1
+            self.hist_sum[(kind, label)] += seconds
+
+    @contextmanager
+    def timed(self, kind, label):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, label, time.perf_counter() - t0)
+
+    def add_bytes(self, endpoint, n):
+        with self._lock: self.bytes[endpoint] += n
+
+    def add_retry(self, endpoint):
+        with self._lock: self.retries[endpoint] += 1
+
+    def add_coalesced(self, endpoint):
+        with self._lock: self.coalesced[endpoint] += 1
+
+    def quantile(self, kind, label, q, min_samples=1):
+        """기록된 히스토그램의 분위수 (표본이 min_samples보다 적으면 None)"""
+        with self._lock:
+            counts = list(self.hist.get((kind, label), ()))
+        return histogram_quantile(counts, q) if sum(counts) >= min_samples else None
+
+    def cache_result(self, endpoint, hit):
+        with self._lock: self.cache[(endpoint, "hit" if hit else "miss")] += 1
+
+    def record_error(self, endpoint, kind, detail=""):
+        with self._lock:
+            self.errors[(endpoint, kind)] += 1
+            self.recent_errors.append((datetime.now(seoul_timezone).strftime('%H:%M:%S'), endpoint, kind, str(detail)[:200]))
+
+    def record_failure(self, endpoint, exc):
+        """수집 함수에서 잡은 예외 기록 (네트워크 오류는 http_get에서 이미 집계됨)"""
+        if not isinstance(exc, (FetchSkipped, requests.exceptions.RequestException)):
+            self.record_error(endpoint, "parse", f"{type(exc).__name__}: {exc}")
+
+    def summary(self):
+        """엔드포인트별 요약 테이블"""
+        with self._lock:
+            labels = sorted({label for kind, label in self.hist if kind == "request"} |
+                            {ep for ep, _ in self.errors} | {ep for ep, _ in self.cache} | set(self.coalesced))
+            rows = []
+            for ep in labels:
+                req = self.hist.get(("request", ep), [0] * (len(LATENCY_BUCKETS) + 1))
+                n = sum(req)
+                parse = self.hist.get(("parse", ep))
+                hits, misses = self.cache.get((ep, "hit"), 0), self.cache.get((ep, "miss"), 0)
+                rows.append({
+                    "endpoint": ep,
+                    "요청 수": n,
+                    "평균(초)": self.hist_sum.get(("request", ep), 0) / n if n else None,
+                    "p50(초)": histogram_quantile(req, 0.5),
+                    "p95(초)": histogram_quantile(req, 0.95),
+                    "서버 응답(초)": self.hist_sum.get(("server", ep), 0) / n if n else None,
+                    "파싱 평균(초)": self.hist_sum.get(("parse", ep), 0) / sum(parse) if parse and sum(parse) else None,
+                    "응답 KB": self.bytes.get(ep, 0) / 1024,
+                    "타임아웃": self.errors.get((ep, "timeout"), 0),
+                    "재시도": self.retries.get(ep, 0),
+                    "요청 합류": self.coalesced.get(ep, 0),
+                    "오류": sum(v for (e, k), v in self.errors.items() if e == ep and k != "timeout"),
+                    "캐시 적중률": hits / (hits + misses) if hits + misses else None,
+                })
+        return pd.DataFrame(rows)
+
+    def kind_summary(self, kind):
+        """히스토그램 종류(fetch/parse/render 등)별 label 요약과 버킷 분포"""
+        with self._lock:
+            items = sorted((label, list(c)) for (k, label), c in self.hist.items() if k == kind)
+            sums = {label: self.hist_sum[(kind, label)] for label, _ in items}
+        table = pd.DataFrame([{
+            "label": label,
+            "횟수": sum(c),
+            "평균(초)": sums[label] / sum(c),
+            "p50(초)": histogram_quantile(c, 0.5),
+            "p95(초)": histogram_quantile(c, 0.95),
+        } for label, c in items if sum(c)])
+        buckets = pd.DataFrame({label: c for label, c in items},
+                               index=[f"≤{b}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"])
+        return table, buckets
+
+    def to_prometheus(self):
+        """Prometheus text exposition 형식"""
+        names = {kind: f"smart_monitor_{kind}_duration_seconds" for kind in HISTOGRAM_KINDS}
+        label_key = {"render": "stage", "fetch": "fetcher"}
+        lines = []
+        with self._lock:
+            for kind in HISTOGRAM_KINDS:
+                lines.append(f"# TYPE {names[kind]} histogram")
+                for (k, label), counts in sorted(self.hist.items()):
+                    if k != kind: continue
+                    lk = label_key.get(kind, "endpoint")
+                    cum = 0
+                    for bound, c in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                        cum += c
+                        lines.append(f'{names[kind]}_bucket{{{lk}="{label}",le="{bound}"}} {cum}')
+                    lines.append(f'{names[kind]}_sum{{{lk}="{label}"}} {self.hist_sum[(k, label)]:.6f}')
+                    lines.append(f'{names[kind]}_count{{{lk}="{label}"}} {cum}')
+            lines.append("# TYPE smart_monitor_response_bytes_total counter")
+            for ep, n in sorted(self.bytes.items()):
+                lines.append(f'smart_monitor_response_bytes_total{{endpoint="{ep}"}} {n}')
+            lines.append("# TYPE smart_monitor_errors_total counter")
+            for (ep, kind), n in sorted(self.errors.items()):
+                lines.append(f'smart_monitor_errors_total{{endpoint="{ep}",kind="{kind}"}} {n}')
+            lines.append("# TYPE smart_monitor_retries_total counter")
+            for ep, n in sorted(self.retries.items()):
+                lines.append(f'smart_monitor_retries_total{{endpoint="{ep}"}} {n}')
+            lines.append("# TYPE smart_monitor_coalesced_requests_total counter")
+            for ep, n in sorted(self.coalesced.items()):
+                lines.append(f'smart_monitor_coalesced_requests_total{{endpoint="{ep}"}} {n}')
+            lines.append("# TYPE smart_monitor_cache_requests_total counter")
+            for (ep, result), n in sorted(self.cache.items()):
+                lines.append(f'smart_monitor_cache_requests_total{{endpoint="{ep}",result="{result}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=PROMETHEUS_TEXTFILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)  # node exporter가 반쯤 쓰인 파일을 읽지 않도록
+
+def histogram_quantile(counts, q):
+    """버킷 개수에서 분위수 추정 (버킷 내부는 선형 보간)"""
+    total = sum(counts)
+    if not total: return None
+    target, cum, lower = q * total, 0, 0.0
+    for bound, c in zip(LATENCY_BUCKETS + (None,), counts):
+        if cum + c >= target and c:
+            if bound is None: return lower
+            return lower + (bound - lower) * (target - cum) / c
+        cum += c
+        lower = bound if bound is not None else lower
+    return lower
+
+@cache
+def get_metrics():
+    return Metrics()
+
+@cache
+def start_prometheus_export():
+    """PROMETHEUS_INTERVAL마다 계측값을 textfile로 기록하는 스레드 시작 (대시보드 프로세스에서 한 번만)"""
+    metrics = get_metrics()
+
+    def _export_loop():
+        while True:
+            time.sleep(PROMETHEUS_INTERVAL)
+            try: metrics.write_prometheus()
+            except OSError as e: print(f"⚠️ Prometheus 파일 기록 실패: {e}")
+
+    threading.Thread(target=_export_loop, name="prometheus-textfile", daemon=True).start()
+
+def endpoint_of(url):
+    """URL 경로의 첫 구간 (device / line-status / normal / rate)"""
+    return urlparse(url).path.strip('/').split('/')[0] or "root"
+
+# --- HTML 파서 백엔드 ---
+# lxml이 설치되어 있으면 lxml로 직접 파싱하고, 없으면 BeautifulSoup(html.parser)을 사용합니다.
+# 두 백엔드 모두 같은 HtmlNode 인터페이스(classes / rows / body_rows / cells)를 제공하므로
+# 추출 함수는 백엔드와 무관하게 동일한 레코드를 만듭니다.
+HTML_BACKEND = "lxml" if importlib.util.find_spec("lxml") else "bs4"  # lxml 자체는 첫 파싱 때 불러옴
+
+class _LxmlNode:
+    """lxml 요소(table/tr) 래퍼"""
+    __slots__ = ("el",)
+
+    def __init__(self, el): self.el = el
+
+    @property
+    def classes(self): return (self.el.get("class") or "").split()
+
+    def rows(self):
+        return [_LxmlNode(tr) for tr in self.el.iter("tr")]
+
+    def body_rows(self, skip_header=True):
+        """tbody가 있으면 tbody의 행, 없으면 (헤더 행을 뺀) 전체 행"""
+        tbody = self.el.find(".//tbody")
+        if tbody is not None: return [_LxmlNode(tr) for tr in tbody.iter("tr")]
+        rows = self.rows()
+        return rows[1:] if skip_header else rows
+
+    def cells(self, cls=None):
+        """td 텍스트 목록 (get_text(strip=True)와 동일한 규칙)"""
+        return ["".join(t.strip() for t in td.itertext()) for td in self.el.iter("td")
+                if cls is None or cls in (td.get("class") or "").split()]
+
+class _SoupNode:
+    """BeautifulSoup 태그(table/tr) 래퍼"""
+    __slots__ = ("el",)
+
+    def __init__(self, el): self.el = el
+
+    @property
+    def classes(self): return self.el.get("class", [])
+
+    def rows(self):
+        return [_SoupNode(tr) for tr in self.el.find_all("tr")]
+
+    def body_rows(self, skip_header=True):
+        tbody = self.el.find("tbody")
+        if tbody: return [_SoupNode(tr) for tr in tbody.find_all("tr")]
+        rows = self.rows()
+        return rows[1:] if skip_header else rows
+
+    def cells(self, cls=None):
+        tds = self.el.find_all("td", class_=cls) if cls else self.el.find_all("td")
+        return [td.get_text(strip=True) for td in tds]
+
+def parse_tables(content, *table_classes, encoding=None):
+    """응답 바이트에서 지정한 class를 가진 table만 문서 순서대로 반환
+
+    바이트를 그대로 파서에 넘기므로 응답 전체를 str로 디코딩하지 않습니다.
+    lxml 백엔드는 iterparse로 table이 닫힐 때마다 판정해 대상이 아닌 table의 하위 요소는 바로 버리고,
+    bs4 백엔드는 해당 table 외의 요소를 트리로 만들지 않습니다.
+    셀 텍스트는 cells()를 호출한 행에 대해서만 추출됩니다.
+    """
+    if HTML_BACKEND == "lxml":
+        import lxml.etree
+        tables = []
+        try:
+            for _, el in lxml.etree.iterparse(io.BytesIO(content), events=("end",), tag="table",
+                                              html=True, encoding=encoding):
+                node = _LxmlNode(el)
+                if not table_classes or any(c in node.classes for c in table_classes):
+                    tables.append(node)
+                elif next(el.iterancestors("table"), None) is None:
+                    el.clear()  # 바깥 table이 대상일 수 있는 중첩 table은 남겨 둠
+        except (lxml.etree.XMLSyntaxError, lxml.etree.ParserError, ValueError):
+            pass  # 빈 응답/깨진 문서는 그때까지 찾은 table만 사용
+        return tables
+    else:
+        from bs4 import BeautifulSoup, SoupStrainer  # lxml이 없을 때만 필요
+        parse_only = None
+        if table_classes:
+            def _match(cls):
+                if not cls: return False
+                values = cls.split() if isinstance(cls, str) else cls
+                return any(c in values for c in table_classes)
+            parse_only = SoupStrainer("table", attrs={"class": _match})
+        soup = BeautifulSoup(content, "html.parser", parse_only=parse_only, from_encoding=encoding)
+        tables = [_SoupNode(t) for t in soup.find_all("table")]
+    if table_classes:
+        tables = [t for t in tables if any(c in t.classes for c in table_classes)]
+    return tables
+
+# --- 요청 보호 (마감 시간 / 재시도 / 호스트별 차단기) ---
+HTTP_RETRIES = 2             # 연결 실패와 일시적 5xx만 재시도 (모든 요청이 GET이라 멱등), 응답 지연은 재시도하지 않음
+RETRY_BACKOFF = 0.3          # 재시도 대기 상한의 기준 (초), 시도마다 2배 + full jitter
+RETRY_STATUS = {502, 503, 504}
+ADAPTIVE_TIMEOUT_FACTOR = 4  # endpoint 응답 p95의 몇 배까지 기다릴지 (호출부 timeout이 상한)
+ADAPTIVE_TIMEOUT_MIN = 3.0   # 적응형 타임아웃 하한 (초)
+ADAPTIVE_MIN_SAMPLES = 20    # p95를 믿기 위한 최소 표본 수
+BREAKER_WINDOW = 30          # 차단기가 보는 최근 구간 (초)
+BREAKER_MIN_REQUESTS = 10    # 구간 내 요청이 이보다 적으면 판단하지 않음
+BREAKER_FAILURE_RATIO = 0.5  # 구간 내 실패 비율이 이 이상이면 차단
+BREAKER_COOLDOWN = 30        # 차단 후 시험 요청을 허용하기까지 (초)
+
+class FetchSkipped(Exception):
+    """요청을 보내지 않고 건너뜀 (http_get에서 이미 계측에 기록됨)"""
+
+class DeadlineExceeded(FetchSkipped):
+    """조회 전체의 시간 예산을 다 써서 요청을 보내지 않음"""
+
+class CircuitOpen(FetchSkipped):
+    """호스트 차단기가 열려 있어 요청을 보내지 않음"""
+
+_deadline = threading.local()
+
+@contextmanager
+def deadline_at(expires_at):
+    """이 스레드에서 보내는 요청이 expires_at(time.time() 기준)을 넘기지 않도록 제한 (중첩 시 더 이른 쪽)"""
+    prev = getattr(_deadline, "at", None)
+    _deadline.at = expires_at if prev is None or expires_at is None else min(prev, expires_at)
+    try:
+        yield
+    finally:
+        _deadline.at = prev
+
+def remaining_budget():
+    """현재 스레드의 남은 시간 예산 (초), 예산이 없으면 None"""
+    at = getattr(_deadline, "at", None)
+    return None if at is None else at - time.time()
+
+def request_timeout(endpoint, timeout):
+    """호출부 timeout을 endpoint p95 기반 적응형 값과 남은 예산으로 줄임"""
+    p95 = get_metrics().quantile("request", endpoint, 0.95, ADAPTIVE_MIN_SAMPLES)
+    if p95 is not None:
+        timeout = min(timeout, max(ADAPTIVE_TIMEOUT_MIN, p95 * ADAPTIVE_TIMEOUT_FACTOR))
+    budget = remaining_budget()
+    if budget is not None:
+        if budget <= 0: raise DeadlineExceeded("조회 시간 예산 초과")
+        timeout = min(timeout, budget)
+    return timeout
+
+class HostBreaker:
+    """호스트별 차단기: 최근 구간의 실패 비율이 높으면 BREAKER_COOLDOWN 동안 즉시 실패
+
+    차량 몇 대의 페이지만 응답하지 않는 경우는 비율이 낮아 차단되지 않습니다.
+    냉각 후에는 요청 하나만 시험으로 보내고 성공하면 닫습니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = defaultdict(deque)  # host -> deque[(시각, 성공 여부)]
+        self._opened = {}                  # host -> 차단 시각
+        self._probing = set()
+
+    def check(self, host):
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None: return
+            if time.time() - opened < BREAKER_COOLDOWN or host in self._probing:
+                raise CircuitOpen(f"{host} 차단 중 (최근 실패 비율 높음)")
+            self._probing.add(host)  # 냉각 종료: 이 요청을 시험 요청으로 보냄
+
+    def release(self, host):
+        """시험 요청을 보내지 못했거나 결과를 알 수 없을 때 시험 자리만 돌려줌 (차단 상태는 유지)"""
+        with self._lock:
+            self._probing.discard(host)
+
+    def record(self, host, ok):
+        now_ts = time.time()
+        with self._lock:
+            if host in self._probing:
+                self._probing.discard(host)
+                if ok:
+                    self._opened.pop(host, None)
+                    self._events[host].clear()
+                else:
+                    self._opened[host] = now_ts
+                return
+            events = self._events[host]
+            events.append((now_ts, ok))
+            while events and events[0][0] < now_ts - BREAKER_WINDOW:
+                events.popleft()
+            failures = sum(1 for _, e_ok in events if not e_ok)
+            if (host not in self._opened and len(events) >= BREAKER_MIN_REQUESTS
+                    and failures / len(events) >= BREAKER_FAILURE_RATIO):
+                self._opened[host] = now_ts
+                print(f"⛔ {host}: 실패 {failures}/{len(events)}건, {BREAKER_COOLDOWN}초간 요청 차단")
+
+    def status(self):
+        """진단 화면용 호스트별 상태"""
+        now_ts = time.time()
+        with self._lock:
+            rows = []
+            for host, events in self._events.items():
+                recent = [ok for t, ok in events if t >= now_ts - BREAKER_WINDOW]
+                opened = self._opened.get(host)
+                rows.append({
+                    "host": host,
+                    "상태": "⛔ 차단" if opened is not None else "✅ 정상",
+                    "최근 요청": len(recent),
+                    "실패 비율": (recent.count(False) / len(recent)) if recent else None,
+                    "재개까지(초)": max(0.0, BREAKER_COOLDOWN - (now_ts - opened)) if opened is not None else None,
+                })
+        return pd.DataFrame(rows)
+
+@cache
+def get_host_breaker():
+    return HostBreaker()
+
+def _retry_wait(attempt):
+    """attempt번째 재시도 전 대기 시간, 남은 예산으로 기다릴 수 없으면 None"""
+    delay = random.uniform(0, RETRY_BACKOFF * 2 ** attempt)
+    budget = remaining_budget()
+    return None if budget is not None and budget <= delay else delay
+
+def http_get(url, timeout, endpoint=None, headers=None):
+    """공용 세션으로 GET 요청 (지연/응답 크기/오류를 endpoint별로 기록)
+
+    headers는 요청별 추가 헤더 (조건부 요청의 If-None-Match 등), timeout은 상한이며 endpoint의 최근 응답 시간과 남은 시간 예산에 맞춰 줄어듭니다.
+    연결 실패와 502/503/504는 jitter를 준 지수 대기 후 재시도하고,
+    호스트 차단기가 열려 있으면 요청 없이 CircuitOpen을 던집니다.
+    """
+    endpoint = endpoint or endpoint_of(url)
+    host = urlparse(url).netloc
+    metrics = get_metrics()
+    breaker = get_host_breaker()
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            # 시간 예산을 먼저 확인해야 요청을 보내지 않을 때 차단기의 시험 자리를 잡지 않습니다.
+            req_timeout = request_timeout(endpoint, timeout)
+            breaker.check(host)
+        except (CircuitOpen, DeadlineExceeded) as e:
+            metrics.record_error(endpoint, "circuit" if isinstance(e, CircuitOpen) else "deadline", url)
+            raise
+        t0 = time.perf_counter()
+        try:
+            resp = get_http_session(host).get(url, timeout=req_timeout, headers=headers)
+        except requests.exceptions.RequestException as e:
+            breaker.record(host, False)
+            # 응답 지연(ReadTimeout)은 같은 페이지가 계속 느릴 가능성이 높아 재시도하지 않습니다.
+            retryable = not isinstance(e, requests.exceptions.ReadTimeout)
+            if isinstance(e, requests.exceptions.Timeout):
+                metrics.record_error(endpoint, "timeout", url)
+            else:
+                metrics.record_error(endpoint, "connection", f"{type(e).__name__}: {url}")
+            wait = _retry_wait(attempt) if retryable and attempt < HTTP_RETRIES else None
+            if wait is None: raise
+            metrics.add_retry(endpoint)
+            time.sleep(wait)
+            continue
+        except BaseException:
+            breaker.release(host)
+            raise
+        breaker.record(host, resp.status_code < 500)
+        metrics.observe("request", endpoint, time.perf_counter() - t0)
+        metrics.observe("server", endpoint, resp.elapsed.total_seconds())
+        metrics.add_bytes(endpoint, len(resp.content))
+        if resp.status_code >= 400:
+            metrics.record_error(endpoint, "http", f"{resp.status_code} {url}")
+        if resp.status_code in RETRY_STATUS and attempt < HTTP_RETRIES:
+            wait = _retry_wait(attempt)
+            if wait is not None:
+                metrics.add_retry(endpoint)
+                time.sleep(wait)
+                continue
+        return resp
+
+def worker_ctx_initializer():
+    """대시보드 안에서 호출되면 워커 스레드에서도 st.cache_data 등을 쓸 수 있도록 실행 컨텍스트를 전달하는 initializer
+
+    streamlit을 불러오지 않은 프로세스(CLI 등)에서는 None을 반환합니다.
+    """
+    if "streamlit" not in sys.modules: return None
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return (lambda: add_script_run_ctx(threading.current_thread(), ctx)) if ctx else None
+
+def fetch_all(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """items 각각에 func를 동시에 적용하고 결과를 입력 순서대로 반환"""
+    items = list(items)
+    if not items: return []
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(items))),
+                            initializer=worker_ctx_initializer()) as pool:
+        return list(pool.map(func, items))
+
+def iter_completed(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """items 각각에 func를 동시에 적용하고 끝나는 순서대로 [(item, 결과), ...] 묶음을 차례로 반환
+
+    그 시점까지 끝난 결과를 한 묶음으로 돌려주므로 판정과 화면 갱신을 묶음 단위로 할 수 있습니다.
+    중간에 소비를 멈추면 대기 중인 항목은 취소하고 기다리지 않습니다.
+    """
+    items = list(items)
+    if not items: return
+    pool = ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(items))),
+                              initializer=worker_ctx_initializer())
+    try:
+        pending = {pool.submit(func, item): item for item in items}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield [(pending.pop(f), f.result()) for f in done]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# --- 영구 결과 캐시 (SQLite) ---
+# 지난 날짜의 데이터는 바뀌지 않으므로 만료 없이, 오늘 데이터는 TODAY_TTL 동안만 보관합니다.
+# 빈 결과(서버 지연 업로드/일시 오류로 비어 보일 수 있음)는 지난 날짜라도 EMPTY_TTL 뒤에 다시 조회합니다.
+CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite")
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # 초과 시 오래 사용하지 않은 항목부터 삭제
+TODAY_TTL = 120
+EMPTY_TTL = 600
+CACHE_MISS = object()
+
+class ResultCache:
+    """(서버, 엔드포인트, SerialNo, 날짜, 시간구간) 단위의 파싱 결과 저장소"""
+    def __init__(self, path, max_bytes=CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+            expires_at REAL, accessed_at REAL NOT NULL)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+
+    @staticmethod
+    def make_key(base_url, endpoint, serial_no, target_date, window):
+        return "|".join([base_url.rstrip('/'), endpoint, str(serial_no), str(target_date), window])
+
+    def get(self, key, default=None):
+        """저장된 값, 없거나 만료되었으면 default
+
+        None/빈 결과도 그대로 저장되므로 캐시에 없음을 구분하려면 default에 CACHE_MISS를 넘깁니다.
+        """
+        now_ts = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key=?", (key,)).fetchone()
+            if row is None: return default
+            if row[1] is not None and row[1] < now_ts:
+                self._conn.execute("DELETE FROM results WHERE key=?", (key,))
+                return default
+            self._conn.execute("UPDATE results SET accessed_at=? WHERE key=?", (now_ts, key))
+        return pickle.loads(row[0])
+
+    def put(self, key, value, ttl=None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now_ts = time.time()
+        expires_at = now_ts + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                               (key, blob, len(blob), expires_at, now_ts))
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes: return
+        self._conn.execute("DELETE FROM results WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        excess = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0] - self.max_bytes
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed_at").fetchall():
+            if excess <= 0: break
+            self._conn.execute("DELETE FROM results WHERE key=?", (key,))
+            excess -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+@cache
+def get_result_cache():
+    return ResultCache(CACHE_PATH)
+
+class SingleFlight:
+    """같은 key의 요청이 동시에 들어오면 먼저 시작한 한 번만 실행하고 나머지는 그 결과(또는 예외)를 함께 받음
+
+    모든 세션이 공유하므로 여러 사용자가 같은 (서버, 엔드포인트, SerialNo, 날짜)를 동시에 조회해도 서버에는 한 번만 요청합니다.
+    기다리는 쪽도 자기 스레드의 시간 예산(deadline_at)을 넘기면 DeadlineExceeded로 빠져나옵니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> {"done": Event, "value" | "error"}
+
+    def do(self, key, fn, endpoint="unknown"):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader: call = self._calls[key] = {"done": threading.Event()}
+        if not leader:
+            get_metrics().add_coalesced(endpoint)
+            budget = remaining_budget()
+            if not call["done"].wait(None if budget is None else max(0.0, budget)):
+                raise DeadlineExceeded("조회 시간 예산 초과 (진행 중인 같은 요청 대기)")
+            if "error" in call: raise call["error"]
+            return call["value"]
+        try:
+            call["value"] = fn()
+            return call["value"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock: self._calls.pop(key, None)
+            call["done"].set()
+
+@cache
+def get_single_flight():
+    return SingleFlight()
+
+SWEEP_WINDOWS = {"cold": "06:00-12:00", "rate": "00:00-23:59"}  # 전체 조회 결과의 캐시 key 시간구간
+
+def cached_sweep_results(kind, base_url, serials, target_date):
+    """결과 캐시에 이미 있는 전체 조회(cold/rate) 결과만 {SerialNo: 결과}로 반환 (네트워크 요청 없음)"""
+    cache = get_result_cache()
+    found = {}
+    for s_no in serials:
+        value = cache.get(cache.make_key(base_url, kind, s_no, target_date, SWEEP_WINDOWS[kind]), CACHE_MISS)
+        if value is not CACHE_MISS: found[s_no] = value
+    return found
+
+def today_str():
+    return datetime.now(seoul_timezone).strftime('%Y-%m-%d')
+
+def is_empty_result(value):
+    """파싱 결과가 비었는지 (빈 DataFrame/dict/list, 또는 그런 것만 담은 tuple)"""
+    if isinstance(value, tuple):
+        parts = [v for v in value if isinstance(v, (tuple, dict, list)) or hasattr(v, "empty")]
+        return bool(parts) and all(is_empty_result(v) for v in parts)
+    if isinstance(value, (dict, list)): return not value
+    return bool(getattr(value, "empty", False))
+
+def cache_ttl(target_date, value=None):
+    """지난 날짜는 영구(None), 오늘 이후는 TODAY_TTL, 빈 결과는 날짜와 관계없이 EMPTY_TTL 이내"""
+    ttl = None if str(target_date) < today_str() else TODAY_TTL
+    if value is not None and is_empty_result(value):
+        ttl = EMPTY_TTL if ttl is None else min(ttl, EMPTY_TTL)
+    return ttl
+
+def cached_call(endpoint, base_url, serial_no, target_date, window, loader, metric=None):
+    """캐시에 있으면 반환하고, 없으면 loader() 결과를 저장 (loader 예외는 저장하지 않고 그대로 전달)
+
+    캐시에 없는 같은 key를 여러 스레드/세션이 동시에 요청하면 loader()는 한 번만 실행됩니다.
+
+    metric: 캐시 적중률을 집계할 endpoint 이름 (기본은 endpoint)
+    """
+    cache = get_result_cache()
+    key = cache.make_key(base_url, endpoint, serial_no, target_date, window)
+    value = cache.get(key, CACHE_MISS)
+    get_metrics().cache_result(metric or endpoint, value is not CACHE_MISS)
+    if value is not CACHE_MISS: return value
+
+    def load():
+        value = loader()
+        cache.put(key, value, ttl=cache_ttl(target_date, value))
+        return value
+    return get_single_flight().do(key, load, endpoint=metric or endpoint)
+
+def _parse_line_status(content, encoding=None):
+    tables = parse_tables(content, "sc_table", encoding=encoding)
+    rows = [r for t in tables for r in t.rows()][1:]
+    # 마지막 행의 셀만 텍스트로 변환합니다.
+    return rows[-1].cells("textCenter") if rows else []
+
+NO_LINE_STATUS = {"Date": "N/A", "R0": "-", "R1": "-", "R2": "-"}
+
+def get_latest_r_values(base_url, serial_no, max_age=0):
+    """Line Status 페이지의 마지막 행 (max_age초 이내에 받은 값이 있으면 요청 없이 재사용, LineStatusPoller 참고)"""
+    with get_metrics().timed("fetch", "get_latest_r_values"):
+        return get_line_status_poller().get(base_url, serial_no, max_age)
+
+def get_normal_series(base_url, serial_no, target_date):
+    """하루치 Normal 페이지를 (master_info, 센서 시계열)로 반환 (실패 시 빈 값)
+
+    오늘 날짜는 DeltaPoller가 마지막 수집시간 이후 구간만 받아 누적합니다.
+    """
+    metrics = get_metrics()
+    with metrics.timed("fetch", "get_normal_series"):
+        try:
+            if target_date == today_str():
+                return get_delta_poller().poll(base_url, serial_no, target_date)
+            return cached_call("normal-series", base_url, serial_no, target_date, "00:00-23:59",
+                               lambda: _fetch_normal_series(base_url, serial_no, target_date), metric="normal")
+        except Exception as e:
+            metrics.record_failure("normal", e)
+            return {}, pd.DataFrame()
+
+def get_normal_status_data(base_url, serial_no, target_date):
+    master_info, series = get_normal_series(base_url, serial_no, target_date)
+    return master_info, summarize_latest(series)
+
+def _fetch_normal_series(base_url, serial_no, target_date, start_time="00:00"):
+    url = (f"{base_url.rstrip('/')}/normal/list/{serial_no}?date={target_date}"
+           f"&time_gte={start_time.replace(':', '%3A')}&time_lte=23%3A59")
+    resp = http_get(url, timeout=7)
+    resp.raise_for_status()  # 에러 페이지가 빈 결과로 캐시되지 않도록
+    with get_metrics().timed("parse", "normal"):
+        return parse_normal_series(resp.content, resp.encoding)
+
+def _to_float32(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("float32")
+
+def parse_normal_series(content, encoding=None):
+    """Normal 페이지의 모든 센서 행을 컬럼형 시계열로 변환
+
+    행마다 직전 헤더(table-dark)의 수집시간(Time)/GPS(위도, 경도), Seq, SensorID(범주형),
+    공기압/전압/온도(float32)를 가지며 페이지 순서를 유지합니다.
+    """
+    tables = parse_tables(content, "table-dark", "table-sm", encoding=encoding)
+
+    master_info = {}
+    current_time = current_lat = current_lon = None
+    times, lats, lons, seqs, ids, psi, volt, temp = [], [], [], [], [], [], [], []
+    for table in tables:
+        if "table-dark" in table.classes:
+            m_tds = table.rows()[1].cells()
+            current_time, current_lat, current_lon = m_tds[1], m_tds[4], m_tds[5]
+            if not master_info:
+                master_info = {
+                    "수집시간": m_tds[1],
+                    "위치": f"{m_tds[4]}, {m_tds[5]}",
+                    "주행거리": m_tds[10] + " km"
+                }
+            continue
+        if "table-sm" not in table.classes: continue
+        for row in table.body_rows():
+            tds = row.cells()
+            if len(tds) >= 8:
+                times.append(current_time)
+                lats.append(current_lat)
+                lons.append(current_lon)
+                seqs.append(int(tds[0]))
+                ids.append(tds[1])
+                psi.append(tds[3])
+                volt.append(tds[6])
+                temp.append(tds[7])
+
+    series = pd.DataFrame({
+        "Time": pd.to_datetime(pd.Series(times, dtype=object), errors="coerce", format="mixed"),
+        "Seq": pd.Series(seqs, dtype="int32"),
+        "SensorID": pd.Categorical(ids),
+        "공기압": _to_float32(psi),
+        "전압": _to_float32(volt),
+        "온도": _to_float32(temp),
+        "위도": _to_float32(lats),
+        "경도": _to_float32(lons),
+    })
+    return master_info, series
+
+def format_reading(val):
+    """측정값을 페이지에 있던 자릿수 그대로 화면 표시용 문자열로 (결측은 '-')
+
+    반올림하면 2.795V가 '2.8'로 보여 기준(<2.8) 판정과 표시가 어긋나므로 자르지 않습니다.
+    float32에서 온 값(표나 Series에서 꺼내면 float로 바뀜)은 float32 기준 최단 표기로 씁니다.
+    """
+    if pd.isna(val): return "-"
+    val = float(val)
+    single = np.float32(val)
+    return np.format_float_positional(single if float(single) == val else val, trim="-")
+
+def summarize_latest(series):
+    """센서별 대표값: 페이지 순서상 첫 유효(전압>0) 행, 없으면 첫 행 (group-by 한 번)
+
+    공기압/전압/온도는 float32 그대로 두고, '-' 표시는 화면에서 format_reading으로 합니다.
+    """
+    if series.empty: return pd.DataFrame()
+    picked = (series.assign(_invalid=~(series["전압"] > 0))
+              .sort_values("_invalid", kind="stable")
+              .drop_duplicates(subset=["SensorID"])
+              .sort_values("Seq", kind="stable"))
+    out = picked[["SensorID", "공기압", "전압", "온도"]].assign(SensorID=picked["SensorID"].astype(str))
+    return out.reset_index(drop=True)
+
+def sensor_trend_stats(series, column="공기압", max_points=120):
+    """센서별 최소/최대/최근 값과 스파크라인용 추이 목록 (유효 행 기준)"""
+    valid = series[series["전압"] > 0].sort_values("Time", kind="stable")
+    if valid.empty: return pd.DataFrame()
+    step = max(1, len(valid) // (max_points * max(1, valid["SensorID"].nunique())))
+    stats = valid.groupby("SensorID", observed=True)[column].agg(
+        최소="min", 최대="max", 최근="last",
+        추이=lambda s: s.iloc[::step].astype(float).round(2).tolist())
+    return stats.reset_index()
+
+def no_rate():
+    """수신율 조회 실패 시 값 (전체건수, 성공건수, 전체수신율, 센서별 수신율)"""
+    return (float("nan"), float("nan"), float("nan"), pd.DataFrame())
+
+def get_rate_data(base_url, serial_no, target_date):
+    metrics = get_metrics()
+    with metrics.timed("fetch", "get_rate_data"):
+        try:
+            return cached_call("rate", base_url, serial_no, target_date, SWEEP_WINDOWS["rate"],
+                               lambda: _fetch_rate_data(base_url, serial_no, target_date))
+        except (FetchSkipped, requests.exceptions.Timeout) as e:
+            cause = ("호스트 차단 중" if isinstance(e, CircuitOpen) else
+                     "조회 시간 예산 초과" if isinstance(e, DeadlineExceeded) else "서버 응답 시간 초과")
+            print(f"⚠️ {serial_no}: 수신율 조회 실패 ({cause})")
+            metrics.record_failure("rate", e)
+            return no_rate()
+        except Exception as e:
+            print(f"❌ 에러 발생: {e}")
+            metrics.record_failure("rate", e)
+            return no_rate()
+
+def _fetch_rate_data(base_url, serial_no, target_date):
+    url = f"{base_url.rstrip('/')}/rate/list/{serial_no}?date={target_date}&time_gte=00%3A00&time_lte=23%3A59"
+    resp = http_get(url, timeout=20)
+    resp.raise_for_status() # HTTP 에러 발생 시 예외 발생
+    with get_metrics().timed("parse", "rate"):
+        return _parse_rate_page(resp.content, resp.encoding)
+
+def _parse_rate_page(content, encoding=None):
+    """(전체건수, 성공건수, 전체수신율, 센서별 SensorID/Success_Rate/Normal_Rate 표), 수치는 float (없으면 NaN)"""
+    tables = parse_tables(content, "sc_table", encoding=encoding)
+
+    totals = [0, 0, None]
+    if tables:
+        tds = tables[0].cells()
+        if len(tds) >= 4:
+            totals = [tds[0], tds[2], tds[3]]
+    total_count, success_count, total_rate = (float(v) for v in _to_float32(totals))
+
+    sensor_rates = []
+
+    if len(tables) > 1:
+        for row in tables[1].body_rows(skip_header=False):
+            tds = row.cells()
+            if len(tds) >= 8:
+                s_id = tds[1]
+                if not s_id or s_id == "Sensor_Id":
+                    continue
+
+                sensor_rates.append({
+                    "SensorID": s_id,
+                    "Success_Rate": tds[2],
+                    "Normal_Rate": tds[7]
+                })
+
+    r_df = pd.DataFrame(sensor_rates, columns=["SensorID", "Success_Rate", "Normal_Rate"])
+    return total_count, success_count, total_rate, r_df.assign(**to_numeric_frame(r_df, RATE_NUM_COLS))
+
+# --- 오늘 데이터 증분 수집 ---
+DELTA_MIN_INTERVAL = 30  # 같은 차량을 이보다 자주 다시 요청하지 않음 (초)
+
+class DeltaPoller:
+    """차량별로 마지막 수집시간을 기억하고 그 이후 구간만 받아 메모리의 하루치 시계열에 병합
+
+    경계 분(minute)은 양쪽 요청에 모두 포함되므로 (Time, Seq, SensorID) 기준으로 중복을 제거하고,
+    병합 결과는 전체 조회 페이지와 같이 최신 측정이 위에 오도록 Time 내림차순으로 정렬합니다.
+    날짜가 바뀌면 해당 차량의 상태를 새로 시작합니다.
+    """
+    def __init__(self, min_interval=DELTA_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._states = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def poll(self, base_url, serial_no, target_date, force=False):
+        key = (base_url.rstrip('/'), serial_no)
+        with self._lock_for(key):
+            state = self._states.get(key)
+            if state is not None and state["date"] != target_date:
+                state = None
+            if state is not None and not force and time.time() - state["polled_at"] < self.min_interval:
+                return state["master_info"], state["series"]
+
+            if state is None or pd.isna(state["last_time"]):
+                master_info, series = _fetch_normal_series(base_url, serial_no, target_date)
+                state = {"date": target_date, "master_info": master_info, "series": series}
+            else:
+                since = state["last_time"].strftime('%H:%M')
+                master_info, delta = _fetch_normal_series(base_url, serial_no, target_date, start_time=since)
+                if not delta.empty:
+                    state["series"] = self._merge(state["series"], delta)
+                    # 수집시간/위치는 가장 최근 측정의 헤더 기준 (증분 페이지가 더 최근이면 그쪽 값으로)
+                    if master_info and (not state["master_info"] or delta["Time"].max() >= state["last_time"]):
+                        state["master_info"] = master_info
+            state["last_time"] = state["series"]["Time"].max() if not state["series"].empty else pd.NaT
+            state["polled_at"] = time.time()
+            self._states[key] = state
+            return state["master_info"], state["series"]
+
+    @staticmethod
+    def _merge(series, delta):
+        """증분을 앞에 붙여 중복(경계 분)은 새로 받은 행을 남기고, Time 내림차순(같은 시각은 페이지 순서) 정렬"""
+        if series.empty: return delta
+        cats = series["SensorID"].cat.categories.union(delta["SensorID"].cat.categories)
+        merged = pd.concat([df.assign(SensorID=df["SensorID"].cat.set_categories(cats)) for df in (delta, series)],
+                           ignore_index=True)
+        merged = merged.drop_duplicates(subset=["Time", "Seq", "SensorID"], keep="first")
+        return merged.sort_values("Time", ascending=False, kind="stable").reset_index(drop=True)
+
+    def peek(self, base_url, serial_no, target_date):
+        """요청 없이 target_date의 누적 (master_info, 시계열), 없으면 None"""
+        state = self._states.get((base_url.rstrip('/'), serial_no))
+        if state is None or state["date"] != target_date: return None
+        return state["master_info"], state["series"]
+
+    def prune(self, base_url, serials):
+        """차량 목록에서 빠진 차량의 상태를 버림 (차량 교체/폐차 후에도 메모리에 남지 않도록)"""
+        base = base_url.rstrip('/')
+        keep = {str(s) for s in serials}
+        with self._guard:
+            for key in [k for k in self._states if k[0] == base and k[1] not in keep]:
+                self._states.pop(key, None)
+                self._locks.pop(key, None)
+
+@cache
+def get_delta_poller():
+    return DeltaPoller()
+
+class LineStatusPoller:
+    """차량별로 마지막 Line Status 행과 응답 검증값(ETag/Last-Modified)을 기억
+
+    line-status 목록 페이지는 날짜/시간 구간 파라미터가 없어 normal 페이지처럼 이후 구간만 받을 수는 없습니다.
+    대신 서버가 검증값을 주면 조건부 요청을 보내 304(변경 없음)일 때 본문 없이 기억해 둔 행을 쓰고,
+    max_age초 이내에 받은 값은 요청 없이 재사용합니다. 같은 차량의 동시 요청은 SingleFlight로 한 번만 보냅니다.
+    """
+    def __init__(self):
+        self._states = {}  # (base_url, SerialNo) -> {"row", "etag", "modified", "value", "fetched_at"}
+        self._lock = threading.Lock()
+
+    def peek(self, base_url, serial_no):
+        """요청 없이 마지막으로 받은 값 (없으면 None)"""
+        state = self._states.get((base_url.rstrip('/'), serial_no))
+        return state and state["value"]
+
+    def get(self, base_url, serial_no, max_age=0):
+        key = (base_url.rstrip('/'), serial_no)
+        state = self._states.get(key)
+        if state is not None and time.time() - state["fetched_at"] < max_age:
+            return state["value"]
+        return get_single_flight().do("|".join(("line-status",) + key), lambda: self._fetch(key), endpoint="line-status")
+
+    def _fetch(self, key):
+        base, serial_no = key
+        prev = self._states.get(key) or {"row": None, "etag": None, "modified": None}
+        state = {**prev, "value": NO_LINE_STATUS}
+        headers = {}
+        if prev["row"] is not None:
+            if prev["etag"]: headers["If-None-Match"] = prev["etag"]
+            if prev["modified"]: headers["If-Modified-Since"] = prev["modified"]
+        metrics = get_metrics()
+        try:
+            resp = http_get(f"{base}/line-status/list/{serial_no}", timeout=5, headers=headers or None)
+            if resp.status_code == 304 and prev["row"] is not None:
+                state["value"] = prev["row"]
+            else:
+                with metrics.timed("parse", "line-status"):
+                    cols = _parse_line_status(resp.content, resp.encoding)
+                if len(cols) >= 6:
+                    state["row"] = state["value"] = {"Date": cols[2], "R0": cols[3], "R1": cols[4], "R2": cols[5]}
+                    state["etag"], state["modified"] = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        except Exception as e:
+            metrics.record_failure("line-status", e)
+        state["fetched_at"] = time.time()
+        with self._lock: self._states[key] = state
+        return state["value"]
+
+    def prune(self, base_url, serials):
+        """차량 목록에서 빠진 차량의 상태를 버림"""
+        base = base_url.rstrip('/')
+        keep = {str(s) for s in serials}
+        with self._lock:
+            for key in [k for k in self._states if k[0] == base and k[1] not in keep]:
+                del self._states[key]
+
+@cache
+def get_line_status_poller():
+    return LineStatusPoller()
+
+# --- 판정 기준 (임계값 규칙) ---
+SENSOR_NUM_COLS = ["공기압", "냉간공기압", "전압", "온도", "Success_Rate"]
+RATE_NUM_COLS = ["Success_Rate", "Normal_Rate"]
+SUMMARY_KEYS = ["cp", "p", "t", "v", "r"]
+
+# (컬럼, 비교, 기준값, 등급, 요약키) - 요약키가 있는 규칙만 "점검 필요 차량 요약"에 집계됩니다.
+DEFAULT_RULES = [
+    ("냉간공기압", "<", 100, "crit", "cp"),
+    ("냉간공기압", ">", 145, "warn", None),
+    ("공기압", "<", 100, "crit", "p"),
+    ("공기압", ">", 145, "warn", "p"),
+    ("전압", "<", 2.8, "crit", "v"),
+    ("온도", ">=", 90, "crit", "t"),
+    ("Success_Rate", "<=", 50, "crit", "r"),
+    ("Success_Rate", "<=", 85, "warn", None),
+]
+SERVER_RULES = {}  # 서버(base_url)별로 기준이 다르면 여기에 규칙 목록을 등록
+_RULE_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+def get_threshold_rules(base_url):
+    return SERVER_RULES.get(base_url, DEFAULT_RULES)
+
+def to_numeric_frame(df, columns=SENSOR_NUM_COLS):
+    """문자열 컬럼을 한 번에 float32로 변환 ('%', ',' 제거, '-' 등 변환 불가 값은 NaN, 이미 수치인 컬럼은 그대로)"""
+    num = pd.DataFrame(index=df.index)
+    for col in columns:
+        if col not in df: continue
+        if pd.api.types.is_numeric_dtype(df[col]):
+            num[col] = df[col].astype("float32", copy=False)
+            continue
+        text = df[col].astype(str).str.replace('%', '', regex=False).str.replace(',', '', regex=False).str.strip()
+        num[col] = pd.to_numeric(text, errors='coerce').astype("float32")
+    return num
+
+def evaluate_thresholds(df, rules):
+    """스냅샷 전체를 규칙으로 한 번에 판정
+
+    반환: (crit, warn, summary) - crit/warn은 셀 단위, summary는 행 단위(요약키별) 불리언 행렬
+    """
+    num = to_numeric_frame(df)
+    crit = pd.DataFrame(False, index=df.index, columns=num.columns)
+    warn = crit.copy()
+    summary = pd.DataFrame(False, index=df.index, columns=SUMMARY_KEYS)
+    for col, op, limit, level, key in rules:
+        if col not in num: continue
+        hit = _RULE_OPS[op](num[col], limit)  # NaN은 항상 False (정상 간주)
+        target = crit if level == "crit" else warn
+        target[col] |= hit
+        if key: summary[key] |= hit
+    return crit, warn, summary
+
+def parse_cold_rows(content, encoding=None):
+    """Normal 페이지에서 (헤더시간, Seq, 센서ID, 공기압) 행 목록 추출"""
+    # 1. 모든 헤더(검정 배경)와 데이터 테이블을 순서대로 가져옵니다.
+    # 보통 헤더-테이블, 헤더-테이블 쌍으로 이루어져 있습니다.
+    all_tables = parse_tables(content, "table-dark", "table-sm", encoding=encoding)
+
+    all_data = []
+    current_time = None
+
+    for table in all_tables:
+        # 2. 검정색 배경의 헤더 테이블인 경우 -> 시간 추출
+        if "table-dark" in table.classes:
+            current_time = table.cells()[1] # 이미지상 2번째 칸이 Time
+            continue
+
+        # 3. 데이터 테이블(table-sm)인 경우 -> 현재 저장된 헤더 시간 부여
+        if "table-sm" in table.classes:
+            for row in table.body_rows():
+                tds = row.cells()
+                if len(tds) >= 8:
+                    all_data.append({
+                        "Time": current_time, # 위에서 추출한 헤더 시간 사용
+                        "Seq": int(tds[0]),
+                        "SensorID": tds[1],
+                        "Cold_PSI": tds[3]
+                    })
+    return all_data
+
+def pick_first_cold(all_data):
+    """센서별 최초 유효(>0) 공기압을 {SensorID: 기록} 형태로 반환"""
+    if not all_data: return {}
+
+    # 다중 정렬: 시간(과거순) -> Seq(홀수우선)
+    df_sorted = pd.DataFrame(all_data).sort_values(by=['Time', 'Seq'], ascending=[True, True])
+
+    cold_storage = {}
+    for sid, psi, t, seq in zip(df_sorted['SensorID'], df_sorted['Cold_PSI'], df_sorted['Time'], df_sorted['Seq']):
+        if sid in cold_storage: continue
+        try:
+            psi_val = float(str(psi).strip())
+            if psi_val > 0:
+                cold_storage[sid] = {
+                    "SensorID": sid,
+                    "냉간공기압": psi_val,
+                    "냉간계측시간": t,
+                    "Seq": seq
+                }
+        except: continue
+    return cold_storage
+
+def cold_frame(records):
+    """센서별 냉간 기록 목록을 표로 (냉간공기압 float32, 냉간계측시간 datetime)"""
+    if not records: return pd.DataFrame()
+    df = pd.DataFrame(records)
+    return df.assign(냉간공기압=df["냉간공기압"].astype("float32"),
+                     냉간계측시간=pd.to_datetime(df["냉간계측시간"], errors="coerce", format="mixed"))
+
+def fetch_cold_rows(base_url, serial_no, target_date, limit_time, start_time="00:00"):
+    """start_time~limit_time 구간의 Normal 페이지를 받아 행 목록 반환 (실패 시 예외)"""
+    url = (f"{base_url.rstrip('/')}/normal/list/{serial_no}?date={target_date}"
+           f"&time_gte={start_time.replace(':', '%3A')}&time_lte={limit_time}")
+    resp = http_get(url, timeout=10, endpoint="cold")
+    resp.raise_for_status()  # 에러 페이지가 빈 구간(성공)으로 처리되어 캐시되지 않도록
+    with get_metrics().timed("parse", "cold"):
+        return parse_cold_rows(resp.content, resp.encoding)
+
+def get_cold_pressure_data(base_url, serial_no, target_date, limit_time, start_time="00:00"):
+    metrics = get_metrics()
+    with metrics.timed("fetch", "get_cold_pressure_data"):
+        try:
+            cold_storage = pick_first_cold(fetch_cold_rows(base_url, serial_no, target_date, limit_time, start_time))
+            return cold_frame(list(cold_storage.values()))
+        except Exception as e:
+            print(f"❌ {serial_no}: 데이터 파싱 오류 {e}")
+            metrics.record_failure("cold", e)
+            return pd.DataFrame()
+
+def get_cold_pressure_with_retry(base_url, serial_no, target_date, sensor_count=None):
+    """06:00부터 1시간씩 조회 한계를 늘리며 센서별 최초 냉간 공기압 확보
+
+    매 단계는 직전 한계 이후의 새 구간만 요청합니다. 구간이 시간순으로 이어지므로
+    센서별 최초 유효값은 00:00부터 전체를 다시 받는 방식과 동일합니다.
+    sensor_count가 없으면 이미 받아 둔 데이터(known_sensor_count)의 센서 수를 기준으로 조기 종료하고,
+    그것도 모르면 늦게 나타나는 센서를 놓치지 않도록 max_hour까지 모두 조회합니다.
+    모든 구간을 정상적으로 받았을 때만 결과를 캐시에 저장합니다.
+    """
+    cache = get_result_cache()
+    cache_key = cache.make_key(base_url, "cold", serial_no, target_date, SWEEP_WINDOWS["cold"])
+    metrics = get_metrics()
+    with metrics.timed("fetch", "get_cold_pressure_with_retry"):
+        cached = cache.get(cache_key, CACHE_MISS)
+        metrics.cache_result("cold", cached is not CACHE_MISS)
+        if cached is not CACHE_MISS: return cached
+        return get_single_flight().do(cache_key, lambda: _collect_cold_pressure(base_url, serial_no, target_date, sensor_count, cache_key),
+                                      endpoint="cold")
+
+def known_sensor_count(base_url, serial_no, target_date):
+    """그 날 데이터가 있는 센서 수를 이미 받아 둔 결과에서만 확인 (모르면 None, 네트워크 요청 없음)
+
+    수신율 조회 결과 -> 하루치 Normal 시계열 -> 오늘 증분 수집 상태 순으로 찾습니다.
+    """
+    cache = get_result_cache()
+    rate = cache.get(cache.make_key(base_url, "rate", serial_no, target_date, SWEEP_WINDOWS["rate"]), CACHE_MISS)
+    if rate is not CACHE_MISS and not rate[3].empty:
+        return len(rate[3])
+    normal = cache.get(cache.make_key(base_url, "normal-series", serial_no, target_date, "00:00-23:59"), CACHE_MISS)
+    if normal is CACHE_MISS and target_date == today_str():
+        normal = get_delta_poller().peek(base_url, serial_no, target_date) or CACHE_MISS
+    if normal is not CACHE_MISS and not normal[1].empty:
+        return normal[1]["SensorID"].nunique()
+    return None
+
+def _collect_cold_pressure(base_url, serial_no, target_date, sensor_count, cache_key):
+    start_hour = 6
+    max_hour = 12
+    final_cold_storage = {} # 최종 확정된 센서별 냉간 공기압
+    if sensor_count is None:
+        sensor_count = known_sensor_count(base_url, serial_no, target_date)
+    prev_limit = "00:00"
+    complete = True
+
+    for current_hour in range(start_hour, max_hour + 1):
+        limit_time = f"{current_hour:02d}:00"
+        try:
+            rows = fetch_cold_rows(base_url, serial_no, target_date, limit_time, start_time=prev_limit)
+        except Exception as e:
+            # 실패한 구간은 다음 단계 요청에 포함되도록 prev_limit을 유지합니다.
+            print(f"⚠️ {serial_no}: 냉간 공기압 조회 실패 (~{limit_time}) {e}")
+            get_metrics().record_failure("cold", e)
+            complete = False
+            if isinstance(e, (FetchSkipped, requests.exceptions.Timeout)):
+                break  # 응답이 없는 차량/호스트는 남은 구간을 더 요청하지 않고 수집 불가로 넘깁니다.
+            continue
+        prev_limit = limit_time
+        complete = True
+
+        for sid, entry in pick_first_cold(rows).items():
+            if sid not in final_cold_storage:
+                final_cold_storage[sid] = {**entry, "조회한계": limit_time} # 디버깅용: 몇 시 조회에서 찾았는지 기록
+
+        if sensor_count and len(final_cold_storage) >= sensor_count:
+            break
+    result = cold_frame(list(final_cold_storage.values()))
+    if complete:
+        get_result_cache().put(cache_key, result, ttl=cache_ttl(target_date, result))
+    return result
+
+
+# --- 데이터 수집 함수 (기존 로직 유지하되 예외처리 보강) ---
+def _parse_device_rows(content, encoding=None):
+    tables = parse_tables(content, "sc_table", encoding=encoding)
+    rows = [r for t in tables for r in t.rows()][1:]
+    devices = []
+    for row in rows:
+        cols = row.cells("textCenter")
+        if len(cols) >= 3:
+            devices.append({
+                "No": cols[0],
+                "차량번호": cols[2],
+                "펌웨어버전": cols[3],
+                "SerialNo": cols[1],
+            })
+    return devices
+
+def get_device_list(base_url):
+    """차량 목록 페이지만 조회 (No / 차량번호 / 펌웨어버전 / SerialNo)"""
+    url = f"{base_url.rstrip('/')}/device/list/0"
+    metrics = get_metrics()
+    with metrics.timed("fetch", "get_device_list"):
+        try:
+            resp = http_get(url, timeout=10)
+            with metrics.timed("parse", "device"):
+                devices = pd.DataFrame(_parse_device_rows(resp.content, resp.encoding))
+            if not devices.empty:
+                # 목록에서 빠진 차량의 증분 수집 상태는 더 갱신되지 않으므로 정리합니다.
+                get_delta_poller().prune(base_url, devices["SerialNo"])
+                get_line_status_poller().prune(base_url, devices["SerialNo"])
+            return devices
+        except Exception as e:
+            metrics.record_failure("device", e)
+            return pd.DataFrame()
+
+PENDING_STATUS = "⏳조회 중"
+
+def rfm_is_err(r_vals):
+    """Line Status R0~R2 중 하나라도 0 또는 '-'(조회 실패)이면 통신 이상"""
+    return any(v in ["0", "-"] for v in [r_vals["R0"], r_vals["R1"], r_vals["R2"]])
+
+def device_status_frame(devices, r_map):
+    """차량 목록에 Line Status(R0~R2)와 통신 상태를 붙임 (r_map에 아직 없는 차량은 조회 중으로 표시)"""
+    data = []
+    for dev in devices.to_dict("records"):
+        r_vals = r_map.get(dev["SerialNo"])
+        if r_vals is None:
+            data.append({**dev, "R0": "…", "R1": "…", "R2": "…", "최근수집": "…",
+                         "상태": PENDING_STATUS, "is_err": False})
+            continue
+        is_err = rfm_is_err(r_vals)
+        data.append({
+            **dev,
+            "R0": r_vals["R0"], "R1": r_vals["R1"], "R2": r_vals["R2"],
+            "최근수집": r_vals["Date"],
+            "상태": "🔴확인필요" if is_err else "🟢정상",
+            "is_err": is_err
+        })
+    return pd.DataFrame(data)
+
+# --- 일별 이력 저장소 (차량-일 단위 Parquet) ---
+# 지난 날짜의 차량별 요약을 {서버}/vehicle/{날짜}/{SerialNo}.parquet 로 한 번만 저장하고,
+# 조회 시 날짜별 전체 차량 파일({서버}/daily/{날짜}.parquet)로 합쳐 두어 기간 조회를 빠르게 합니다.
+HISTORY_DIR = os.path.join(CACHE_DIR, "history")
+HISTORY_COLS = ["Date", "SerialNo", "SensorID", "냉간공기압", "수신율", "전압", "전압최소", "공기압최소", "공기압최대", "온도최대", "측정수"]
+LEAK_SLOPE_PSI = -0.5       # 냉간 공기압이 하루 0.5 PSI 이상 꾸준히 떨어지면 서서히 새는 것으로 판단
+BATTERY_SLOPE_V = -0.005    # 전압이 하루 0.005V 이상 꾸준히 떨어지면 배터리 저하로 판단
+TREND_MIN_DAYS = 3
+
+def history_root(base_url):
+    return os.path.join(HISTORY_DIR, urlparse(base_url).netloc or base_url.strip('/').replace('/', '_'))
+
+def _vehicle_day_path(base_url, serial_no, day):
+    return os.path.join(history_root(base_url), "vehicle", day, f"{serial_no}.parquet")
+
+def _write_parquet(df, path):
+    """임시 파일에 쓴 뒤 교체 (읽는 쪽이 반쯤 쓰인 파일을 보지 않도록)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def build_vehicle_day(serial_no, day, series, rate_df, cold_df):
+    """하루치 시계열/수신율/냉간 결과를 센서별 한 행으로 요약"""
+    if not series.empty:
+        valid = series[series["전압"] > 0]
+        day_df = valid.groupby("SensorID", observed=True).agg(
+            전압=("전압", "median"), 전압최소=("전압", "min"), 공기압최소=("공기압", "min"),
+            공기압최대=("공기압", "max"), 온도최대=("온도", "max"), 측정수=("전압", "size"))
+        day_df.index = day_df.index.astype(str)
+        day_df = day_df.reindex(pd.Index(series["SensorID"].astype(str).unique()))
+    else:
+        day_df = pd.DataFrame(index=pd.Index([], dtype=str))
+
+    for extra, col, src in ((rate_df, "수신율", "Success_Rate"), (cold_df, "냉간공기압", "냉간공기압")):
+        vals = pd.Series(dtype="float64")
+        if extra is not None and not extra.empty:
+            vals = to_numeric_frame(extra, [src])[src]
+            vals.index = extra["SensorID"].astype(str).str.strip()
+            vals = vals[~vals.index.duplicated()]
+            day_df = day_df.reindex(day_df.index.union(vals.index, sort=False))
+        day_df[col] = vals.reindex(day_df.index)
+
+    out = day_df.rename_axis("SensorID").reset_index()
+    out.insert(0, "SerialNo", serial_no)
+    out.insert(0, "Date", pd.Timestamp(day))
+    for col in HISTORY_COLS[3:]:
+        if col not in out: out[col] = float("nan")
+        out[col] = out[col].astype("float32")
+    return out[HISTORY_COLS]
+
+def collect_vehicle_day(base_url, serial_no, day):
+    """지난 하루치를 수집해 차량-일 파일로 저장 (이미 있으면 건너뜀, 수집 실패 시 예외)"""
+    path = _vehicle_day_path(base_url, serial_no, day)
+    if os.path.exists(path): return path
+    _, series = cached_call("normal-series", base_url, serial_no, day, "00:00-23:59",
+                            lambda: _fetch_normal_series(base_url, serial_no, day), metric="normal")
+    rate_df = cached_call("rate", base_url, serial_no, day, "00:00-23:59",
+                          lambda: _fetch_rate_data(base_url, serial_no, day))[3]
+    cold_df = get_cold_pressure_with_retry(base_url, serial_no, day)
+    # 냉간 조회는 모든 구간을 받았을 때만 결과 캐시에 남습니다. 저장한 날은 다시 요청하지 않으므로
+    # 일부 구간이 실패했으면 저장하지 않고 다음 수집에서 다시 시도합니다.
+    if serial_no not in cached_sweep_results("cold", base_url, [serial_no], day):
+        raise RuntimeError(f"{serial_no} {day}: 냉간 공기압 조회가 완료되지 않아 저장하지 않음")
+    _write_parquet(build_vehicle_day(serial_no, day, series, rate_df, cold_df), path)
+    return path
+
+def missing_history(base_url, serials, days):
+    """아직 저장되지 않은 (SerialNo, 날짜) 목록"""
+    return [(s_no, day) for day in days for s_no in serials
+            if not os.path.exists(_vehicle_day_path(base_url, s_no, day))]
+
+def past_days(end_date, n_days):
+    """end_date 전날부터 n_days일 (오래된 날짜 순, 'YYYY-MM-DD')"""
+    return [(end_date - timedelta(days=k)).strftime('%Y-%m-%d') for k in range(n_days, 0, -1)]
+
+def _load_history_day(base_url, day):
+    root = history_root(base_url)
+    vehicle_dir = os.path.join(root, "vehicle", day)
+    daily_path = os.path.join(root, "daily", f"{day}.parquet")
+    if not os.path.isdir(vehicle_dir): return None
+    files = sorted(f for f in os.listdir(vehicle_dir) if f.endswith(".parquet"))
+    if not files: return None
+    # 날짜 파일에 합친 차량 파일 수를 기록해 두고, 차량 파일이 늘었으면 다시 합칩니다.
+    if os.path.exists(daily_path):
+        day_df = pd.read_parquet(daily_path)
+        if day_df.attrs.get("files") == len(files): return day_df
+    day_df = pd.concat([pd.read_parquet(os.path.join(vehicle_dir, f)) for f in files], ignore_index=True)
+    day_df.attrs["files"] = len(files)
+    _write_parquet(day_df, daily_path)
+    return day_df
+
+def load_history(base_url, days):
+    """저장된 기간 이력을 하나의 테이블로 (SerialNo/SensorID는 범주형)"""
+    frames = [df for df in (_load_history_day(base_url, day) for day in days) if df is not None and not df.empty]
+    if not frames: return pd.DataFrame(columns=HISTORY_COLS)
+    hist = pd.concat(frames, ignore_index=True)
+    hist["SerialNo"] = hist["SerialNo"].astype("category")
+    hist["SensorID"] = hist["SensorID"].astype("category")
+    return hist
+
+def trend_slopes(hist, column, keys=("SerialNo", "SensorID")):
+    """차량·센서별(keys) 일 단위 선형 추세 (최소제곱 기울기를 합계식으로 한 번에 계산)"""
+    keys = list(keys)
+    df = hist.loc[hist[column].notna(), keys + ["Date", column]]
+    if df.empty: return pd.DataFrame()
+    x = (df["Date"] - df["Date"].min()).dt.days.astype("float64")
+    y = df[column].astype("float64")
+    df = df.assign(x=x, y=y, xx=x * x, xy=x * y)
+    g = df.sort_values("Date").groupby(keys, observed=True)
+    agg = g.agg(n=("x", "size"), sx=("x", "sum"), sy=("y", "sum"), sxx=("xx", "sum"), sxy=("xy", "sum"),
+                첫값=("y", "first"), 최근값=("y", "last"))
+    denom = agg["n"] * agg["sxx"] - agg["sx"] ** 2
+    agg["기울기"] = (agg["n"] * agg["sxy"] - agg["sx"] * agg["sy"]).div(denom.where(denom != 0))
+    agg = agg[agg["n"] >= TREND_MIN_DAYS]
+    return agg[["n", "첫값", "최근값", "기울기"]].rename(columns={"n": "일수"}).reset_index()
+
+def find_declines(hist, column, slope_limit):
+    """기울기가 slope_limit 이하인 센서를 감소 폭이 큰 순으로"""
+    slopes = trend_slopes(hist, column)
+    if slopes.empty: return slopes
+    return slopes[slopes["기울기"] <= slope_limit].sort_values("기울기").reset_index(drop=True)
+
+# --- 통신 품질 이력 (수신율 페이지만, 날짜별 전체 차량 Parquet) ---
+# 지난 날짜의 수신율 조회 결과를 {서버}/rate/{날짜}.parquet 한 파일(긴 표)로 모아 두고,
+# 기간 통계/순위는 이 파일들만 읽어 계산하므로 기간을 바꿔도 다시 요청하지 않습니다.
+RATE_HISTORY_COLS = ["Date", "SerialNo", "SensorID", "Success_Rate", "Normal_Rate", "전체수신율"]
+RATE_DEGRADE_PP = 10    # 최근 평균 수신율이 이전 기간보다 10%p 넘게 낮으면 저하로 분류
+
+def _rate_day_path(base_url, day):
+    return os.path.join(history_root(base_url), "rate", f"{day}.parquet")
+
+def _load_rate_day(path):
+    """(날짜 표 또는 None, 이미 반영한 SerialNo 집합)"""
+    if not os.path.exists(path): return None, set()
+    day_df = pd.read_parquet(path)
+    return day_df, set(day_df.attrs.get("tried", []))
+
+def rate_day_table(day, results):
+    """하루치 수신율 조회 결과 {SerialNo: get_rate_data 결과} → RATE_HISTORY_COLS 긴 표"""
+    sensors, totals = rate_fleet_tables(results)
+    table = sensors.merge(totals[["전체수신율"]], left_on="SerialNo", right_index=True, how="left")
+    table.insert(0, "Date", pd.Timestamp(day))
+    return table[RATE_HISTORY_COLS]
+
+def load_rate_history(base_url, serials, days):
+    """기간 수신율 이력 (SerialNo/SensorID 범주형, 수치 float32)과 아직 조회하지 않은 (SerialNo, 날짜) 목록
+
+    날짜 파일에 없는 차량은 결과 캐시만 확인해(네트워크 요청 없음) 찾으면 파일에 합쳐 둡니다.
+    """
+    frames, missing = [], []
+    for day in days:
+        path = _rate_day_path(base_url, day)
+        day_df, tried = _load_rate_day(path)
+        todo = [s_no for s_no in serials if s_no not in tried]
+        found = cached_sweep_results("rate", base_url, todo, day) if todo else {}
+        if found:
+            new = rate_day_table(day, found)
+            day_df = new if day_df is None else pd.concat([day_df, new], ignore_index=True)
+            day_df.attrs["tried"] = sorted(tried | set(found))
+            _write_parquet(day_df, path)
+        missing += [(s_no, day) for s_no in todo if s_no not in found]
+        if day_df is not None and not day_df.empty: frames.append(day_df)
+    if not frames: return pd.DataFrame(columns=RATE_HISTORY_COLS), missing
+    hist = pd.concat(frames, ignore_index=True)
+    hist["SerialNo"] = hist["SerialNo"].astype(str).astype("category")
+    hist["SensorID"] = hist["SensorID"].astype(str).astype("category")
+    return hist, missing
+
+def rate_stats(rate_hist, column, keys, window=7):
+    """keys(센서 또는 차량)별 수신율 통계와 저하 순위용 값
+
+    평균/최저, 마지막 날짜 기준 최근 window일 평균과 그 이전 평균, 변화(%p), 일 기울기를 한 번의 group-by로 계산합니다.
+    """
+    keys = list(keys)
+    df = rate_hist.loc[rate_hist[column].notna(), keys + ["Date", column]]
+    if df.empty: return pd.DataFrame()
+    recent = df["Date"] > df["Date"].max() - pd.Timedelta(days=window)
+    df = df.assign(최근=df[column].where(recent), 이전=df[column].where(~recent))
+    stats = df.groupby(keys, observed=True).agg(일수=("Date", "nunique"), 평균=(column, "mean"), 최저=(column, "min"),
+                                                최근평균=("최근", "mean"), 이전평균=("이전", "mean"))
+    stats["변화"] = stats["최근평균"] - stats["이전평균"]
+    slopes = trend_slopes(rate_hist, column, keys)
+    stats["기울기"] = slopes.set_index(keys)["기울기"] if not slopes.empty else float("nan")
+    return stats.reset_index().sort_values(["변화", "기울기"], na_position="last", kind="stable").reset_index(drop=True)
+
+def comm_quality(rate_hist, devices, window=7):
+    """(센서별 통계, 차량별 통계, 펌웨어버전별 요약, 날짜 x 펌웨어버전 평균 수신율)
+
+    차량별 값은 페이지의 전체수신율, 펌웨어 요약은 차량별 통계를 펌웨어버전으로 묶은 것입니다.
+    """
+    sensors = rate_stats(rate_hist, "Success_Rate", ["SerialNo", "SensorID"], window)
+    vehicle_days = rate_hist.drop_duplicates(["Date", "SerialNo"])
+    vehicles = rate_stats(vehicle_days, "전체수신율", ["SerialNo"], window)
+    firmware = devices.set_index("SerialNo")["펌웨어버전"]
+    if vehicles.empty:
+        return sensors, vehicles, pd.DataFrame(), pd.DataFrame()
+    vehicles.insert(1, "펌웨어버전", vehicles["SerialNo"].astype(str).map(firmware).fillna("-"))
+    by_fw = vehicles.assign(저하=vehicles["변화"] <= -RATE_DEGRADE_PP).groupby("펌웨어버전").agg(
+        차량수=("SerialNo", "size"), 평균=("평균", "mean"), 최근평균=("최근평균", "mean"),
+        변화=("변화", "mean"), 저하차량=("저하", "sum"))
+    by_fw["저하비율"] = by_fw["저하차량"] / by_fw["차량수"]
+    daily_fw = (vehicle_days.assign(펌웨어버전=vehicle_days["SerialNo"].astype(str).map(firmware).fillna("-"))
+                .pivot_table(index="Date", columns="펌웨어버전", values="전체수신율", aggfunc="mean"))
+    return sensors, vehicles, by_fw.reset_index().sort_values("변화"), daily_fw
+
+# --- 주행 경로 (헤더 GPS + 선 단순화) ---
+# 하루치 경로는 측정마다 한 점이라 수천 개가 되므로, 화면에 보내기 전에 Ramer-Douglas-Peucker로 줄입니다.
+ROUTE_TOLERANCE_M = 15     # 단순화 허용 오차 (m), 원래 경로에서 이만큼 안쪽으로 벗어나는 점은 생략
+ROUTE_LEVELS = {0: "정상", 1: "주의", 2: "위험"}
+EARTH_RADIUS_M = 6371000
+
+def route_points(series, rules):
+    """측정 시각별 GPS 한 점과 그 시각 센서들의 가장 나쁜 판정 등급 (0 정상 / 1 주의 / 2 위험), 시간순"""
+    if series.empty or "위도" not in series:
+        return pd.DataFrame(columns=["Time", "위도", "경도", "등급"])
+    valid = series[series["전압"] > 0]  # 전압 0은 무효 측정 (공기압/온도 판정에서 제외)
+    crit, warn, _ = evaluate_thresholds(valid, rules)
+    level = pd.Series(np.where(crit.any(axis=1), 2, np.where(warn.any(axis=1), 1, 0)), index=valid.index)
+    worst = level.groupby(valid["Time"]).max()
+    points = series.drop_duplicates("Time")[["Time", "위도", "경도"]].dropna()
+    points = points[(points["위도"] != 0) & (points["경도"] != 0)].sort_values("Time", kind="stable")
+    return points.assign(등급=points["Time"].map(worst).fillna(0).astype("int8")).reset_index(drop=True)
+
+def simplify_route(points, tolerance_m=ROUTE_TOLERANCE_M):
+    """Ramer-Douglas-Peucker로 선에서 tolerance_m 이내인 점을 생략 (등급이 바뀌는 앞뒤 점은 항상 유지)"""
+    n = len(points)
+    if n <= 2 or not tolerance_m: return points
+    # 좁은 범위이므로 평균 위도 기준 평면 좌표(m)로 계산합니다.
+    lat0 = np.radians(points["위도"].astype("float64").mean())
+    xy = np.column_stack([np.radians(points["경도"].astype("float64")) * np.cos(lat0),
+                          np.radians(points["위도"].astype("float64"))]) * EARTH_RADIUS_M
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2: continue
+        seg, rel = xy[b] - xy[a], xy[a + 1:b] - xy[a]
+        length = np.hypot(*seg)
+        dist = (np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / length if length > 0
+                else np.hypot(rel[:, 0], rel[:, 1]))
+        i = a + 1 + int(dist.argmax())
+        if dist[i - a - 1] > tolerance_m:
+            keep[i] = True
+            stack += [(a, i), (i, b)]
+    change = np.flatnonzero(np.diff(points["등급"].to_numpy()))
+    keep[change] = keep[change + 1] = True
+    return points[keep].reset_index(drop=True)
+
+# --- 백그라운드 분석 작업 ---
+SWEEP_DEADLINE = 300       # 전체 차량 조회 한 번의 시간 예산 (초), 넘으면 남은 차량은 수집 불가로 표시
+STRAGGLER_MIN_GRACE = 2.0  # 차량 하나에 허용하는 최소 시간 (초)
+STRAGGLER_FACTOR = 3       # 완료 차량 소요 시간 p95의 몇 배까지 기다릴지
+STRAGGLER_MIN_SAMPLES = 5  # 완료 차량이 이만큼 쌓인 뒤부터 차량별 시간 예산을 적용
+
+class FleetJob:
+    """차량별 분석을 워커 풀에서 실행하며 진행 상황을 추적하는 작업
+
+    결과는 차량 하나가 끝날 때마다 results[SerialNo]에 바로 기록됩니다.
+    실패한 차량은 이전 결과가 있으면 그대로 두고 "stale", 없으면 "unavailable"로 status에 표시합니다.
+    완료 차량이 쌓이면 이후 차량은 (완료 소요 시간 p95 x STRAGGLER_FACTOR) 안에 끝나도록 요청 시간을 제한하고,
+    전체가 deadline(초)을 넘거나 대기열이 빈 뒤 느린 차량만 남아 같은 시간이 지나면
+    남은 차량을 기다리지 않고 작업을 끝냅니다 (늦게 도착한 정상 결과는 그대로 반영).
+    """
+    def __init__(self, func, serials, results, max_workers=DEFAULT_MAX_WORKERS, is_ok=None, deadline=SWEEP_DEADLINE):
+        self.total = len(serials)
+        self.done = self.failed = self.in_flight = 0
+        self.started_at = time.time()
+        self.deadline_at = self.started_at + deadline if deadline else None
+        self.finished_at = None
+        self.cancelled = False
+        self.status = {}  # SerialNo -> "ok" | "stale" | "unavailable"
+        self._func = func
+        self._results = results
+        self._is_ok = is_ok or (lambda res: True)
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._active = {}        # 진행 중인 SerialNo -> 시작 시각
+        self._abandoned = set()  # 기다리지 않기로 한 SerialNo
+        self._durations = []
+        self._queue_empty_at = None  # 마지막 차량이 시작된 시각
+        pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="fleet-job",
+                                  initializer=worker_ctx_initializer())
+        self._futures = {pool.submit(self._run, s_no): s_no for s_no in serials}
+        pool.shutdown(wait=False)  # 남은 작업을 마치면 워커 스레드는 스스로 종료
+        if not serials: self.finished_at = time.time()
+
+    def _mark_failed(self, s_no):
+        self.status[s_no] = "stale" if s_no in self._results else "unavailable"
+
+    def _run(self, s_no):
+        if self._cancel.is_set(): return
+        with self._lock:
+            if self.finished_at is not None:  # 시작 직전에 작업이 마감됨
+                self._abandoned.add(s_no)
+                self._mark_failed(s_no)
+                self.done += 1
+                self.failed += 1
+                return
+            self.in_flight += 1
+            self._active[s_no] = started = time.time()
+            if self.done + self.in_flight == self.total: self._queue_empty_at = started
+            budget = self._vehicle_budget()
+        expires = [t for t in (self.deadline_at, started + budget if budget else None) if t is not None]
+        ok = False
+        res = None
+        try:
+            with deadline_at(min(expires) if expires else None):
+                res = self._func(s_no)
+            ok = self._is_ok(res)
+        except Exception as e:
+            print(f"❌ {s_no}: 분석 실패 {e}")
+        finally:
+            with self._lock:
+                had_previous = s_no in self._results
+                if ok or not had_previous and res is not None:
+                    self._results[s_no] = res
+                self._active.pop(s_no, None)
+                self.in_flight -= 1
+                if s_no in self._abandoned:
+                    # 이미 실패로 집계된 차량이 늦게라도 성공하면 결과만 바로잡습니다.
+                    if ok:
+                        self.failed -= 1
+                        self.status[s_no] = "ok"
+                    return
+                if ok:
+                    self.status[s_no] = "ok"
+                    self._durations.append(time.time() - started)
+                else:
+                    self.status[s_no] = "stale" if had_previous else "unavailable"
+                self.done += 1
+                if not ok: self.failed += 1
+                if self.done == self.total: self.finished_at = time.time()
+
+    def _vehicle_budget(self):
+        """차량 하나에 허용할 시간 (초), 완료 차량이 부족하면 None (lock 안에서 호출)"""
+        if len(self._durations) < STRAGGLER_MIN_SAMPLES: return None
+        p95 = sorted(self._durations)[int(0.95 * (len(self._durations) - 1))]
+        return max(STRAGGLER_MIN_GRACE, STRAGGLER_FACTOR * p95)
+
+    def _give_up(self):
+        """남은 차량(대기/진행 중)을 수집 불가로 집계하고 작업을 끝냄 (lock 안에서 호출)"""
+        for fut, s_no in self._futures.items():
+            if fut.cancel() or s_no in self._active:
+                self._abandoned.add(s_no)
+                self._mark_failed(s_no)
+                self.done += 1
+                self.failed += 1
+        self.finished_at = time.time()
+
+    def cancel(self):
+        """대기 중인 차량은 취소하고 진행 중인 요청만 마무리"""
+        self.cancelled = True
+        self._cancel.set()
+        for f in self._futures: f.cancel()
+        with self._lock:
+            if self.in_flight == 0: self.finished_at = time.time()
+
+    @property
+    def running(self):
+        if self.finished_at is not None: return False
+        if self.cancelled and self.in_flight == 0:
+            self.finished_at = time.time()
+            return False
+        now_ts = time.time()
+        with self._lock:
+            if self.finished_at is not None: return False
+            grace = self._vehicle_budget()
+            if self.deadline_at is not None and now_ts > self.deadline_at:
+                self._give_up()
+            elif (self._queue_empty_at is not None and self.in_flight and grace is not None
+                  and now_ts - self._queue_empty_at > grace):
+                self._give_up()
+            return self.finished_at is None
+
+    @property
+    def stale(self): return sum(1 for v in self.status.values() if v == "stale")
+
+    @property
+    def unavailable(self): return sum(1 for v in self.status.values() if v == "unavailable")
+
+    def eta(self):
+        """남은 예상 시간(초), 완료 차량이 없으면 None"""
+        if self.done == 0: return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.done * (self.total - self.done)
+
+# --- 전체 차량 결과 표 (SerialNo x SensorID 긴 표) ---
+# 차량별 결과를 조회 종류마다 한 번에 이어 붙여 두고, 차량 사이의 결합은 이 표끼리 한 번만 합니다.
+# SerialNo/SensorID는 범주형, 수치는 float32(결측은 NaN)이며 '-' 표시는 화면에서만 합니다.
+FLEET_KEYS = ["SerialNo", "SensorID"]
+READING_COLS = ["공기압", "전압", "온도"]
+RATE_TOTAL_COLS = ["전체건수", "성공건수", "전체수신율"]
+COLD_COLS = ["냉간공기압", "냉간계측시간", "조회한계"]
+
+def fleet_long_table(frames, columns, numeric=()):
+    """{SerialNo: 차량별 표}를 SerialNo/SensorID + columns 긴 표 하나로 (numeric 컬럼은 float32)"""
+    parts = {s_no: df.reindex(columns=["SensorID", *columns]) for s_no, df in frames.items()
+             if df is not None and not df.empty}
+    if parts:
+        table = pd.concat(parts.values(), keys=list(parts), names=["SerialNo", "row"])
+        table = table.reset_index(level="row", drop=True).reset_index()
+    else:
+        table = pd.DataFrame(columns=FLEET_KEYS + list(columns))
+    table["SerialNo"] = table["SerialNo"].astype("category")
+    table["SensorID"] = table["SensorID"].astype(str).str.strip().astype("category")
+    table = table.drop_duplicates(FLEET_KEYS, ignore_index=True)
+    return table.assign(**to_numeric_frame(table, numeric))
+
+def fleet_snapshot(vehicle_frames):
+    """{SerialNo: summarize_latest 결과} → 센서 대표값 긴 표"""
+    return fleet_long_table(vehicle_frames, READING_COLS, READING_COLS)
+
+def rate_fleet_tables(results):
+    """수신율 조회 결과 {SerialNo: (전체건수, 성공건수, 전체수신율, 센서별 표)} → (센서별 긴 표, 차량별 합계 표)"""
+    sensors = fleet_long_table({s_no: res[3] for s_no, res in results.items()}, RATE_NUM_COLS, RATE_NUM_COLS)
+    totals = pd.DataFrame([res[:3] for res in results.values()], index=pd.Index(list(results), name="SerialNo"),
+                          columns=RATE_TOTAL_COLS)
+    return sensors, to_numeric_frame(totals, RATE_TOTAL_COLS)  # 이전 형식(문자열)으로 캐시된 결과도 수치로
+
+def cold_fleet_table(results):
+    """냉간 조회 결과 {SerialNo: 센서별 표} → 긴 표"""
+    table = fleet_long_table(results, COLD_COLS, ["냉간공기압"])
+    return table.assign(냉간계측시간=pd.to_datetime(table["냉간계측시간"], errors="coerce", format="mixed"),
+                        조회한계=table["조회한계"].astype("category"))
+
+def join_fleet(snapshot, rate_sensors, cold_table):
+    """센서 대표값 긴 표에 수신율/냉간 긴 표를 (SerialNo, SensorID)로 한 번에 붙임 (없는 값은 NaN)"""
+    return (snapshot.merge(rate_sensors, on=FLEET_KEYS, how="left")
+                    .merge(cold_table, on=FLEET_KEYS, how="left"))
+
+SWEEP_TABLES = {"cold": cold_fleet_table, "rate": rate_fleet_tables}
+
+# --- 세션 간 공유 결과 저장소 ---
+SHARED_SWEEPS = ("cold", "rate")  # 모든 세션이 결과와 작업을 공유하는 전체 조회 종류
+SHARED_MAX_SWEEPS = 32            # 메모리에 유지하는 (종류, 서버, 날짜) 묶음 수, 넘으면 오래 쓰지 않은 것부터 삭제
+
+class SharedStore:
+    """모든 브라우저 세션이 공유하는 전체 조회(냉간/수신율) 결과와 작업
+
+    (종류, 서버, 날짜)마다 {SerialNo: 결과} 하나와 마지막 작업 하나만 두므로
+    한 사용자가 시작한 조회가 다른 사용자 화면에도 채워지고, 같은 조회가 진행 중이면 새로 시작하지 않고 합류합니다.
+    """
+    def __init__(self, max_sweeps=SHARED_MAX_SWEEPS):
+        self.max_sweeps = max_sweeps
+        self._lock = threading.Lock()
+        self._results = OrderedDict()  # (종류, 서버, 날짜) -> {SerialNo: 결과}
+        self._jobs = {}                # (종류, 서버, 날짜) -> FleetJob
+        self._tables = {}              # (종류, 서버, 날짜) -> (결과 버전, SWEEP_TABLES 결과)
+
+    @staticmethod
+    def _key(kind, base_url, target_date):
+        return kind, base_url.rstrip('/'), str(target_date)
+
+    def results(self, kind, base_url, target_date, warm=None):
+        """묶음의 결과 dict, 처음 만들 때 warm()이 있으면 그 결과로 미리 채움 (예: CLI가 채워 둔 결과 캐시)"""
+        key = self._key(kind, base_url, target_date)
+        with self._lock:
+            if key not in self._results:
+                self._results[key] = dict(warm()) if warm else {}
+                while len(self._results) > self.max_sweeps:
+                    old, _ = self._results.popitem(last=False)
+                    self._jobs.pop(old, None)  # 진행 중이던 작업은 자기 결과 dict에 계속 기록하고 끝남
+                    self._tables.pop(old, None)
+            self._results.move_to_end(key)
+            return self._results[key]
+
+    def table(self, kind, base_url, target_date, warm=None):
+        """묶음 결과를 SWEEP_TABLES로 합친 전체 차량 표 (결과가 바뀐 뒤 처음 요청할 때만 다시 만듦)"""
+        results = self.results(kind, base_url, target_date, warm)
+        key = self._key(kind, base_url, target_date)
+        with self._lock:
+            job = self._jobs.get(key)
+            version = (len(results), id(job), job.done, job.failed) if job is not None else (len(results),)
+            cached = self._tables.get(key)
+        if cached is not None and cached[0] == version: return cached[1]
+        table = SWEEP_TABLES[kind](results.copy())  # 작업 스레드가 기록 중이어도 그 시점 결과로
+        with self._lock:
+            self._tables[key] = (version, table)
+        return table
+
+    def job(self, kind, base_url, target_date):
+        with self._lock:
+            return self._jobs.get(self._key(kind, base_url, target_date))
+
+    def start_job(self, kind, base_url, target_date, factory):
+        """같은 작업이 진행 중이면 그 작업을, 아니면 factory(results)로 새로 시작한 작업을 반환"""
+        results = self.results(kind, base_url, target_date)
+        key = self._key(kind, base_url, target_date)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or not job.running:
+                job = self._jobs[key] = factory(results)
+            return job
+
+    def status(self):
+        """묶음별 결과 수와 작업 상태 (진단용)"""
+        with self._lock:
+            items = [(key, len(res), self._jobs.get(key)) for key, res in self._results.items()]
+        return pd.DataFrame([{
+            "종류": kind, "서버": base_url, "날짜": day, "차량 수": n,
+            "작업": "-" if job is None else ("진행 중" if job.running else ("중지됨" if job.cancelled else "완료")),
+        } for (kind, base_url, day), n, job in items])
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._jobs.clear()
+            self._tables.clear()
+
+@cache
+def get_shared_store():
+    return SharedStore()
+
+
+# --- 알림 엔진 (상태 전이 / 히스테리시스 / 알림 전송) ---
+# 우선순위 폴링(PollScheduler)이 갱신한 차량의 오늘 데이터로 판정하되, 값이 바뀐 센서만 다시 평가합니다.
+# 알림은 발생(new)과 해제(cleared) 때만 보내고, 계속 기준을 넘는 동안(ongoing)은 다시 보내지 않습니다.
+ALERT_DIR = os.path.join(CACHE_DIR, "alerts")
+ALERT_LOG_PATH = os.environ.get("SMART_MONITOR_ALERT_FILE", os.path.join(ALERT_DIR, "alerts.jsonl"))
+ALERT_WEBHOOK = os.environ.get("SMART_MONITOR_ALERT_WEBHOOK")  # 설정하면 알림 묶음을 JSON으로 POST
+ALERT_RECENT = 200          # 화면에 보여 줄 최근 알림 수
+HOT_DELTA_PSI = 30          # 운행 중 공기압이 냉간보다 이만큼 넘게 높으면 과부하/과열 의심
+VOLT_DROP_V = 0.15          # 오늘 본 최고 전압보다 이만큼 넘게 떨어지면 배터리 저하 의심
+ALERT_FEATURES = ["공기압", "전압", "온도", "냉간공기압", "냉간대비", "전압하락"]
+
+# (규칙 id, 컬럼, 비교, 발생 기준, 해제 기준, 등급, 이름)
+# 발생 후에는 해제 기준까지 돌아와야 해제되므로 기준 근처에서 값이 흔들려도 알림이 반복되지 않습니다.
+ALERT_RULES = [
+    ("low_pressure", "공기압", "<", 100, 103, "crit", "저압"),
+    ("high_pressure", "공기압", ">", 145, 142, "warn", "고압"),
+    ("low_voltage", "전압", "<", 2.8, 2.85, "crit", "배터리 부족"),
+    ("overheat", "온도", ">=", 90, 85, "crit", "과열"),
+    ("cold_low", "냉간공기압", "<", 100, 103, "crit", "냉간 저압"),
+    ("hot_delta", "냉간대비", ">", HOT_DELTA_PSI, HOT_DELTA_PSI - 5, "warn", "냉간 대비 공기압 상승"),
+    ("voltage_decline", "전압하락", ">", VOLT_DROP_V, VOLT_DROP_V - 0.05, "warn", "전압 하락"),
+]
+
+@contextmanager
+def _file_lock(path):
+    """여러 프로세스(대시보드, CLI)가 같은 상태 파일을 읽고 쓰는 동안 배타 잠금"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK은 10초 동안만 재시도하므로 잡힐 때까지 다시 시도
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _try_lock_file(path):
+    """기다리지 않고 배타 잠금을 시도해 잡으면 열린 파일(닫으면 해제), 다른 프로세스가 잡고 있으면 None"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def _replace_rows(old, new):
+    """old에서 new와 같은 인덱스의 행을 new로 바꾸고 나머지는 유지"""
+    if old.empty: return new
+    return pd.concat([old[~old.index.isin(new.index)], new])
+
+class AlertEngine:
+    """(SerialNo, SensorID, 규칙)별 알림 상태를 유지하며 바뀐 센서만 다시 판정
+
+    활성 알림과 오늘 본 센서별 최고 전압은 state_path(JSON)에 저장합니다. 판정할 때마다 파일 잠금 안에서
+    다시 읽고 저장하므로, 같은 서버를 대시보드와 CLI가 함께 판정해도 같은 알림을 한 번씩만 보냅니다.
+    """
+    def __init__(self, base_url, sinks=(), rules=ALERT_RULES, state_path=None):
+        self.base_url = base_url
+        self.sinks = list(sinks)
+        self.rules = rules
+        self.state_path = state_path or os.path.join(ALERT_DIR, f"{(urlparse(base_url).netloc or 'server').replace(':', '_')}.json")
+        self.recent = deque(maxlen=ALERT_RECENT)
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._last = pd.DataFrame(columns=ALERT_FEATURES)  # 직전 판정에 쓴 값 (SerialNo, SensorID 인덱스)
+        self._volt_peak = pd.Series(dtype="float32")        # 오늘 본 센서별 최고 전압
+        self._day = None
+        self.active = {}  # (SerialNo, SensorID, 규칙 id) -> 알림 정보
+        self._load_state()
+
+    def _load_state(self):
+        """상태 파일의 활성 알림으로 바꾸고, 같은 날의 최고 전압은 메모리 값과 큰 쪽으로 합침"""
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(state, list): state = {"active": state}  # 이전 형식 (활성 알림 목록만)
+        self.active = {tuple(a["key"]): a for a in state.get("active", [])}
+        peaks = state.get("volt_peak") if state.get("day") == today_str() else None
+        if peaks:
+            saved = pd.Series([v for *_, v in peaks], dtype="float32",
+                              index=pd.MultiIndex.from_tuples([tuple(k) for *k, _ in peaks], names=FLEET_KEYS))
+            if self._day != today_str():
+                self._day, self._volt_peak = today_str(), pd.Series(dtype="float32")
+            merged = pd.concat([saved, self._volt_peak.reindex(saved.index)], axis=1).max(axis=1).astype("float32")
+            self._volt_peak = _replace_rows(self._volt_peak, merged)
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        peaks = self._volt_peak.dropna()
+        state = {"active": [{**a, "key": list(k)} for k, a in self.active.items()], "day": self._day,
+                 "volt_peak": [[s_no, sid, round(float(v), 3)] for (s_no, sid), v in peaks.items()]}
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    def features(self, fleet_df):
+        """센서 대표값(+냉간공기압) 긴 표에 파생 값(냉간대비, 전압하락)을 붙여 (SerialNo, SensorID) 인덱스로"""
+        feats = fleet_df.set_index(FLEET_KEYS).reindex(columns=ALERT_FEATURES[:4]).astype("float32")
+        feats.index = pd.MultiIndex.from_arrays([feats.index.get_level_values(k).astype(str) for k in FLEET_KEYS])
+        feats = feats[~feats.index.duplicated()]
+        if self._day != today_str():
+            self._day, self._volt_peak = today_str(), pd.Series(dtype="float32")
+        valid_volt = feats["전압"].where(feats["전압"] > 0)
+        peak = pd.concat([valid_volt, self._volt_peak.reindex(feats.index)], axis=1).max(axis=1)
+        self._volt_peak = _replace_rows(self._volt_peak, peak)
+        feats["냉간대비"] = feats["공기압"] - feats["냉간공기압"]
+        feats["전압하락"] = (self._volt_peak - valid_volt).astype("float32")
+        return feats
+
+    def evaluate(self, fleet_df, car_by_serial=None):
+        """한 번 판정하고 이번에 생긴 알림 이벤트(new/cleared) 목록을 반환 (sinks로도 전송)
+
+        fleet_df에 일부 차량만 있으면 그 차량만 판정하고 나머지 차량의 직전 값과 상태는 그대로 둡니다.
+        """
+        with self._lock, _file_lock(f"{self.state_path}.lock"):
+            t0 = time.perf_counter()
+            self._load_state()  # 다른 프로세스가 그사이 바꾼 알림 상태/최고 전압 반영
+            feats = self.features(fleet_df)
+            prev = self._last.reindex(feats.index)
+            changed = ~((feats == prev) | (feats.isna() & prev.isna())).all(axis=1)
+            todo = feats[changed]
+            events = []
+            now_txt = datetime.now(seoul_timezone).isoformat(timespec="seconds")
+            for rule_id, col, op, raise_at, clear_at, level, name in self.rules:
+                values = todo[col].dropna()  # 값이 없으면 (미수신) 상태를 바꾸지 않음
+                if values.empty: continue
+                hit = _RULE_OPS[op](values, raise_at)
+                hold = _RULE_OPS[op](values, clear_at)
+                for (s_no, sid), val, is_hit, is_hold in zip(values.index, values.to_numpy(), hit.to_numpy(), hold.to_numpy()):
+                    key = (s_no, sid, rule_id)
+                    alert = self.active.get(key)
+                    if alert is None and is_hit:
+                        alert = self.active[key] = {
+                            "server": self.base_url, "SerialNo": s_no, "차량번호": (car_by_serial or {}).get(s_no, ""),
+                            "SensorID": sid, "rule": rule_id, "name": name, "severity": level, "column": col,
+                            "threshold": raise_at, "value": round(float(val), 3), "since": now_txt, "state": "new"}
+                        events.append(dict(alert, time=now_txt))
+                    elif alert is not None and is_hold:
+                        alert.update(value=round(float(val), 3), state="ongoing")
+                    elif alert is not None:
+                        del self.active[key]
+                        events.append(dict(alert, value=round(float(val), 3), state="cleared", time=now_txt))
+            self._last = _replace_rows(self._last, feats)
+            if events: self.recent.extend(events)
+            self._save_state()
+            seconds = time.perf_counter() - t0
+            get_metrics().observe("alert", "evaluate", seconds)
+            self.last_run = {"시각": now_txt, "센서": len(feats), "재판정": int(changed.sum()),
+                             "알림": len(events), "소요(초)": seconds}
+        for sink in self.sinks:
+            if events: sink.send(events)
+        return events
+
+    def status(self):
+        """활성 알림 표 (진단/화면용)"""
+        with self._lock:
+            rows = list(self.active.values())
+        return pd.DataFrame(rows, columns=["since", "차량번호", "SerialNo", "SensorID", "name", "severity", "value", "threshold", "state"])
+
+class FileAlertSink:
+    """알림을 한 줄에 하나씩 JSON으로 덧붙여 기록"""
+    def __init__(self, path=ALERT_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, events):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+class WebhookAlertSink:
+    """알림 묶음을 {"alerts": [...]} JSON으로 POST (실패는 계측에만 남기고 판정은 계속)"""
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events):
+        try:
+            resp = get_http_session(urlparse(self.url).netloc).post(self.url, json={"alerts": events}, timeout=self.timeout)
+            resp.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ 알림 webhook 전송 실패: {e}")
+            get_metrics().record_failure("alert-webhook", e)
+
+@cache
+def get_alert_engine(base_url):
+    sinks = [FileAlertSink()] + ([WebhookAlertSink(ALERT_WEBHOOK)] if ALERT_WEBHOOK else [])
+    return AlertEngine(base_url, sinks)
+
+def alert_fleet_frame(base_url, devices, max_workers=DEFAULT_MAX_WORKERS):
+    """오늘 센서 대표값에 (있으면) 냉간공기압을 붙인 전체 차량 긴 표와 {SerialNo: 차량번호}
+
+    Normal 페이지는 DeltaPoller로 마지막 수집 이후 구간만 받고, 냉간공기압은 공유 저장소/결과 캐시에 있는 값만 씁니다.
+    """
+    serials = devices["SerialNo"].tolist()
+    today = today_str()
+    normal = fetch_all(lambda s_no: get_normal_status_data(base_url, s_no, today), serials, max_workers)
+    snapshot = fleet_snapshot({s_no: s_df for s_no, (_, s_df) in zip(serials, normal)})
+    cold = get_shared_store().table("cold", base_url, today,
+                                    warm=lambda: cached_sweep_results("cold", base_url, serials, today))
+    return (snapshot.merge(cold[FLEET_KEYS + ["냉간공기압"]], on=FLEET_KEYS, how="left"),
+            dict(zip(devices["SerialNo"], devices["차량번호"])))
+
+def run_alert_pass(base_url, max_workers=DEFAULT_MAX_WORKERS):
+    """전체 차량을 한 번 수집/판정하고 이번에 생긴 알림 이벤트 목록 반환"""
+    devices = get_device_list(base_url)
+    if devices.empty: return []  # 차량 목록을 못 받으면 상태를 바꾸지 않음
+    return get_alert_engine(base_url).evaluate(*alert_fleet_frame(base_url, devices, max_workers))
+
+# --- 우선순위 폴링 (분당 요청 예산 안에서 문제 차량을 더 자주) ---
+# 차량마다 현재 상태로 등급을 정하고, 등급별 목표 주기를 넘긴 차량 중 (경과/주기 x 가중치)가 큰 순서로
+# 토큰 버킷(분당 POLL_BUDGET_RPM)이 허락하는 만큼만 갱신합니다. 예산이 모자라면 정상 차량부터 늦어집니다.
+# 서버마다 파일 잠금을 잡은 프로세스(리더) 하나만 폴링하므로 대시보드/CLI 프로세스가 여러 개여도 요청이 늘지 않고,
+# 나머지 프로세스는 POLL_LEADER_RETRY마다 리더 자리가 비었는지 확인합니다. 벤치마크/테스트는 SMART_MONITOR_POLL=0으로 끕니다.
+POLL_ENABLED = os.environ.get("SMART_MONITOR_POLL", "1") != "0"
+POLL_LOCK_DIR = os.path.join(CACHE_DIR, "poll")
+POLL_LEADER_RETRY = 30        # 리더가 아닐 때 잠금을 다시 시도하는 간격 (초)
+POLL_BUDGET_RPM = 120         # 서버 하나에 쓰는 분당 요청 수 상한 (차량 목록 갱신 포함)
+POLL_TICK = 1.0               # 스케줄러가 갱신할 차량을 고르는 간격 (초)
+REQUESTS_PER_REFRESH = 2      # 차량 하나 갱신 = Line Status 1건 + Normal 증분 1건
+POLL_CLASSES = {              # 등급: (목표 갱신 주기(초), 가중치) - 위에서부터 먼저 해당하는 등급
+    "problem": (60, 8),       # RFM 이상 또는 활성 알림
+    "viewed": (90, 4),        # 최근 VIEWED_FOR초 안에 화면에서 본 차량
+    "stale": (300, 2),        # 최근수집이 STALE_AFTER초보다 오래됐거나 아직 한 번도 갱신하지 않음
+    "healthy": (900, 1),
+}
+VIEWED_FOR = 600
+STALE_AFTER = 1800
+DEVICE_REFRESH = 600          # 차량 목록 갱신 주기 (초)
+POLL_MAX_BACKOFF = 8          # 갱신에 연달아 실패한 차량은 목표 주기를 최대 이 배수까지 늘림
+POLL_WORKERS = 4
+
+class PollScheduler:
+    """서버 하나의 차량을 상태별 우선순위로 나누어 요청 예산 안에서 갱신하고, 갱신한 차량만 알림 판정
+
+    Line Status는 화면의 통신 상태 표와 같은 LineStatusPoller에 갱신하므로 표는 스케줄러가 받은 값을 그대로 씁니다.
+    """
+    def __init__(self, base_url, budget_rpm=POLL_BUDGET_RPM, classes=POLL_CLASSES):
+        self.base_url = base_url
+        self.budget_rpm = budget_rpm
+        self.classes = classes
+        self.capacity = max(REQUESTS_PER_REFRESH, budget_rpm / 6)  # 최대 10초치까지 몰아서 사용
+        self._tokens = self.capacity
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._filled_at = time.time()
+        self.devices = pd.DataFrame()
+        self._devices_at = 0.0
+        self.leader = False              # 이 프로세스가 이 서버의 폴링을 맡고 있는지
+        self._leader_file = None
+        self.refreshed_at = {}           # SerialNo -> 마지막 갱신 (시도) 시각
+        self.failures = defaultdict(int)  # SerialNo -> 연속 갱신 실패 횟수
+        self.viewed_at = {}              # SerialNo -> 화면에서 마지막으로 본 시각
+        self.requests = deque()          # 최근 1분간 요청 시각 (예산 확인용)
+        self.refreshes = defaultdict(int)  # 등급 -> 갱신 횟수
+
+    def mark_viewed(self, serial_no):
+        self.viewed_at[serial_no] = time.time()
+
+    def classify(self, serial_no, now, alerting):
+        r_vals = get_line_status_poller().peek(self.base_url, serial_no)
+        if serial_no in alerting or (r_vals is not None and rfm_is_err(r_vals)): return "problem"
+        if now - self.viewed_at.get(serial_no, float("-inf")) < VIEWED_FOR: return "viewed"
+        if r_vals is None or self._is_stale(r_vals["Date"], now): return "stale"  # 아직 상태를 모르는 차량 포함
+        return "healthy"
+
+    @staticmethod
+    def _is_stale(last_seen, now):
+        seen = pd.to_datetime(last_seen, errors="coerce")
+        if pd.isna(seen): return True
+        return now - seoul_timezone.localize(seen.to_pydatetime()).timestamp() > STALE_AFTER
+
+    def _take(self, n, now):
+        """토큰을 채우고 n개를 쓸 수 있으면 차감 후 True (lock 안에서 호출)"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._filled_at) * self.budget_rpm / 60)
+        self._filled_at = now
+        if self._tokens < n: return False
+        self._tokens -= n
+        self.requests.extend([now] * n)
+        return True
+
+    def pick(self, now):
+        """이번 틱에 갱신할 [(SerialNo, 등급)] (목표 주기를 넘긴 차량 중 급한 순, 예산 안에서)"""
+        if self.devices.empty: return []
+        alerting = {key[0] for key in get_alert_engine(self.base_url).active}
+        due = []
+        for s_no in self.devices["SerialNo"]:
+            cls = self.classify(s_no, now, alerting)
+            interval, weight = self.classes[cls]
+            interval *= min(2 ** self.failures[s_no], POLL_MAX_BACKOFF)
+            # 아직 한 번도 갱신하지 않은 차량은 차량 목록을 받은 시점에 이미 목표 주기만큼 지난 것으로 봅니다.
+            age = now - self.refreshed_at.get(s_no, self._devices_at - interval)
+            if age >= interval: due.append((age / interval * weight, s_no, cls))
+        due.sort(reverse=True)
+        picked = []
+        with self._lock:
+            for _, s_no, cls in due:
+                if not self._take(REQUESTS_PER_REFRESH, now): break
+                picked.append((s_no, cls))
+        return picked
+
+    def _refresh(self, item):
+        """차량 하나 갱신, 성공 여부 반환 (실패해도 재시도 간격을 늘려 다음 틱에 바로 다시 고르지 않음)"""
+        s_no, cls = item
+        try:
+            get_latest_r_values(self.base_url, s_no)  # max_age=0: 공유 저장소(LineStatusPoller)의 값을 새로 받음
+            get_delta_poller().poll(self.base_url, s_no, today_str(), force=True)
+        except Exception as e:
+            print(f"⚠️ 우선순위 폴링 {s_no} 갱신 실패: {e}")
+            get_metrics().record_failure("poll", e)
+            self.failures[s_no] += 1
+            self.refreshed_at[s_no] = time.time()
+            return False
+        self.failures.pop(s_no, None)
+        self.refreshed_at[s_no] = time.time()
+        self.refreshes[cls] += 1
+        return True
+
+    def tick(self):
+        """차량 목록을 (주기마다) 갱신하고, 고른 차량을 갱신한 뒤 갱신에 성공한 차량만 알림 판정"""
+        now = time.time()
+        while self.requests and now - self.requests[0] > 60: self.requests.popleft()
+        if now - self._devices_at > DEVICE_REFRESH:
+            with self._lock:
+                ok = self._take(1, now)
+            if ok:
+                devices = get_device_list(self.base_url)
+                self._devices_at = now
+                if not devices.empty: self.devices = devices
+        picked = self.pick(now)
+        if not picked: return []
+        done = [s_no for (s_no, _), ok in zip(picked, fetch_all(self._refresh, picked, POLL_WORKERS)) if ok]
+        if not done: return []
+        subset = self.devices[self.devices["SerialNo"].isin(done)]
+        return get_alert_engine(self.base_url).evaluate(*alert_fleet_frame(self.base_url, subset, POLL_WORKERS))
+
+    def acquire_leadership(self):
+        """이 서버의 리더 잠금을 시도 (다른 프로세스가 폴링 중이면 False)"""
+        if self._leader_file is None:
+            self._leader_file = _try_lock_file(os.path.join(POLL_LOCK_DIR, f"{urlparse(self.base_url).netloc.replace(':', '_')}.lock"))
+        self.leader = self._leader_file is not None
+        return self.leader
+
+    def run(self):
+        while not self._stop.is_set():
+            if not self.acquire_leadership():
+                self._stop.wait(POLL_LEADER_RETRY)
+                continue
+            started = time.time()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ 우선순위 폴링 실패 ({self.base_url}): {e}")
+                get_metrics().record_failure("poll", e)
+            self._stop.wait(max(0.0, POLL_TICK - (time.time() - started)))
+        if self._leader_file is not None:
+            self._leader_file.close()  # 잠금 해제, 다른 프로세스가 이어받음
+            self._leader_file, self.leader = None, False
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """등급별 차량 수/목표 주기/마지막 갱신 후 경과 시간 (진단용)"""
+        now = time.time()
+        if self.devices.empty: return pd.DataFrame()
+        alerting = {key[0] for key in get_alert_engine(self.base_url).active}
+        rows = pd.DataFrame([(cls, now - self.refreshed_at[s_no] if s_no in self.refreshed_at else float("nan"))
+                             for s_no in self.devices["SerialNo"]
+                             for cls in [self.classify(s_no, now, alerting)]], columns=["등급", "경과"])
+        table = rows.groupby("등급").agg(차량수=("경과", "size"), 평균경과=("경과", "mean"), 최대경과=("경과", "max"))
+        table = table.reindex(list(self.classes)).dropna(how="all")
+        table.insert(0, "목표주기", [self.classes[c][0] for c in table.index])
+        table["갱신횟수"] = [self.refreshes[c] for c in table.index]
+        return table.reset_index()
+
+_running_schedulers = []  # start_poll_scheduler로 시작한 스케줄러
+
+@cache
+def get_poll_scheduler(base_url):
+    return PollScheduler(base_url)
+
+@cache
+def start_poll_scheduler(base_url):
+    """서버마다 우선순위 폴링 스레드 시작 (프로세스에서 한 번만)"""
+    scheduler = get_poll_scheduler(base_url)
+    threading.Thread(target=scheduler.run, name=f"poll-{urlparse(base_url).netloc}", daemon=True,
+                     ).start()
+    _running_schedulers.append(scheduler)
+    return scheduler
+
+def stop_poll_schedulers():
+    """시작한 스케줄러를 모두 멈춤 (벤치마크 초기화용, 다시 start_poll_scheduler로 시작할 수 있음)"""
+    for scheduler in _running_schedulers:
+        scheduler.stop()
+    _running_schedulers.clear()
+    start_poll_scheduler.cache_clear()
+    get_poll_scheduler.cache_clear()
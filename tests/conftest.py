@@ -0,0 +1,48 @@
+"""테스트 공용 설정: 결과 캐시/이력/알림 파일은 임시 디렉터리에, 서버는 bench/standin_server.py
+
+smart_monitor_core는 import할 때 CACHE_DIR 등을 환경변수에서 읽으므로 여기서 먼저 설정합니다.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "bench")]
+os.environ["SMART_MONITOR_CACHE_DIR"] = tempfile.mkdtemp(prefix="smart_monitor_test_")
+os.environ["SMART_MONITOR_POLL"] = "0"
+os.environ.pop("SMART_MONITOR_BASE_URL", None)
+
+import smart_monitor_core as core  # noqa: E402
+from standin_server import StandinConfig, start_server  # noqa: E402
+
+DAY = "2026-10-10"  # 지난 날짜 (결과 캐시에 만료 없이 저장되는 경로)
+
+
+@pytest.fixture(scope="session")
+def standin():
+    """지연 없는 대체 서버 (cfg를 테스트 안에서 바꾸면 바로 반영)"""
+    cfg = StandinConfig(vehicles=4, rows_per_day=144, latency_ms=0, jitter_ms=0)
+    server, base_url = start_server(cfg)
+    yield cfg, base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def fresh_cache():
+    """테스트마다 결과 캐시와 계측을 비움"""
+    core.get_result_cache().clear()
+    core.get_metrics.cache_clear()
+    yield core.get_result_cache()
+    core.get_result_cache().clear()
+
+
+@pytest.fixture
+def request_count(fresh_cache):
+    """endpoint별로 이 테스트에서 보낸 요청 수 (계측 요약 기준)"""
+    def count(endpoint):
+        summary = core.get_metrics().summary()
+        if summary.empty or endpoint not in set(summary["endpoint"]): return 0
+        return int(summary.loc[summary["endpoint"] == endpoint, "요청 수"].iloc[0])
+    return count
@@ -0,0 +1,64 @@
+"""알림 엔진 (히스테리시스, 바뀐 센서만 재판정, 프로세스 간 상태 공유)"""
+import pandas as pd
+import pytest
+
+import smart_monitor_core as core
+
+
+def fleet(psi, volt=3.0, temp=40.0, cold=115.0, serial_no="SN00001", sensor="000100A"):
+    return pd.DataFrame([{"SerialNo": serial_no, "SensorID": sensor, "공기압": psi, "전압": volt,
+                          "온도": temp, "냉간공기압": cold}])
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return core.AlertEngine("http://depot.test/", state_path=str(tmp_path / "state.json"))
+
+
+def states(events):
+    return [(e["rule"], e["state"]) for e in events]
+
+
+def test_alert_raises_once_and_clears_only_past_the_clear_threshold(engine):
+    assert states(engine.evaluate(fleet(99))) == [("low_pressure", "new")]
+    assert engine.evaluate(fleet(99)) == []    # 값이 그대로면 재판정하지 않음
+    assert engine.evaluate(fleet(101)) == []   # 발생 기준(100)은 넘었지만 해제 기준(103) 전
+    assert engine.evaluate(fleet(99.5)) == []  # 기준 근처에서 흔들려도 다시 보내지 않음
+    assert states(engine.evaluate(fleet(104))) == [("low_pressure", "cleared")]
+    assert not engine.active
+
+
+def test_missing_value_keeps_the_alert(engine):
+    engine.evaluate(fleet(99))
+    assert engine.evaluate(fleet(float("nan"))) == []
+    assert ("SN00001", "000100A", "low_pressure") in engine.active
+
+
+def test_partial_fleet_leaves_other_vehicles_untouched(engine):
+    both = pd.concat([fleet(99), fleet(99, serial_no="SN00002")], ignore_index=True)
+    assert len(engine.evaluate(both)) == 2
+    assert engine.evaluate(fleet(110)) == [dict(engine.recent[-1])]
+    assert {k[0] for k in engine.active} == {"SN00002"}
+
+
+def test_voltage_decline_uses_the_days_peak(engine):
+    engine.evaluate(fleet(115, volt=3.05))
+    assert states(engine.evaluate(fleet(115, volt=2.88))) == [("voltage_decline", "new")]
+
+
+def test_state_is_shared_between_engines(tmp_path):
+    path = str(tmp_path / "state.json")
+    dashboard = core.AlertEngine("http://depot.test/", state_path=path)
+    cli = core.AlertEngine("http://depot.test/", state_path=path)
+    assert states(dashboard.evaluate(fleet(99))) == [("low_pressure", "new")]
+    assert cli.evaluate(fleet(99)) == []  # 다른 엔진이 이미 보낸 알림
+    assert states(cli.evaluate(fleet(104))) == [("low_pressure", "cleared")]
+    assert dashboard.evaluate(fleet(104)) == []
+
+
+def test_file_sink_appends_events(tmp_path, engine):
+    sink = core.FileAlertSink(str(tmp_path / "alerts.jsonl"))
+    engine.sinks.append(sink)
+    engine.evaluate(fleet(99))
+    engine.evaluate(fleet(104))
+    assert len((tmp_path / "alerts.jsonl").read_text(encoding="utf-8").splitlines()) == 2
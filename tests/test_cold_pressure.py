@@ -0,0 +1,64 @@
+"""냉간 공기압 단계 조회의 종료 조건 (늦게 깨어나는 센서를 놓치지 않는지)"""
+import pandas as pd
+import pytest
+
+import smart_monitor_core as core
+from conftest import DAY
+
+
+@pytest.fixture
+def late_sensors(standin):
+    cfg, base_url = standin
+    cfg.late_sensors = 0.4  # 일부 센서는 5~9시 전에는 행이 아예 없음
+    yield cfg, base_url
+    cfg.late_sensors = 0.0
+
+
+def single_fetch(base_url, serial_no):
+    """00:00~12:00을 한 번에 받은 기준 결과"""
+    return core.cold_frame(list(core.pick_first_cold(core.fetch_cold_rows(base_url, serial_no, DAY, "12:00")).values()))
+
+
+def by_sensor(df):
+    return df.set_index("SensorID")[["냉간공기압", "냉간계측시간"]].sort_index()
+
+
+@pytest.mark.parametrize("serial_no", ["SN00000", "SN00001", "SN00002", "SN00003"])
+def test_scan_without_known_count_matches_single_fetch(late_sensors, fresh_cache, serial_no):
+    _, base_url = late_sensors
+    assert core.known_sensor_count(base_url, serial_no, DAY) is None
+    scanned = core.get_cold_pressure_with_retry(base_url, serial_no, DAY)
+    pd.testing.assert_frame_equal(by_sensor(scanned), by_sensor(single_fetch(base_url, serial_no)))
+
+
+def test_known_count_from_cached_rate_stops_early_without_rate_request(late_sensors, request_count):
+    _, base_url = late_sensors
+    core.get_cold_pressure_with_retry(base_url, "SN00001", DAY)
+    full_scan = request_count("cold")
+    assert full_scan == 7  # 06:00 ~ 12:00
+
+    core.get_result_cache().clear()
+    rate = core.get_rate_data(base_url, "SN00001", DAY)
+    rate_requests = request_count("rate")
+    assert core.known_sensor_count(base_url, "SN00001", DAY) == len(rate[3])
+    scanned = core.get_cold_pressure_with_retry(base_url, "SN00001", DAY)
+    assert request_count("cold") - full_scan < full_scan
+    assert request_count("rate") == rate_requests  # 센서 수를 알기 위해 수신율 페이지를 다시 받지 않음
+    pd.testing.assert_frame_equal(by_sensor(scanned), by_sensor(single_fetch(base_url, "SN00001")))
+
+
+def test_known_count_from_cached_normal_series(standin, fresh_cache):
+    _, base_url = standin
+    _, series = core.get_normal_series(base_url, "SN00002", DAY)
+    assert core.known_sensor_count(base_url, "SN00002", DAY) == series["SensorID"].nunique()
+
+
+def test_incomplete_scan_is_not_cached(standin, fresh_cache):
+    cfg, base_url = standin
+    cfg.error_rate = 1.0
+    try:
+        assert core.get_cold_pressure_with_retry(base_url, "SN00003", DAY).empty
+    finally:
+        cfg.error_rate = 0.0
+        core.get_host_breaker.cache_clear()  # 실패 기록이 다른 테스트의 차단기 판정에 남지 않도록
+    assert not core.get_cold_pressure_with_retry(base_url, "SN00003", DAY).empty
@@ -0,0 +1,39 @@
+"""기간 통신 품질 (수신율 이력 → 센서/차량/펌웨어 통계)"""
+from datetime import date
+
+import pandas as pd
+
+import smart_monitor_core as core
+
+
+def days_until(end, n):
+    return core.past_days(date.fromisoformat(end), n)
+
+
+def test_rate_history_and_quality_from_standin(standin, fresh_cache):
+    cfg, base_url = standin
+    devices = core.get_device_list(base_url)
+    serials = devices["SerialNo"].tolist()
+    days = days_until("2026-10-11", 3)
+    hist, missing = core.load_rate_history(base_url, serials, days)
+    assert hist.empty and len(missing) == len(serials) * len(days)
+    for s_no, day in missing:
+        core.get_rate_data(base_url, s_no, day)
+    hist, missing = core.load_rate_history(base_url, serials, days)
+    assert not missing
+    assert set(hist["Date"].dt.strftime("%Y-%m-%d")) == set(days)
+
+    sensors, vehicles, by_fw, daily_fw = core.comm_quality(hist, devices, window=1)
+    assert len(vehicles) == len(serials)
+    assert sensors["변화"].notna().all() and sensors["변화"].is_monotonic_increasing  # 저하가 큰 순
+    assert by_fw["차량수"].sum() == len(serials)
+    assert list(daily_fw.index.strftime("%Y-%m-%d")) == sorted(days)
+
+
+def test_history_without_rate_values_gives_empty_vehicle_stats():
+    hist = pd.DataFrame({"Date": pd.to_datetime(["2026-10-09", "2026-10-10"]), "SerialNo": ["SN1", "SN1"],
+                         "SensorID": ["A", "A"], "Success_Rate": [float("nan")] * 2,
+                         "Normal_Rate": [float("nan")] * 2, "전체수신율": [float("nan")] * 2})
+    devices = pd.DataFrame({"SerialNo": ["SN1"], "펌웨어버전": ["v1"]})
+    sensors, vehicles, by_fw, daily_fw = core.comm_quality(hist, devices)
+    assert sensors.empty and vehicles.empty and by_fw.empty and daily_fw.empty
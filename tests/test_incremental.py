@@ -0,0 +1,73 @@
+"""오늘 데이터 증분 수집 (DeltaPoller 병합 순서, LineStatusPoller 조건부 요청, 차량 정리)"""
+import pandas as pd
+
+import smart_monitor_core as core
+import standin_server as ss
+from conftest import DAY
+
+
+def page_series(cfg, time_gte="00:00", time_lte="23:59"):
+    html = ss.normal_page(cfg, "SN00001", DAY, time_gte, time_lte).encode("utf-8")
+    return core.parse_normal_series(html, "utf-8")[1]
+
+
+def test_merge_puts_newer_rows_first_and_drops_boundary_duplicates(standin):
+    cfg, _ = standin
+    full = page_series(cfg)
+    first = page_series(cfg, time_lte="12:00")
+    delta = page_series(cfg, time_gte="12:00")  # 경계 분(12:00)은 양쪽에 모두 있음
+    merged = core.DeltaPoller._merge(first, delta)
+    assert merged["Time"].is_monotonic_decreasing
+    pd.testing.assert_frame_equal(merged, full, check_categorical=False)
+
+
+def test_merge_order_does_not_depend_on_the_first_page(standin):
+    cfg, _ = standin
+    full = page_series(cfg)
+    merged = core.DeltaPoller._merge(page_series(cfg, time_lte="06:00"), page_series(cfg, time_gte="06:00", time_lte="09:00"))
+    merged = core.DeltaPoller._merge(merged, page_series(cfg, time_gte="09:00"))
+    pd.testing.assert_frame_equal(merged, full, check_categorical=False)
+
+
+def test_poll_reuses_state_and_prune_drops_vehicles_that_left(standin, request_count):
+    cfg, base_url = standin
+    poller = core.DeltaPoller(min_interval=60)
+    _, series = poller.poll(base_url, "SN00001", DAY)
+    again = poller.poll(base_url, "SN00001", DAY)[1]
+    assert again is series and request_count("normal") == 1
+    poller.poll(base_url, "SN00002", DAY)
+    assert poller.peek(base_url, "SN00002", DAY) is not None
+    poller.prune(base_url, ["SN00001"])
+    assert poller.peek(base_url, "SN00002", DAY) is None
+    assert poller.peek(base_url, "SN00001", DAY) is not None
+    assert poller.peek(base_url, "SN00001", "2026-10-11") is None
+
+
+def test_line_status_uses_conditional_requests(standin, request_count):
+    _, base_url = standin
+    poller = core.LineStatusPoller()
+    first = poller.get(base_url, "SN00001")
+    assert first["Date"] != "N/A"
+    assert poller.get(base_url, "SN00001", max_age=60) is first and request_count("line-status") == 1
+    page_bytes = core.get_metrics().bytes["line-status"]
+    assert poller.get(base_url, "SN00001") == first  # 304: 본문 없이 기억해 둔 행
+    assert request_count("line-status") == 2
+    assert core.get_metrics().bytes["line-status"] == page_bytes
+
+
+def test_line_status_failure_is_reported_not_hidden(standin):
+    _, base_url = standin
+    poller = core.LineStatusPoller()
+    assert poller.get("http://127.0.0.1:9/", "SN00001") == core.NO_LINE_STATUS
+    assert core.rfm_is_err(poller.peek("http://127.0.0.1:9/", "SN00001"))
+
+
+def test_device_list_prunes_both_pollers(standin):
+    cfg, base_url = standin
+    today = core.today_str()
+    core.get_delta_poller().poll(base_url, "SN09999", today)
+    core.get_line_status_poller().get(base_url, "SN09999")
+    devices = core.get_device_list(base_url)
+    assert len(devices) == cfg.vehicles
+    assert core.get_delta_poller().peek(base_url, "SN09999", today) is None
+    assert core.get_line_status_poller().peek(base_url, "SN09999") is None
@@ -0,0 +1,90 @@
+"""HTML 파서 백엔드(lxml / bs4)와 측정값 표시"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import smart_monitor_core as core
+import standin_server as ss
+from conftest import DAY
+
+CFG = ss.StandinConfig(vehicles=30, rows_per_day=48, late_sensors=0.2)
+PAGES = {
+    "normal": (ss.normal_page(CFG, "SN00001", DAY), core.parse_normal_series),
+    "line-status": (ss.line_status_page(CFG, "SN00001"), core._parse_line_status),
+    "device": (ss.device_list_page(CFG), core._parse_device_rows),
+    "rate": (ss.rate_page(CFG, "SN00001", DAY), core._parse_rate_page),
+}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def use(name):
+        monkeypatch.setattr(core, "HTML_BACKEND", name)
+    return use
+
+
+def assert_same(a, b):
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b)
+    elif isinstance(a, tuple):
+        assert len(a) == len(b)
+        for x, y in zip(a, b): assert_same(x, y)
+    elif isinstance(a, float) and np.isnan(a):
+        assert np.isnan(b)
+    else:
+        assert a == b
+
+
+@pytest.mark.parametrize("page", list(PAGES))
+def test_backends_extract_the_same_records(page, backend):
+    pytest.importorskip("lxml")
+    pytest.importorskip("bs4")
+    html, parse = PAGES[page]
+    backend("lxml")
+    fast = parse(html.encode("utf-8"), "utf-8")
+    backend("bs4")
+    slow = parse(html.encode("utf-8"), "utf-8")
+    assert_same(fast, slow)
+
+
+def test_normal_page_keeps_page_order_and_types():
+    master, series = core.parse_normal_series(PAGES["normal"][0].encode("utf-8"), "utf-8")
+    assert master["수집시간"] == series["Time"].iloc[0].strftime("%Y-%m-%d %H:%M:%S")
+    assert series["Time"].is_monotonic_decreasing  # 최신 측정이 위
+    assert series["SensorID"].dtype == "category"
+    assert {series[c].dtype for c in ["공기압", "전압", "온도"]} == {np.dtype("float32")}
+
+
+@pytest.mark.parametrize("name", ["lxml", "bs4"])
+def test_empty_or_broken_content_gives_no_tables(name, backend):
+    pytest.importorskip(name)
+    backend(name)
+    assert core.parse_tables(b"", "sc_table") == []
+    assert core.parse_tables(b"<html><body><p>Internal Server Error</body></html>", "sc_table") == []
+    assert core._parse_line_status(b"") == []
+
+
+def test_only_target_tables_are_returned(backend):
+    pytest.importorskip("lxml")
+    backend("lxml")
+    html = (b'<table class="other"><tr><td>x</td></tr></table>'
+            b'<table class="table sc_table"><tr><td class="textCenter">1</td></tr></table>')
+    tables = core.parse_tables(html, "sc_table")
+    assert [t.classes for t in tables] == [["table", "sc_table"]]
+    assert tables[0].rows()[0].cells("textCenter") == ["1"]
+
+
+@pytest.mark.parametrize("value, text", [
+    (np.float32(2.795), "2.795"),   # 기준(<2.8) 바로 아래 값이 '2.8'로 보이지 않아야 함
+    (np.float32(120.9), "120.9"),
+    (2.8, "2.8"),
+    (115.25, "115.25"),
+    (float("nan"), "-"),
+])
+def test_format_reading_keeps_source_precision(value, text):
+    assert core.format_reading(value) == text
+
+
+def test_format_reading_on_float32_series_values():
+    values = pd.Series(["2.795", "120.9"]).astype("float32")
+    assert [core.format_reading(v) for v in values] == ["2.795", "120.9"]
@@ -0,0 +1,70 @@
+"""우선순위 폴링 (공유 Line Status 저장소, 실패 격리, 요청 예산, 서버별 리더)"""
+import pytest
+
+import smart_monitor_core as core
+
+
+@pytest.fixture
+def scheduler(standin, fresh_cache):
+    _, base_url = standin
+    s = core.PollScheduler(base_url, budget_rpm=600)
+    s.tick()  # 차량 목록 + 첫 갱신
+    yield s
+    s.stop()
+
+
+def test_refresh_fills_the_store_the_rfm_table_reads(scheduler, request_count):
+    for s_no in scheduler.devices["SerialNo"]:
+        value = core.get_line_status_poller().peek(scheduler.base_url, s_no)
+        if s_no in scheduler.refreshed_at:
+            assert value is not None
+    before = request_count("line-status")
+    refreshed = next(iter(scheduler.refreshed_at))
+    core.get_latest_r_values(scheduler.base_url, refreshed, max_age=60)  # 화면 쪽 조회
+    assert request_count("line-status") == before
+
+
+def test_rfm_error_in_shared_store_makes_vehicle_a_problem(scheduler):
+    s_no = scheduler.devices["SerialNo"].iloc[0]
+    poller = core.get_line_status_poller()
+    poller._states[(scheduler.base_url.rstrip('/'), s_no)] = {
+        "row": None, "etag": None, "modified": None, "value": core.NO_LINE_STATUS, "fetched_at": 0}
+    assert scheduler.classify(s_no, 0, alerting=set()) == "problem"
+
+
+def test_one_failing_vehicle_does_not_stop_the_others(scheduler, monkeypatch):
+    bad = scheduler.devices["SerialNo"].iloc[1]
+    real = core.get_latest_r_values
+
+    def flaky(base_url, serial_no, max_age=0):
+        if serial_no == bad: raise RuntimeError("파싱 실패")
+        return real(base_url, serial_no, max_age)
+    monkeypatch.setattr(core, "get_latest_r_values", flaky)
+    scheduler.refreshed_at.clear()
+    picked = scheduler.pick(scheduler._devices_at + 1)
+    results = [scheduler._refresh(item) for item in picked]
+    assert results.count(False) == 1 and results.count(True) == len(picked) - 1
+    assert scheduler.failures[bad] == 1 and bad in scheduler.refreshed_at
+
+
+def test_pick_stays_within_the_request_budget(standin, fresh_cache):
+    _, base_url = standin
+    s = core.PollScheduler(base_url, budget_rpm=6)  # 토큰 상한 = 차량 하나 갱신분
+    s.devices = core.get_device_list(base_url)
+    s._devices_at = 1000.0
+    s._filled_at = 1000.0
+    assert len(s.pick(1000.0)) == 1
+    assert s.pick(1000.0) == []  # 토큰을 다 씀
+
+
+def test_only_one_scheduler_per_server_is_leader(standin):
+    _, base_url = standin
+    first, second = core.PollScheduler(base_url), core.PollScheduler(base_url)
+    try:
+        assert first.acquire_leadership()
+        assert not second.acquire_leadership()
+    finally:
+        first._leader_file.close()
+        first._leader_file = None
+    assert second.acquire_leadership()
+    second._leader_file.close()
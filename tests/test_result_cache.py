@@ -0,0 +1,77 @@
+"""결과 캐시 (만료 / 용량 초과 삭제 / 빈 결과 TTL)"""
+import time
+
+import pandas as pd
+import pytest
+
+import smart_monitor_core as core
+from conftest import DAY
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return core.ResultCache(str(tmp_path / "results.sqlite"))
+
+
+def test_get_distinguishes_missing_from_cached_none(cache):
+    cache.put("k", None)
+    assert cache.get("k", core.CACHE_MISS) is None
+    assert cache.get("other", core.CACHE_MISS) is core.CACHE_MISS
+
+
+def test_expired_entry_is_a_miss(cache, monkeypatch):
+    cache.put("k", "v", ttl=60)
+    assert cache.get("k") == "v"
+    now = time.time()
+    monkeypatch.setattr(core.time, "time", lambda: now + 61)
+    assert cache.get("k", core.CACHE_MISS) is core.CACHE_MISS
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path, monkeypatch):
+    blob = "x" * 1000
+    cache = core.ResultCache(str(tmp_path / "results.sqlite"), max_bytes=3500)
+    clock = iter(range(1_000_000, 2_000_000))
+    monkeypatch.setattr(core.time, "time", lambda: next(clock))
+    for key in "abc":
+        cache.put(key, blob)
+    cache.get("a")           # a를 최근에 사용
+    cache.put("d", blob)     # 한도 초과: 가장 오래 사용하지 않은 b부터 삭제
+    present = {k for k in "abcd" if cache.get(k, core.CACHE_MISS) is not core.CACHE_MISS}
+    assert present == {"a", "c", "d"}
+
+
+@pytest.mark.parametrize("value, empty", [
+    (pd.DataFrame(), True),
+    (pd.DataFrame({"a": [1]}), False),
+    ((float("nan"), float("nan"), float("nan"), pd.DataFrame()), True),   # 수신율 조회 실패 값
+    ((10.0, 9.0, 90.0, pd.DataFrame({"SensorID": ["1"]})), False),
+    (({}, pd.DataFrame()), True),                                          # Normal 시계열 (master_info, series)
+    (({"수집시간": "x"}, pd.DataFrame({"a": [1]})), False),
+    ((1, 2), False),          # 담긴 표가 없으면 비었다고 보지 않음
+    ({}, True),
+])
+def test_is_empty_result(value, empty):
+    assert core.is_empty_result(value) is empty
+
+
+def test_cache_ttl_by_date_and_emptiness():
+    today = core.today_str()
+    assert core.cache_ttl(DAY, pd.DataFrame({"a": [1]})) is None
+    assert core.cache_ttl(DAY, pd.DataFrame()) == core.EMPTY_TTL      # 지난 날짜라도 빈 결과는 영구 저장하지 않음
+    assert core.cache_ttl(today, pd.DataFrame({"a": [1]})) == core.TODAY_TTL
+    assert core.cache_ttl(today, pd.DataFrame()) == min(core.TODAY_TTL, core.EMPTY_TTL)
+
+
+def test_cached_call_loads_once_and_expires_empty_results(fresh_cache, monkeypatch):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return pd.DataFrame()
+    for _ in range(3):
+        core.cached_call("normal-series", "http://x/", "SN1", DAY, "00:00-23:59", loader)
+    assert len(calls) == 1
+    now = time.time()
+    monkeypatch.setattr(core.time, "time", lambda: now + core.EMPTY_TTL + 1)
+    core.cached_call("normal-series", "http://x/", "SN1", DAY, "00:00-23:59", loader)
+    assert len(calls) == 2